@@ -0,0 +1,62 @@
+"""
+Stateless JWT authentication
+Builds request.user from the role, manager and user-version claims of the
+access token instead of loading the User row on every request. The user's
+current auth_version is cached; when the token's version is older (role,
+manager, active flag or password changed since it was issued) the full
+user is loaded from the database as before. Invalidations only reach every
+worker through a shared cache; without one, entries expire within seconds
+(settings.INVALIDATED_CACHE_TIMEOUT).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import ClaimsUser, User
+
+VERSION_CACHE_KEY = 'user_auth_version:{user_id}'
+REQUIRED_CLAIMS = ('username', 'role', 'manager_id', 'ver')
+
+
+def add_user_claims(token, user):
+    """Copy the claims ClaimsJWTAuthentication needs onto a token"""
+    token['username'] = user.username
+    token['role'] = user.role
+    token['manager_id'] = user.manager_id
+    token['ver'] = user.auth_version
+    return token
+
+
+def current_auth_version(user_id):
+    """The active user's auth_version, from the cache when possible; None if inactive or gone"""
+    key = VERSION_CACHE_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(pk=user_id, is_active=True).values_list('auth_version', flat=True).first()
+        if version is not None:
+            cache.set(key, version, settings.INVALIDATED_CACHE_TIMEOUT)
+    return version
+
+
+def forget_auth_version(*user_ids):
+    cache.delete_many([VERSION_CACHE_KEY.format(user_id=user_id) for user_id in user_ids if user_id])
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that trusts up-to-date token claims.
+    Tokens without the claims (issued before they were added) and stale
+    tokens use the stock database lookup, which also rejects inactive users.
+    """
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in REQUIRED_CLAIMS):
+            return super().get_user(validated_token)
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            return super().get_user(validated_token)
+        if current_auth_version(user_id) != validated_token['ver']:
+            return super().get_user(validated_token)
+        return ClaimsUser.from_claims(validated_token)
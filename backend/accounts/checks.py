@@ -0,0 +1,24 @@
+"""
+Deployment checks for the accounts app
+Cached visibility scopes and auth versions are invalidated on write; with
+several workers that only works through a cache they all share.
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PER_PROCESS_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.CACHES['default']['BACKEND'] not in PER_PROCESS_BACKENDS:
+        return []
+    return [Warning(
+        "The default cache is per-process, so scope and auth version invalidations "
+        "do not reach other workers.",
+        hint="Set REDIS_URL to a Redis server shared by every worker.",
+        id='accounts.W001',
+    )]
@@ -0,0 +1,63 @@
+"""
+Password verification pool
+Runs password hash checks (bcrypt / PBKDF2, which release the GIL) on a
+small process-wide thread pool. At most PASSWORD_HASH_WORKERS checks run at
+once, so a burst of logins can't take every CPU from other requests, and
+logins are turned away once PASSWORD_HASH_QUEUE checks are already waiting.
+The checks touch no database connection; callers save rehashed passwords.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+class HashingBusy(Exception):
+    """Too many password checks are already queued"""
+
+
+def get_pool():
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                workers = getattr(settings, 'PASSWORD_HASH_WORKERS', 4)
+                _slots = threading.BoundedSemaphore(workers + getattr(settings, 'PASSWORD_HASH_QUEUE', 32))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+    return _executor, _slots
+
+
+def run_bounded(func, *args):
+    executor, slots = get_pool()
+    if not slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def _verify(password, encoded):
+    upgrade = []
+    valid = check_password(password, encoded, setter=lambda raw_password: upgrade.append(True))
+    return valid, bool(upgrade)
+
+
+def verify_password(password, encoded):
+    """
+    Check a password against a stored hash on the pool.
+    Returns (valid, needs_upgrade); needs_upgrade means the hash should be
+    re-made with the current preferred hasher (user.set_password()).
+    Raises HashingBusy when the queue is full.
+    """
+    return run_bounded(_verify, password, encoded)
+
+
+def burn_hash(password):
+    """Hash once for an unknown user, so response time doesn't reveal which usernames exist"""
+    run_bounded(make_password, password)
@@ -0,0 +1,219 @@
+"""
+Organization hierarchy
+Maintains OrgClosure, the closure table of the reporting hierarchy, so
+"everyone under X" is one indexed lookup at any depth. A user's parent is
+User.manager, or failing that the manager of their EmployeeProfile team.
+accounts.signals calls move() whenever either changes; rebuild() recomputes
+the whole table (after loaddata or raw SQL edits, see rebuild_org_hierarchy).
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import OrgClosure, User
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def parent_of(user_id):
+    """Effective manager of a user: User.manager, else their team's manager"""
+    row = (
+        User.objects.filter(pk=user_id)
+        .values_list('manager_id', 'employee_profile__team__manager_id')
+        .first()
+    )
+    if row is None:
+        return None
+    parent_id = row[0] or row[1]
+    return None if parent_id == user_id else parent_id
+
+
+def ancestor_ids(user_id):
+    """Everyone above a user, nearest first"""
+    return list(
+        OrgClosure.objects.filter(descendant_id=user_id, depth__gt=0)
+        .order_by('depth').values_list('ancestor_id', flat=True)
+    )
+
+
+def is_under(user_id, ancestor_id):
+    """Whether user_id reports to ancestor_id, directly or indirectly"""
+    return OrgClosure.objects.filter(ancestor_id=ancestor_id, descendant_id=user_id, depth__gt=0).exists()
+
+
+def add_user(user_id):
+    """Give a new user their depth-0 row, then attach them under their manager"""
+    OrgClosure.objects.get_or_create(ancestor_id=user_id, descendant_id=user_id, defaults={'depth': 0})
+    return move(user_id)
+
+
+@transaction.atomic
+def move(user_id):
+    """
+    Re-attach a user (with everyone under them) below their current parent.
+    Returns the ids of every old and new ancestor, whose scopes changed.
+    """
+    parent_id = parent_of(user_id)
+    old_ancestors = dict(
+        OrgClosure.objects.filter(descendant_id=user_id, depth__gt=0).values_list('ancestor_id', 'depth')
+    )
+    current_parent = next((ancestor for ancestor, depth in old_ancestors.items() if depth == 1), None)
+    if parent_id == current_parent and (parent_id is not None or not old_ancestors):
+        return set()
+
+    subtree = dict(OrgClosure.objects.filter(ancestor_id=user_id).values_list('descendant_id', 'depth'))
+    if not subtree:
+        # Not in the table yet (created before the table existed, or with raw=True)
+        subtree = {user_id: 0}
+        OrgClosure.objects.create(ancestor_id=user_id, descendant_id=user_id, depth=0)
+    if parent_id in subtree:
+        # Team fallbacks can still form a loop (A manages B's team, B manages A);
+        # leave the user at the top rather than corrupt the table
+        logger.warning("Reporting loop: user %s would report to %s, who reports to them", user_id, parent_id)
+        parent_id = None
+
+    if old_ancestors:
+        OrgClosure.objects.filter(ancestor_id__in=old_ancestors, descendant_id__in=subtree).delete()
+    new_ancestors = {}
+    if parent_id is not None:
+        new_ancestors = dict(OrgClosure.objects.filter(descendant_id=parent_id).values_list('ancestor_id', 'depth'))
+        if not new_ancestors:
+            OrgClosure.objects.create(ancestor_id=parent_id, descendant_id=parent_id, depth=0)
+            new_ancestors = {parent_id: 0}
+        OrgClosure.objects.bulk_create(
+            [
+                OrgClosure(ancestor_id=ancestor, descendant_id=descendant, depth=above + 1 + below)
+                for ancestor, above in new_ancestors.items()
+                for descendant, below in subtree.items()
+            ],
+            batch_size=BATCH_SIZE,
+        )
+    affected = set(old_ancestors) | set(new_ancestors)
+    if old_ancestors:
+        # The top of the old chain may have been left there to break a loop
+        # through this subtree; now that the subtree is gone it may attach
+        old_root = max(old_ancestors, key=old_ancestors.get)
+        if parent_of(old_root) is not None:
+            affected |= move(old_root)
+    return affected
+
+
+def loop_breakers(parents):
+    """
+    Users whose parent link is dropped to break reporting loops, one per
+    loop: the member move() left at the top (stored without a parent),
+    else the lowest id, so rebuild() and verify() agree with move().
+    """
+    breakers, done = set(), set()
+    attached = None
+    for start in parents:
+        path, position = [], {}
+        user_id = start
+        while user_id is not None and user_id not in done and user_id not in position:
+            position[user_id] = len(path)
+            path.append(user_id)
+            user_id = parents.get(user_id)
+        if user_id is not None and user_id in position:
+            loop = path[position[user_id]:]
+            if attached is None:
+                attached = set(OrgClosure.objects.filter(depth=1).values_list('descendant_id', flat=True))
+            detached = [member for member in loop if member not in attached]
+            breakers.add(min(detached or loop))
+        done.update(path)
+    return breakers
+
+
+def expected_rows():
+    """Every (ancestor, descendant, depth) the table should hold, from users and teams"""
+    parents = {}
+    for user_id, manager_id, team_manager_id in User.objects.values_list(
+        'id', 'manager_id', 'employee_profile__team__manager_id'
+    ):
+        parent_id = manager_id or team_manager_id
+        parents[user_id] = None if parent_id == user_id else parent_id
+    for user_id in loop_breakers(parents):
+        parents[user_id] = None
+
+    rows = {}
+    for user_id in parents:
+        rows[(user_id, user_id)] = 0
+        seen = {user_id}
+        ancestor, depth = parents[user_id], 1
+        while ancestor is not None and ancestor not in seen:
+            rows[(ancestor, user_id)] = depth
+            seen.add(ancestor)
+            ancestor, depth = parents.get(ancestor), depth + 1
+    return rows
+
+
+@transaction.atomic
+def rebuild():
+    """Replace the whole table with rows computed from users and teams"""
+    rows = expected_rows()
+    OrgClosure.objects.all().delete()
+    OrgClosure.objects.bulk_create(
+        [
+            OrgClosure(ancestor_id=ancestor, descendant_id=descendant, depth=depth)
+            for (ancestor, descendant), depth in rows.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    return len(rows)
+
+
+def verify():
+    """{(ancestor, descendant): (stored depth, expected depth)} for rows out of sync"""
+    expected = expected_rows()
+    stored = {
+        (ancestor, descendant): depth
+        for ancestor, descendant, depth in OrgClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth')
+    }
+    return {
+        key: (stored.get(key), expected.get(key))
+        for key in set(expected) | set(stored)
+        if stored.get(key) != expected.get(key)
+    }
+
+
+def display_name(row):
+    if row['first_name'] and row['last_name']:
+        return f"{row['first_name']} {row['last_name']}"
+    return row['first_name'] or row['username']
+
+
+def org_tree(root_id=None):
+    """
+    The reporting tree as nested {id, username, name, role, reports} nodes,
+    read with one query. With root_id, only that user and everyone under
+    them; otherwise every top-level user with their reports.
+    """
+    users = User.objects.annotate(
+        parent_id=Subquery(
+            OrgClosure.objects.filter(descendant_id=OuterRef('pk'), depth=1).values('ancestor_id')[:1]
+        )
+    )
+    if root_id is not None:
+        users = users.filter(org_ancestors__ancestor_id=root_id)
+    rows = users.order_by('username').values('id', 'username', 'first_name', 'last_name', 'role', 'parent_id')
+
+    nodes, parents = {}, {}
+    for row in rows:
+        nodes[row['id']] = {
+            'id': row['id'],
+            'username': row['username'],
+            'name': display_name(row),
+            'role': row['role'],
+            'reports': [],
+        }
+        parents[row['id']] = row['parent_id']
+    roots = []
+    for user_id, node in nodes.items():
+        parent_id = parents[user_id]
+        if user_id != root_id and parent_id in nodes:
+            nodes[parent_id]['reports'].append(node)
+        else:
+            roots.append(node)
+    return roots
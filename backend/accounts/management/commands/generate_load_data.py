@@ -0,0 +1,368 @@
+"""
+Generate Load Data Command
+Creates a production-sized synthetic organization for performance work:
+directors, managers and skewed team sizes, employee profiles, daily
+attendance, tasks and monthly payroll. Rows are written with bulk_create in
+batches and the same --seed always produces the same data, so slow queries
+can be reproduced locally. Derived tables that signals normally maintain
+(org hierarchy, task counters) are rebuilt at the end.
+Run with: python manage.py generate_load_data [--users 50000 --teams 2000
+          --attendance 5000000 --tasks 1000000 --payroll-months 12]
+Every generated user has the password "loadtest".
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import time as dt_time, timedelta
+from decimal import Decimal
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts import hierarchy
+from accounts.models import User
+from employees.models import Attendance, EmployeeProfile, OrganizationSettings, Payroll, Team
+from tasks import calendar, counters
+from tasks.models import Task
+
+PASSWORD = 'loadtest'
+FIRST_NAMES = (
+    'Aarav', 'Vivaan', 'Aditya', 'Vihaan', 'Arjun', 'Sai', 'Reyansh', 'Ishaan', 'Kabir', 'Rohan',
+    'Ananya', 'Diya', 'Aadhya', 'Saanvi', 'Pari', 'Myra', 'Anika', 'Navya', 'Kiara', 'Meera',
+)
+LAST_NAMES = (
+    'Sharma', 'Verma', 'Iyer', 'Nair', 'Reddy', 'Patel', 'Gupta', 'Khan', 'Singh', 'Das',
+    'Menon', 'Rao', 'Joshi', 'Kulkarni', 'Bose', 'Chopra', 'Pillai', 'Mehta', 'Kapoor', 'Ghosh',
+)
+TASK_VERBS = ('Review', 'Update', 'Prepare', 'Fix', 'Draft', 'Migrate', 'Audit', 'Plan', 'Test', 'Document')
+TASK_NOUNS = (
+    'quarterly report', 'onboarding checklist', 'payroll export', 'release notes', 'vendor contract',
+    'leave policy', 'client proposal', 'sprint backlog', 'budget forecast', 'access review',
+)
+# Weighted choices: (value, weight)
+ATTENDANCE_STATUSES = (('present', 85), ('absent', 4), ('half_day', 4), ('leave', 7))
+TASK_STATUSES = (('todo', 35), ('inprogress', 20), ('completed', 45))
+PROFILE_STATUSES = (('active', 92), ('on_leave', 3), ('inactive', 5))
+SALARY_RANGES = {'user': (25_000, 150_000), 'manager': (120_000, 300_000), 'director': (300_000, 600_000)}
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def picker(rng, choices):
+    """Draw from (value, weight) pairs; cumulative weights are computed once"""
+    values, weights = zip(*choices)
+    cumulative = list(accumulate(weights))
+    return lambda: rng.choices(values, cum_weights=cumulative)[0]
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """Let bulk_create keep generated created_at / updated_at values instead of now()"""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = "Generate a large, deterministic synthetic dataset for performance testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50_000, help="Total users, including managers")
+        parser.add_argument('--teams', type=int, default=2_000, help="Teams (one manager each)")
+        parser.add_argument('--attendance', type=int, default=5_000_000, help="Attendance rows")
+        parser.add_argument('--tasks', type=int, default=1_000_000, help="Tasks")
+        parser.add_argument('--payroll-months', type=int, default=12, help="Past months of payroll per employee")
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='load', help="Username / team name prefix for the generated rows")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        self.today = timezone.localdate()
+
+        if options['teams'] < 1:
+            raise CommandError("--teams must be at least 1.")
+        directors = max(1, options['teams'] // 25)
+        admins = max(1, options['users'] // 10_000)
+        members = options['users'] - options['teams'] - directors - admins
+        if members < 1:
+            raise CommandError(
+                f"--users must exceed {options['teams'] + directors + admins} "
+                f"(teams + {directors} directors + {admins} admins)."
+            )
+        if User.objects.filter(username__startswith=f"{self.prefix}_").exists():
+            raise CommandError(f"Users prefixed '{self.prefix}_' already exist; pass another --prefix.")
+
+        started = time.perf_counter()
+        self.phase('users and teams', self.create_people, admins, directors, options['teams'], members)
+        self.phase('employee profiles', self.create_profiles)
+        self.phase('attendance', self.create_attendance, options['attendance'])
+        self.phase('tasks', self.create_tasks, options['tasks'])
+        self.phase('payroll', self.create_payroll, options['payroll_months'])
+        self.phase('org hierarchy', hierarchy.rebuild)
+        self.phase('task counters', counters.rebuild)
+        calendar.invalidate()
+        self.analyze()
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated load data with seed {options['seed']} in {time.perf_counter() - started:.1f}s "
+            f"(password: {PASSWORD})"
+        ))
+
+    def phase(self, label, func, *args):
+        started = time.perf_counter()
+        with transaction.atomic():
+            rows = func(*args)
+        self.stdout.write(f"\r{label}: {rows:,} rows in {time.perf_counter() - started:.1f}s".ljust(60))
+
+    def insert(self, model, objects, label):
+        """bulk_create in batches with a progress line; returns the created objects' count"""
+        total = 0
+        for batch in chunks(objects, self.batch_size):
+            model.objects.bulk_create(batch, batch_size=self.batch_size)
+            total += len(batch)
+            self.stdout.write(f"\r{label}: {total:,}", ending='')
+            self.stdout.flush()
+        return total
+
+    def new_user(self, kind, number, role, manager=None):
+        rng = self.rng
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        username = f"{self.prefix}_{kind}{number:06d}"
+        return User(
+            username=username,
+            email=f"{username}@example.com",
+            password=self.password,
+            first_name=first,
+            last_name=last,
+            role=role,
+            is_staff=role in ('admin', 'manager'),
+            is_superuser=role == 'admin',
+            manager=manager,
+        )
+
+    def create_people(self, admins, directors, teams, members):
+        """
+        Admins, directors (managers of managers), one manager per team and
+        members spread over teams with a long-tailed size distribution.
+        Most members name their team's manager directly, some rely on the
+        team fallback and a few have no team at all.
+        """
+        rng = self.rng
+        # One hash for everybody; hashing 50k passwords would dominate the run
+        self.password = make_password(PASSWORD)
+
+        self.admins = User.objects.bulk_create([self.new_user('a', n, 'admin') for n in range(admins)])
+        self.directors = User.objects.bulk_create([self.new_user('d', n, 'manager') for n in range(directors)])
+        self.managers = User.objects.bulk_create(
+            [self.new_user('m', n, 'manager', rng.choice(self.directors)) for n in range(teams)],
+            batch_size=self.batch_size,
+        )
+        self.teams = Team.objects.bulk_create(
+            [
+                Team(name=f"{self.prefix} team {n:05d}", description=f"Synthetic team {n}", manager=manager)
+                for n, manager in enumerate(self.managers)
+            ],
+            batch_size=self.batch_size,
+        )
+
+        cumulative = list(accumulate(rng.paretovariate(1.3) for _ in self.teams))
+        self.member_teams = {}
+        users = []
+        for n in range(members):
+            roll = rng.random()
+            if roll < 0.05:
+                # No team (teams[-1] is None in create_profiles), reports to any manager
+                team, manager = -1, rng.choice(self.managers)
+            else:
+                team = rng.choices(range(len(self.teams)), cum_weights=cumulative)[0]
+                manager = self.managers[team] if roll < 0.9 else None
+            user = self.new_user('u', n, 'user', manager)
+            users.append(user)
+            self.member_teams[user.username] = team
+        self.members = []
+        for batch in chunks(users, self.batch_size):
+            self.members.extend(User.objects.bulk_create(batch))
+            self.stdout.write(f"\rusers: {len(self.members):,}", ending='')
+            self.stdout.flush()
+        return admins + directors + teams * 2 + members
+
+    def create_profiles(self):
+        rng = self.rng
+        status = picker(rng, PROFILE_STATUSES)
+        teams = self.teams + [None]
+        people = (
+            [(user, 'director', None) for user in self.directors]
+            + [(user, 'manager', self.teams[n]) for n, user in enumerate(self.managers)]
+            + [(user, 'user', teams[self.member_teams[user.username]]) for user in self.members]
+        )
+
+        def profiles():
+            for number, (user, kind, team) in enumerate(people):
+                low, high = SALARY_RANGES[kind]
+                yield EmployeeProfile(
+                    user=user,
+                    employee_id=f"{self.prefix.upper()}-{number:06d}",
+                    phone=f"+91 9{rng.randrange(10**9):09d}",
+                    date_of_joining=self.today - timedelta(days=rng.randint(30, 5 * 365)),
+                    status=status(),
+                    team=team,
+                    position={'director': 'Director', 'manager': 'Team Manager'}.get(kind, 'Associate'),
+                    base_salary=Decimal(rng.randrange(low, high, 500)),
+                )
+
+        total = self.insert(EmployeeProfile, profiles(), 'profiles')
+        self.employees = list(
+            EmployeeProfile.objects.filter(employee_id__startswith=f"{self.prefix.upper()}-", status='active')
+            .order_by('id').values_list('id', 'user_id', 'date_of_joining', 'base_salary')
+        )
+        return total
+
+    def working_days(self):
+        """Weekdays before today, newest first, back to the earliest joining date"""
+        earliest = min(joined for _, _, joined, _ in self.employees)
+        day = self.today - timedelta(days=1)
+        while day >= earliest:
+            if day.weekday() < 5:
+                yield day
+            day -= timedelta(days=1)
+
+    def create_attendance(self, rows):
+        """
+        A row per active employee per working day, filling the most recent
+        days first, until `rows` rows exist or every employee's history
+        back to their joining date is covered.
+        """
+        rng = self.rng
+        if not self.employees or rows <= 0:
+            return 0
+        pick_status = picker(rng, ATTENDANCE_STATUSES)
+
+        def records():
+            produced = 0
+            for day in self.working_days():
+                for employee_id, user_id, joined, _ in self.employees:
+                    if joined > day:
+                        continue
+                    status = pick_status()
+                    check_in = check_out = None
+                    if status in ('present', 'half_day'):
+                        arrival = 9 * 60 + rng.randint(-45, 45)
+                        departure = arrival + (rng.randint(240, 300) if status == 'half_day' else rng.randint(480, 600))
+                        check_in = dt_time(arrival // 60, arrival % 60)
+                        check_out = dt_time(min(departure // 60, 23), departure % 60)
+                    yield Attendance(
+                        employee_id=employee_id, date=day, status=status,
+                        check_in=check_in, check_out=check_out, marked_by_id=user_id,
+                    )
+                    produced += 1
+                    if produced >= rows:
+                        return
+
+        return self.insert(Attendance, records(), 'attendance')
+
+    def create_tasks(self, count):
+        """
+        Tasks mostly created by managers for their own team, some by
+        directors and admins for anyone; spread over the past year.
+        """
+        rng = self.rng
+        team_members = {}
+        for user in self.members:
+            if user.manager_id is not None:
+                team_members.setdefault(user.manager_id, []).append(user.pk)
+        manager_ids = [user.pk for user in self.managers]
+        member_ids = [user.pk for user in self.members]
+        other_creators = [user.pk for user in self.directors + self.admins]
+        pick_status = picker(rng, TASK_STATUSES)
+        now = timezone.now()
+
+        def tasks():
+            for number in range(count):
+                if rng.random() < 0.85:
+                    created_by = rng.choice(manager_ids)
+                    team = team_members.get(created_by) or member_ids
+                else:
+                    created_by = rng.choice(other_creators)
+                    team = member_ids
+                assigned_to = rng.choice(team) if rng.random() < 0.92 else None
+                created_at = now - timedelta(seconds=rng.randint(3600, 365 * 86400))
+                status = pick_status()
+                due_date = None
+                if rng.random() < 0.75:
+                    due_date = timezone.localdate(created_at) + timedelta(days=rng.randint(1, 30))
+                updated_at = min(now, created_at + timedelta(seconds=rng.randint(0, 30 * 86400)))
+                yield Task(
+                    title=f"{rng.choice(TASK_VERBS)} {rng.choice(TASK_NOUNS)} #{number}",
+                    description=f"Synthetic task {number} for load testing" if rng.random() < 0.5 else None,
+                    created_by_id=created_by,
+                    assigned_to_id=assigned_to,
+                    status=status,
+                    due_date=due_date,
+                    assigned_at=created_at + timedelta(minutes=rng.randint(0, 120)) if assigned_to else None,
+                    created_at=created_at,
+                    updated_at=updated_at,
+                )
+
+        with explicit_timestamps(Task):
+            return self.insert(Task, tasks(), 'tasks')
+
+    def create_payroll(self, months):
+        """One record per active employee per past month; the latest month is still 'processed'"""
+        rng = self.rng
+        working_days = OrganizationSettings.get_settings().working_days_per_month
+        periods = []
+        month = self.today.replace(day=1)
+        for _ in range(months):
+            month = (month - timedelta(days=1)).replace(day=1)
+            periods.append(month)
+        periods.reverse()
+
+        def records():
+            for period in periods:
+                for employee_id, _, joined, base_salary in self.employees:
+                    if joined >= period:
+                        continue
+                    present = rng.randint(max(0, working_days - 4), working_days)
+                    leave = rng.randint(0, working_days - present)
+                    payroll = Payroll(
+                        employee_id=employee_id,
+                        month=period.month,
+                        year=period.year,
+                        base_salary=base_salary,
+                        days_worked=present + leave,
+                        days_present=present,
+                        days_absent=working_days - present - leave,
+                        days_on_leave=leave,
+                        deductions=(base_salary * Decimal('0.1')).quantize(Decimal('0.01')),
+                        bonuses=Decimal(rng.randrange(1000, 20000, 500)) if rng.random() < 0.1 else Decimal('0.00'),
+                        status='processed' if period == periods[-1] else 'paid',
+                    )
+                    # bulk_create skips Payroll.save(), which fills final_pay
+                    payroll.final_pay = payroll.calculate_final_pay(working_days)
+                    yield payroll
+
+        return self.insert(Payroll, records(), 'payroll')
+
+    def analyze(self):
+        """Refresh planner statistics so EXPLAIN reflects the new volumes"""
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
@@ -0,0 +1,18 @@
+"""
+Prune Revoked Tokens Command
+Deletes revoked refresh tokens that have expired anyway. Running processes
+also prune hourly; use this from cron if the API is mostly idle.
+Run with: python manage.py prune_revoked_tokens
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = "Delete revoked refresh tokens past their expiry"
+
+    def handle(self, *args, **options):
+        deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired revoked tokens"))
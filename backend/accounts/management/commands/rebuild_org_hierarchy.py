@@ -0,0 +1,42 @@
+"""
+Rebuild Org Hierarchy Command
+Recomputes the OrgClosure table from managers and teams and checks consistency
+Run with: python manage.py rebuild_org_hierarchy [--verify-only]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import hierarchy
+from accounts.scope import VisibilityScope
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = "Rebuild the org hierarchy closure table and verify it"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help="Only compare the closure table with managers and teams; exit non-zero on drift",
+        )
+
+    def handle(self, *args, **options):
+        if options['verify_only']:
+            self.report(hierarchy.verify())
+            return
+
+        rows = hierarchy.rebuild()
+        # Every cached scope may have been computed from the old table
+        VisibilityScope.invalidate(*User.objects.values_list('id', flat=True))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} closure rows"))
+        self.report(hierarchy.verify())
+
+    def report(self, mismatches):
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Org hierarchy is consistent"))
+            return
+        for (ancestor_id, descendant_id), (stored, expected) in sorted(mismatches.items()):
+            self.stdout.write(self.style.ERROR(
+                f"ancestor={ancestor_id} descendant={descendant_id}: stored depth {stored}, expected {expected}"
+            ))
+        raise CommandError(f"{len(mismatches)} closure row(s) out of sync")
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_closure(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    OrgClosure = apps.get_model('accounts', 'OrgClosure')
+    parents = {}
+    for user_id, manager_id, team_manager_id in User.objects.values_list(
+        'id', 'manager_id', 'employee_profile__team__manager_id'
+    ):
+        parent_id = manager_id or team_manager_id
+        parents[user_id] = None if parent_id == user_id else parent_id
+
+    rows = []
+    for user_id in parents:
+        rows.append(OrgClosure(ancestor_id=user_id, descendant_id=user_id, depth=0))
+        seen = {user_id}
+        ancestor, depth = parents[user_id], 1
+        while ancestor is not None and ancestor not in seen:
+            rows.append(OrgClosure(ancestor_id=ancestor, descendant_id=user_id, depth=depth))
+            seen.add(ancestor)
+            ancestor, depth = parents.get(ancestor), depth + 1
+    OrgClosure.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_revoked_token'),
+        ('employees', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrgClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='org_descendants', to=settings.AUTH_USER_MODEL)),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='org_ancestors', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Org Closure',
+                'verbose_name_plural': 'Org Closure',
+                'indexes': [models.Index(fields=['ancestor', 'depth', 'descendant'], name='org_closure_ancestor_idx'), models.Index(fields=['descendant', 'depth', 'ancestor'], name='org_closure_descendant_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='org_closure_unique')],
+            },
+        ),
+        migrations.RunPython(populate_closure, migrations.RunPython.noop),
+    ]
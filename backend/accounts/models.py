@@ -26,17 +26,103 @@ class User(AbstractUser):
         help_text="Manager assigned to this user (only for users with role='user')"
     )
 
+    # Bumped whenever role, manager, active flag or password change; access
+    # tokens carrying an older version fall back to a database lookup
+    auth_version = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         verbose_name = "User"
         verbose_name_plural = "Users"
+        indexes = [
+            models.Index(fields=['manager', 'role'], name='user_manager_role_idx'),
+            # Login by email
+            models.Index(fields=['email'], name='user_email_idx'),
+        ]
 
     def __str__(self):
         """String representation of the user"""
         return f"{self.username} ({self.get_role_display()})"
     
     def get_team_members(self):
-        """Get all users assigned to this manager (only for managers)"""
+        """Get everyone reporting to this manager, directly or indirectly (only for managers)"""
         if self.role == 'manager':
-            return User.objects.filter(manager=self)
+            return User.objects.filter(org_ancestors__ancestor=self, org_ancestors__depth__gt=0)
         return User.objects.none()
 
+
+class OrgClosure(models.Model):
+    """
+    Closure table of the reporting hierarchy: one row per (ancestor,
+    descendant) pair, including each user's own depth-0 row. A user reports
+    to User.manager, or failing that to the manager of their team.
+    Maintained by accounts.hierarchy; never edit rows directly.
+    """
+    ancestor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='org_descendants')
+    descendant = models.ForeignKey(User, on_delete=models.CASCADE, related_name='org_ancestors')
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name = "Org Closure"
+        verbose_name_plural = "Org Closure"
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='org_closure_unique'),
+        ]
+        indexes = [
+            # Everyone under X
+            models.Index(fields=['ancestor', 'depth', 'descendant'], name='org_closure_ancestor_idx'),
+            # Everyone above X
+            models.Index(fields=['descendant', 'depth', 'ancestor'], name='org_closure_descendant_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+
+class RevokedToken(models.Model):
+    """
+    A revoked (rotated or logged-out) refresh token, kept until it expires.
+    Read through accounts.revocation rather than queried per request.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Revoked Token"
+        verbose_name_plural = "Revoked Tokens"
+
+    def __str__(self):
+        return self.jti
+
+
+class ClaimsUser(User):
+    """
+    A User built from access-token claims by ClaimsJWTAuthentication.
+    Fields the token doesn't carry are deferred; reading any of them loads
+    all of them with a single query.
+    """
+    CLAIM_FIELDS = ('id', 'username', 'role', 'manager_id', 'auth_version', 'is_active')
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, token):
+        from rest_framework_simplejwt.settings import api_settings
+
+        values = {
+            'id': int(token[api_settings.USER_ID_CLAIM]),
+            'username': token['username'],
+            'role': token['role'],
+            'manager_id': token['manager_id'],
+            'auth_version': token['ver'],
+            'is_active': True,
+        }
+        field_names = [f.attname for f in cls._meta.concrete_fields if f.attname in values]
+        return cls.from_db('default', field_names, [values[name] for name in field_names])
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred.issuperset(fields):
+            fields = deferred
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
@@ -0,0 +1,128 @@
+"""
+Token revocation store
+Tracks revoked refresh-token ids (jti) until the tokens would have expired
+anyway. Each process keeps the unexpired set in memory behind a Bloom
+filter, so checking a token that was never revoked costs a few hash
+probes and no query. RevokedToken persists the set across restarts and
+shares it between processes: every process pulls new rows at most once
+per REVOCATION_SYNC_INTERVAL seconds, and revoke() relies on the table's
+unique jti, so two processes can't both accept the same rotated token.
+Expired rows are deleted as they age out.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import RevokedToken
+
+PRUNE_INTERVAL = 3600
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives)"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(self.size // 8 + 1)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationStore:
+    """In-memory, expiry-bounded view of RevokedToken for one process"""
+
+    def __init__(self, capacity=None, sync_interval=None):
+        self.capacity = capacity or getattr(settings, 'REVOCATION_BLOOM_CAPACITY', 100000)
+        self.sync_interval = sync_interval if sync_interval is not None else getattr(settings, 'REVOCATION_SYNC_INTERVAL', 5)
+        self._lock = threading.Lock()
+        self._expiry = {}
+        self._bloom = BloomFilter(self.capacity)
+        self._last_id = 0
+        self._next_sync = 0.0
+        self._next_prune = 0.0
+
+    def _remember(self, jti, expires_at):
+        self._expiry[jti] = expires_at
+        self._bloom.add(jti)
+
+    def _rebuild(self, now):
+        """Drop expired entries; a Bloom filter can't delete, so it is rebuilt"""
+        self._expiry = {jti: expires for jti, expires in self._expiry.items() if expires > now}
+        self.capacity = max(self.capacity, len(self._expiry) * 2)
+        self._bloom = BloomFilter(self.capacity)
+        for jti in self._expiry:
+            self._bloom.add(jti)
+
+    def sync(self, force=False):
+        """Pull rows revoked by any process since the last sync"""
+        clock = time.monotonic()
+        if not force and clock < self._next_sync:
+            return
+        now = timezone.now()
+        rows = list(
+            RevokedToken.objects.filter(id__gt=self._last_id, expires_at__gt=now)
+            .order_by('id').values_list('id', 'jti', 'expires_at')
+        )
+        with self._lock:
+            for row_id, jti, expires_at in rows:
+                self._remember(jti, expires_at)
+                self._last_id = max(self._last_id, row_id)
+            self._next_sync = clock + self.sync_interval
+            if clock >= self._next_prune or len(self._expiry) > self.capacity:
+                self._rebuild(now)
+                self._next_prune = clock + PRUNE_INTERVAL
+                prune = True
+            else:
+                prune = False
+        if prune:
+            RevokedToken.objects.filter(expires_at__lte=now).delete()
+
+    def is_revoked(self, jti):
+        self.sync()
+        if jti not in self._bloom:
+            return False
+        expires_at = self._expiry.get(jti)
+        return expires_at is not None and expires_at > timezone.now()
+
+    def revoke(self, jti, expires_at):
+        """Record a revocation; returns False if the token was already revoked"""
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            with self._lock:
+                self._remember(jti, expires_at)
+            return False
+        with self._lock:
+            self._remember(jti, expires_at)
+        return True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RevocationStore()
+    return _store
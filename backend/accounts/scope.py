@@ -0,0 +1,171 @@
+"""
+Visibility scope
+Resolves which users, employee profiles and tasks a user may see.
+A scope is computed once per request and cached across requests;
+accounts.signals invalidates it when the org hierarchy or profiles change,
+which only reaches every worker through a shared cache (settings.CACHES).
+SQL filters join the OrgClosure table directly, so they always see the
+current hierarchy; member_ids / employee_ids back the in-Python checks.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+CACHE_KEY = 'visibility_scope:{user_id}'
+REQUEST_ATTR = '_visibility_scope'
+
+
+class VisibilityScope:
+    """
+    Role-based visibility for one user.
+    - admin: everything (member_ids / employee_ids are None)
+    - manager: everyone under them at any depth, plus tasks they created
+    - user: themselves only
+    """
+
+    def __init__(self, user_id, role, member_ids, employee_ids):
+        self.user_id = user_id
+        self.role = role
+        self.member_ids = member_ids
+        self.employee_ids = employee_ids
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def is_manager(self):
+        return self.role == 'manager'
+
+    @classmethod
+    def for_user(cls, user):
+        """Get the scope for a user from the cache, computing it if needed"""
+        key = CACHE_KEY.format(user_id=user.id)
+        cached = cache.get(key)
+        if cached is not None and cached['role'] == user.role:
+            return cls(user.id, user.role, cached['member_ids'], cached['employee_ids'])
+
+        scope = cls.compute(user)
+        cache.set(key, {
+            'role': scope.role,
+            'member_ids': scope.member_ids,
+            'employee_ids': scope.employee_ids,
+        }, settings.INVALIDATED_CACHE_TIMEOUT)
+        return scope
+
+    @classmethod
+    def for_request(cls, request):
+        """Get the scope for the authenticated user, resolved once per request"""
+        scope = getattr(request, REQUEST_ATTR, None)
+        if scope is None or scope.user_id != request.user.id:
+            scope = cls.for_user(request.user)
+            setattr(request, REQUEST_ATTR, scope)
+        return scope
+
+    @classmethod
+    def compute(cls, user):
+        """Build the scope from the database (at most one query)"""
+        from accounts.models import OrgClosure
+        from employees.models import EmployeeProfile
+
+        if user.role == 'admin':
+            return cls(user.id, user.role, None, None)
+
+        if user.role == 'manager':
+            rows = OrgClosure.objects.filter(ancestor_id=user.id, depth__gt=0).values_list(
+                'descendant_id', 'descendant__employee_profile__id'
+            )
+            member_ids = [member_id for member_id, _ in rows]
+            employee_ids = [profile_id for _, profile_id in rows if profile_id is not None]
+            return cls(user.id, user.role, member_ids, employee_ids)
+
+        employee_ids = list(EmployeeProfile.objects.filter(user_id=user.id).values_list('id', flat=True))
+        return cls(user.id, user.role, [user.id], employee_ids)
+
+    @staticmethod
+    def invalidate(*user_ids):
+        """Drop cached scopes for the given users"""
+        keys = [CACHE_KEY.format(user_id=user_id) for user_id in user_ids if user_id]
+        if keys:
+            cache.delete_many(keys)
+
+    def task_filter(self, strategy=None):
+        """
+        Q object selecting the tasks visible to this user.
+        For managers the 'union' strategy matches ids from two index-friendly
+        branches (created by the manager, assigned to the team) instead of
+        OR-ing both predicates; 'or' keeps the plain OR predicate, which
+        SQLite already answers with a multi-index OR. 'auto' picks union on
+        PostgreSQL. See settings.TASK_SCOPE_STRATEGY and the
+        benchmark_task_scope command.
+        """
+        if self.is_admin:
+            return Q()
+        if self.is_manager:
+            strategy = strategy or getattr(settings, 'TASK_SCOPE_STRATEGY', 'auto')
+            if strategy == 'auto':
+                strategy = 'union' if connection.vendor == 'postgresql' else 'or'
+            if strategy == 'union':
+                return Q(id__in=self.manager_task_ids())
+            return Q(created_by_id=self.user_id) | Q(assigned_to_id__in=self.member_subquery())
+        return Q(assigned_to_id=self.user_id)
+
+    def member_subquery(self):
+        """Ids of everyone under a manager, as an indexed OrgClosure subquery"""
+        from accounts.models import OrgClosure
+
+        return OrgClosure.objects.filter(ancestor_id=self.user_id, depth__gt=0).values('descendant_id')
+
+    def employee_subquery(self):
+        """EmployeeProfile ids of everyone under a manager"""
+        from employees.models import EmployeeProfile
+
+        return EmployeeProfile.objects.filter(user_id__in=self.member_subquery()).values('id')
+
+    def manager_task_ids(self):
+        """UNION of task ids created by the manager and assigned to their team"""
+        from tasks.models import Task
+
+        created = Task.objects.filter(created_by_id=self.user_id).order_by().values('id')
+        if not self.member_ids:
+            return created
+        assigned = Task.objects.filter(assigned_to_id__in=self.member_subquery()).order_by().values('id')
+        return created.union(assigned)
+
+    def filter_tasks(self, queryset, strategy=None):
+        if self.is_admin:
+            return queryset
+        return queryset.filter(self.task_filter(strategy))
+
+    def filter_employee_records(self, queryset, field='employee_id'):
+        """Restrict a queryset with an EmployeeProfile foreign key (attendance, payroll)"""
+        if self.is_admin:
+            return queryset
+        if self.is_manager:
+            return queryset.filter(**{f'{field}__in': self.employee_subquery()})
+        return queryset.filter(**{f'{field}__in': self.employee_ids})
+
+    def sees_task(self, assigned_to_id, created_by_id):
+        """task_filter() evaluated in Python, for a task's assignee and creator ids"""
+        if self.is_admin:
+            return True
+        if self.is_manager:
+            return created_by_id == self.user_id or (
+                assigned_to_id is not None and assigned_to_id in self.member_ids
+            )
+        return assigned_to_id == self.user_id
+
+    def sees_employee(self, employee_id):
+        """filter_employee_records() evaluated in Python, for one EmployeeProfile id"""
+        return self.is_admin or employee_id in self.employee_ids
+
+    def can_manage_task(self, task):
+        """Whether this user may edit or delete a task beyond its status"""
+        if self.is_admin:
+            return True
+        if self.is_manager:
+            return task.created_by_id == self.user_id or (
+                task.assigned_to_id is not None and task.assigned_to_id in self.member_ids
+            )
+        return False
@@ -1,5 +1,15 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.db.models import Case, Q, Value, When
+from rest_framework.exceptions import AuthenticationFailed, Throttled
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from . import hierarchy
+from .authentication import add_user_claims
+from .hashing import HashingBusy, burn_hash, verify_password
+from .revocation import get_store
 from .models import User
 from django.contrib.auth.hashers import make_password
 
@@ -11,6 +21,33 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     username_field = 'username'
 
+    @classmethod
+    def get_token(cls, user):
+        """Carry role, manager and auth version so requests needn't load the user"""
+        return add_user_claims(super().get_token(user), user)
+
+    @staticmethod
+    def find_user(login):
+        """Username or email match in one indexed query; a username match wins"""
+        return (
+            User.objects.select_related('manager')
+            .filter(Q(username=login) | Q(email=login))
+            .annotate(username_match=Case(When(username=login, then=Value(0)), default=Value(1)))
+            .order_by('username_match', 'id')
+            .first()
+        )
+
+    @staticmethod
+    def check_password_bounded(password, encoded):
+        """Verify on the shared hashing pool; answers 429 when the pool is saturated"""
+        try:
+            if encoded is None:
+                burn_hash(password)
+                return False, False
+            return verify_password(password, encoded)
+        except HashingBusy:
+            raise Throttled(wait=1)
+
     def validate(self, attrs):
         """
         Override validate to support email/username login
@@ -30,34 +67,34 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
                 'password': 'This field is required.'
             })
 
-        # Try to find user by username first, then by email
-        user = None
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            try:
-                user = User.objects.get(email=username)
-                # Update attrs to use the actual username for authentication
-                attrs['username'] = user.username
-            except User.DoesNotExist:
-                raise serializers.ValidationError({
-                    'username': 'No active account found with the given credentials'
-                })
+        user = self.find_user(username)
+        if user is None:
+            # Spend the same hashing time as a real check
+            self.check_password_bounded(password, None)
+            raise serializers.ValidationError({
+                'username': 'No active account found with the given credentials'
+            })
 
-        # Authenticate with the username and password
-        from django.contrib.auth import authenticate
-        authenticated_user = authenticate(username=user.username, password=password)
-        
-        if not authenticated_user:
+        valid, needs_upgrade = self.check_password_bounded(password, user.password)
+        if not valid:
             raise serializers.ValidationError({
                 'password': 'Invalid password'
             })
 
-        if not authenticated_user.is_active:
+        if not user.is_active:
             raise serializers.ValidationError({
                 'username': 'User account is disabled'
             })
 
+        if needs_upgrade:
+            # Re-hash with the preferred hasher, as authenticate() would
+            user.set_password(password)
+            user.save(update_fields=['password'])
+
+        # Reused by the view for the response payload
+        self.user = user
+        authenticated_user = user
+
         # Get token data
         refresh = self.get_token(authenticated_user)
         data = {
@@ -68,6 +105,54 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh that re-reads the user, so new access tokens carry current
+    role / manager / auth version claims instead of copies from login.
+    Revoked refresh tokens are refused, and with BLACKLIST_AFTER_ROTATION
+    the presented token is revoked as it is rotated.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        store = get_store()
+        jti = refresh[api_settings.JTI_CLAIM]
+        if store.is_revoked(jti):
+            raise InvalidToken("Token has been revoked")
+        user = User.objects.filter(pk=refresh.payload.get(api_settings.USER_ID_CLAIM)).first()
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        add_user_claims(refresh, user)
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION and not store.revoke(jti, token_expiry(refresh)):
+                # Another request rotated this token first
+                raise InvalidToken("Token has been revoked")
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    """Revoke a refresh token (logout)"""
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            refresh = RefreshToken(attrs['refresh'])
+        except TokenError as e:
+            raise serializers.ValidationError({'refresh': e.args[0]})
+        get_store().revoke(refresh[api_settings.JTI_CLAIM], token_expiry(refresh))
+        return {}
+
+
+def token_expiry(token):
+    return datetime_from_epoch(token['exp'])
+
+
 # Serializer for user registration
 class RegisterSerializer(serializers.ModelSerializer):
     """
@@ -97,6 +182,19 @@ class RegisterSerializer(serializers.ModelSerializer):
             validated_data["username"] = validated_data["email"]
         return User.objects.create(**validated_data)
 
+# Serializer for the nested manager summary
+class ManagerSerializer(serializers.ModelSerializer):
+    """
+    Compact manager details nested inside UserSerializer.
+    Only plain columns, so rendering it never triggers extra queries.
+    """
+
+    class Meta:
+        model = User
+        fields = ["id", "username", "email", "first_name", "last_name", "role"]
+        read_only_fields = fields
+
+
 # Serializer for user data (without password)
 class UserSerializer(serializers.ModelSerializer):
     """
@@ -104,13 +202,13 @@ class UserSerializer(serializers.ModelSerializer):
     Excludes password field for security.
     """
     name = serializers.SerializerMethodField()
+    manager = ManagerSerializer(read_only=True)
     manager_name = serializers.SerializerMethodField()
     
     class Meta:
         model = User
         fields = ["id", "username", "email", "first_name", "last_name", "role", "name", "manager", "manager_name"]
         read_only_fields = ["id"]
-        depth = 1  # Include nested manager object details
     
     def get_name(self, obj):
         """Get full name or username if name not available"""
@@ -146,13 +244,16 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         }
     
     def validate_manager_id(self, value):
-        """Validate that manager_id refers to a user with manager role"""
+        """Validate that manager_id refers to a user with manager role, outside the user's own reports"""
         if value is not None:
             try:
                 manager = User.objects.get(id=value, role='manager')
-                return value
             except User.DoesNotExist:
                 raise serializers.ValidationError("Manager ID must refer to a user with manager role.")
+            if self.instance is not None and (
+                manager.pk == self.instance.pk or hierarchy.is_under(manager.pk, self.instance.pk)
+            ):
+                raise serializers.ValidationError("A user cannot report to themselves or to one of their reports.")
         return value
 
     def update(self, instance, validated_data):
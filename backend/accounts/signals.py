@@ -0,0 +1,152 @@
+"""
+Signal handlers for the accounts app
+Keeps the org hierarchy and cached visibility scopes in sync with manager,
+team and profile changes, and bumps User.auth_version when token claims
+go stale
+"""
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import hierarchy
+from .authentication import forget_auth_version
+from .models import ClaimsUser, OrgClosure, User
+from .scope import VisibilityScope
+
+SCOPE_FIELDS = {'manager', 'manager_id', 'role'}
+# Fields whose change invalidates issued access tokens
+AUTH_FIELDS = ('manager_id', 'role', 'is_active', 'password')
+
+
+def touches(update_fields, fields):
+    return update_fields is None or bool(set(fields).intersection(update_fields))
+
+
+def reattach(*user_ids):
+    """Move users below their current parent and drop the scopes that changed"""
+    affected = set()
+    for user_id in user_ids:
+        affected |= hierarchy.move(user_id)
+    VisibilityScope.invalidate(*affected)
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=ClaimsUser)
+def remember_previous_state(sender, instance, update_fields=None, **kwargs):
+    """Record the stored manager and auth fields so post_save can compare"""
+    instance._previous_manager_id = None
+    instance._previous_auth_state = None
+    if not instance.pk or not touches(update_fields, SCOPE_FIELDS | {'is_active', 'password'}):
+        return
+    instance._previous_auth_state = (
+        User.objects.filter(pk=instance.pk).values_list(*AUTH_FIELDS).first()
+    )
+    if instance._previous_auth_state:
+        instance._previous_manager_id = instance._previous_auth_state[0]
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=ClaimsUser)
+def invalidate_user_scope(sender, instance, update_fields=None, **kwargs):
+    if not touches(update_fields, SCOPE_FIELDS):
+        return
+    VisibilityScope.invalidate(
+        instance.pk,
+        instance.manager_id,
+        getattr(instance, '_previous_manager_id', None),
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=ClaimsUser)
+def update_org_hierarchy(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        VisibilityScope.invalidate(*hierarchy.add_user(instance.pk))
+    elif touches(update_fields, SCOPE_FIELDS) and instance.manager_id != getattr(instance, '_previous_manager_id', None):
+        reattach(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=ClaimsUser)
+def bump_auth_version(sender, instance, created, update_fields=None, **kwargs):
+    previous = getattr(instance, '_previous_auth_state', None)
+    if created or previous is None:
+        return
+    loaded = instance.__dict__
+    if all(loaded.get(field, old) == old for field, old in zip(AUTH_FIELDS, previous)):
+        return
+    User.objects.filter(pk=instance.pk).update(auth_version=F('auth_version') + 1)
+    instance.__dict__.pop('auth_version', None)
+    forget_auth_version(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+@receiver(pre_delete, sender=ClaimsUser)
+def remember_org_position(sender, instance, **kwargs):
+    """Direct reports lose their parent (SET_NULL runs without signals) and are re-attached after the delete"""
+    instance._org_ancestors = hierarchy.ancestor_ids(instance.pk)
+    instance._org_reports = list(
+        OrgClosure.objects.filter(ancestor_id=instance.pk, depth=1).values_list('descendant_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=ClaimsUser)
+def invalidate_deleted_user_scope(sender, instance, **kwargs):
+    VisibilityScope.invalidate(instance.pk, instance.manager_id, *getattr(instance, '_org_ancestors', ()))
+    forget_auth_version(instance.pk)
+    reattach(*getattr(instance, '_org_reports', ()))
+
+
+@receiver(pre_save, sender='employees.Team')
+def remember_team_manager(sender, instance, **kwargs):
+    instance._previous_manager_id = (
+        sender.objects.filter(pk=instance.pk).values_list('manager_id', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender='employees.Team')
+def move_team_members(sender, instance, created, raw=False, **kwargs):
+    """Members without a direct manager report to their team's manager"""
+    if raw or instance.manager_id == getattr(instance, '_previous_manager_id', None):
+        return
+    reattach(*instance.employees.values_list('user_id', flat=True))
+
+
+@receiver(pre_delete, sender='employees.Team')
+def remember_team_members(sender, instance, **kwargs):
+    instance._member_ids = list(instance.employees.values_list('user_id', flat=True))
+
+
+@receiver(post_delete, sender='employees.Team')
+def move_former_team_members(sender, instance, **kwargs):
+    reattach(*getattr(instance, '_member_ids', ()))
+
+
+@receiver(pre_save, sender='employees.EmployeeProfile')
+def remember_profile_team(sender, instance, **kwargs):
+    instance._previous_team_id = (
+        sender.objects.filter(pk=instance.pk).values_list('team_id', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender='employees.EmployeeProfile')
+def update_profile_hierarchy(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created or instance.team_id != getattr(instance, '_previous_team_id', None):
+        reattach(instance.user_id)
+
+
+@receiver(post_delete, sender='employees.EmployeeProfile')
+def move_deleted_profile_user(sender, instance, **kwargs):
+    reattach(instance.user_id)
+
+
+@receiver(post_save, sender='employees.EmployeeProfile')
+@receiver(post_delete, sender='employees.EmployeeProfile')
+def invalidate_profile_scope(sender, instance, **kwargs):
+    """A new or removed profile changes the employee ids visible to the user and everyone above them"""
+    VisibilityScope.invalidate(instance.user_id, *hierarchy.ancestor_ids(instance.user_id))
@@ -1,3 +1,355 @@
-from django.test import TestCase
+import time
+from datetime import date
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.query_plans import QueryPlanAssertions, account_queries
+from employees.models import Attendance, EmployeeProfile, Team
+from tasks.models import Task
+from . import hierarchy
+from . import hashing
+from .authentication import ClaimsJWTAuthentication
+from .checks import check_shared_cache
+from .models import ClaimsUser, OrgClosure, RevokedToken, User
+from .scope import VisibilityScope
+from .revocation import RevocationStore
+from .serializers import CustomTokenObtainPairSerializer
+
+
+class AccountQueryPlanTests(QueryPlanAssertions, TestCase):
+    def test_hot_queries_use_an_index(self):
+        for name, queryset in account_queries():
+            with self.subTest(name):
+                self.assertUsesIndex(name, queryset)
+
+
+class ClaimsAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create(username='manager', role='manager')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def access_token(self, user):
+        return str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+
+    def authenticate(self, token):
+        return ClaimsJWTAuthentication().get_user(AccessToken(token))
+
+    def test_current_claims_need_no_query(self):
+        token = self.access_token(self.manager)
+        self.authenticate(token)
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+        self.assertIsInstance(user, ClaimsUser)
+        self.assertEqual((user.pk, user.role), (self.manager.pk, 'manager'))
+
+    def test_stale_version_falls_back_to_the_database(self):
+        token = self.access_token(self.manager)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get('/api/accounts/users/').status_code, 200)
+
+        self.manager.role = 'user'
+        self.manager.save()
+        self.manager.refresh_from_db()
+        self.assertEqual(self.manager.auth_version, 1)
+        user = self.authenticate(token)
+        self.assertNotIsInstance(user, ClaimsUser)
+        self.assertEqual(user.role, 'user')
+        # The token still claims 'manager', but the demotion applies at once
+        self.assertEqual(self.client.get('/api/accounts/users/').status_code, 403)
+
+    def test_inactive_user_is_rejected(self):
+        token = self.access_token(self.manager)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get('/api/tasks/').status_code, 200)
+        self.manager.is_active = False
+        self.manager.save()
+        self.assertEqual(self.client.get('/api/tasks/').status_code, 401)
+
+
+    def test_deactivation_by_another_worker_expires_from_the_cache(self):
+        token = self.access_token(self.manager)
+        self.authenticate(token)
+        # An update that doesn't invalidate this process's cache, as in another worker
+        User.objects.filter(pk=self.manager.pk).update(is_active=False)
+        self.assertIsInstance(self.authenticate(token), ClaimsUser)
+        # Without a shared cache (as in the tests) cached versions live for seconds, not minutes
+        later = time.time() + 10
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate(token)
+
+class RefreshRevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='member', role='user')
+
+    def setUp(self):
+        cache.clear()
+        # A fresh process-wide store, so no revocations leak between tests
+        self.store = RevocationStore()
+        patcher = mock.patch('accounts.serializers.get_store', side_effect=lambda: self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.refresh_token = str(CustomTokenObtainPairSerializer.get_token(self.user))
+
+    def refresh(self, token):
+        return self.client.post('/api/token/refresh/', {'refresh': token}, format='json')
+
+    def test_rotated_token_cannot_be_replayed(self):
+        response = self.refresh(self.refresh_token)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data['refresh'], self.refresh_token)
+        self.assertEqual(self.refresh(self.refresh_token).status_code, 401)
+        self.assertEqual(self.refresh(response.data['refresh']).status_code, 200)
+
+    def test_replay_through_an_unsynced_store_is_rejected(self):
+        other_process = RevocationStore(sync_interval=3600)
+        other_process.sync(force=True)
+        self.assertEqual(self.refresh(self.refresh_token).status_code, 200)
+        self.assertEqual(RevokedToken.objects.count(), 1)
+
+        # The other process hasn't pulled the revocation yet; the unique jti still refuses it
+        self.store = other_process
+        self.assertEqual(self.refresh(self.refresh_token).status_code, 401)
+        self.assertEqual(RevokedToken.objects.count(), 1)
+
+    def test_revoke_prevents_refresh(self):
+        response = self.client.post('/api/token/revoke/', {'refresh': self.refresh_token}, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.refresh(self.refresh_token).status_code, 401)
+
+    def test_revoked_token_is_seen_by_other_processes_after_sync(self):
+        self.client.post('/api/token/revoke/', {'refresh': self.refresh_token}, format='json')
+        other_process = RevocationStore(sync_interval=0)
+        jti = RevokedToken.objects.get().jti
+        self.assertTrue(other_process.is_revoked(jti))
+        self.assertFalse(other_process.is_revoked('never-revoked'))
+
+    def test_inactive_user_cannot_refresh(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.refresh(self.refresh_token).status_code, 401)
+
+
+class OrgHierarchyTests(TestCase):
+    """The incrementally maintained OrgClosure always equals a full rebuild"""
+
+    def setUp(self):
+        cache.clear()
+        self.director = User.objects.create(username='director', role='manager')
+        self.first = User.objects.create(username='first', role='manager', manager=self.director)
+        self.second = User.objects.create(username='second', role='manager', manager=self.director)
+        self.lead = User.objects.create(username='lead', role='user', manager=self.first)
+        self.member = User.objects.create(username='member', role='user', manager=self.lead)
+
+    def profile(self, user, team=None):
+        return EmployeeProfile.objects.create(
+            user=user, employee_id=f'E-{user.username}', date_of_joining=date(2024, 1, 1), team=team
+        )
+
+    def assertConsistent(self):
+        self.assertEqual(hierarchy.verify(), {})
+        out = StringIO()
+        call_command('rebuild_org_hierarchy', verify_only=True, stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+    def assertAncestors(self, user, expected):
+        self.assertEqual(hierarchy.ancestor_ids(user.pk), [ancestor.pk for ancestor in expected])
+
+    def test_initial_tree(self):
+        self.assertAncestors(self.member, [self.lead, self.first, self.director])
+        self.assertConsistent()
+
+    def test_manager_change_moves_the_subtree(self):
+        self.lead.manager = self.second
+        self.lead.save()
+        self.assertAncestors(self.member, [self.lead, self.second, self.director])
+        self.assertConsistent()
+        self.lead.manager = None
+        self.lead.save()
+        self.assertAncestors(self.member, [self.lead])
+        self.assertConsistent()
+
+    def test_team_change(self):
+        first_team = Team.objects.create(name='First', manager=self.first)
+        second_team = Team.objects.create(name='Second', manager=self.second)
+        newcomer = User.objects.create(username='newcomer', role='user')
+        profile = self.profile(newcomer, first_team)
+        self.assertAncestors(newcomer, [self.first, self.director])
+        self.assertConsistent()
+        profile.team = second_team
+        profile.save()
+        self.assertAncestors(newcomer, [self.second, self.director])
+        self.assertConsistent()
+        # A direct manager wins over the team
+        newcomer.manager = self.lead
+        newcomer.save()
+        self.assertAncestors(newcomer, [self.lead, self.first, self.director])
+        self.assertConsistent()
+        profile.delete()
+        newcomer.manager = None
+        newcomer.save()
+        self.assertAncestors(newcomer, [])
+        self.assertConsistent()
+
+    def test_team_manager_change(self):
+        team = Team.objects.create(name='Team', manager=self.first)
+        members = [User.objects.create(username=f'teammate{number}', role='user') for number in range(3)]
+        for member in members:
+            self.profile(member, team)
+        team.manager = self.second
+        team.save()
+        for member in members:
+            self.assertAncestors(member, [self.second, self.director])
+        self.assertConsistent()
+        team.delete()
+        for member in members:
+            self.assertAncestors(member, [])
+        self.assertConsistent()
+
+    def test_delete_reattaches_reports(self):
+        team = Team.objects.create(name='Team', manager=self.second)
+        self.profile(self.lead, team)
+        # lead's direct manager goes away; the team manager takes over
+        self.first.delete()
+        self.assertAncestors(self.member, [self.lead, self.second, self.director])
+        self.assertConsistent()
+        self.director.delete()
+        self.assertAncestors(self.member, [self.lead, self.second])
+        self.assertConsistent()
+
+    def test_team_based_loop_is_broken_and_healed(self):
+        # first manages a team that their own manager (director) belongs to
+        team = Team.objects.create(name='Loop', manager=self.first)
+        with self.assertLogs('accounts.hierarchy', 'WARNING'):
+            self.profile(self.director, team)
+        self.assertAncestors(self.director, [])
+        self.assertAncestors(self.first, [self.director])
+        self.assertConsistent()
+        call_command('rebuild_org_hierarchy', stdout=StringIO())
+        self.assertAncestors(self.director, [])
+        self.assertConsistent()
+
+        # Once first leaves the director, the director can report to first's team
+        self.first.manager = None
+        self.first.save()
+        self.assertAncestors(self.director, [self.first])
+        self.assertAncestors(self.second, [self.director, self.first])
+        self.assertConsistent()
+
+    def test_rebuild_repairs_drift(self):
+        OrgClosure.objects.filter(descendant=self.member, depth__gt=1).delete()
+        self.assertNotEqual(hierarchy.verify(), {})
+        call_command('rebuild_org_hierarchy', stdout=StringIO())
+        self.assertAncestors(self.member, [self.lead, self.first, self.director])
+        self.assertConsistent()
+
+    def test_director_sees_two_levels_down(self):
+        profile = self.profile(self.member)
+        task = Task.objects.create(title='Deep task', created_by=self.member, assigned_to=self.member)
+        Attendance.objects.create(employee=profile, date=date(2024, 5, 2), status='present')
+        other = Task.objects.create(
+            title='Elsewhere', created_by=self.second, assigned_to=User.objects.create(username='stranger')
+        )
+
+        scope = VisibilityScope.for_user(self.director)
+        self.assertCountEqual(scope.member_ids, [self.first.pk, self.second.pk, self.lead.pk, self.member.pk])
+        self.assertEqual(scope.employee_ids, [profile.pk])
+        self.assertTrue(scope.sees_task(task.assigned_to_id, task.created_by_id))
+        self.assertFalse(scope.sees_task(other.assigned_to_id, other.created_by_id))
+
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {CustomTokenObtainPairSerializer.get_token(self.director).access_token}'
+        )
+        tasks = client.get('/api/tasks/').data['results']
+        self.assertEqual([row['id'] for row in tasks], [task.pk])
+        attendance = client.get('/api/attendance/').data['results']
+        self.assertEqual([row['employee']['id'] for row in attendance], [profile.pk])
+
+        # A sibling manager's scope does not reach into first's subtree
+        self.assertFalse(VisibilityScope.for_user(self.second).sees_task(task.assigned_to_id, task.created_by_id))
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_per_process_cache_is_reported(self):
+        self.assertEqual([message.id for message in check_shared_cache(None)], ['accounts.W001'])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/0',
+    }})
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create(username='manager', role='manager')
+        cls.user = User.objects.create(
+            username='member', email='member@example.com', role='user', manager=cls.manager
+        )
+        cls.user.set_password('secret-pass')
+        cls.user.save()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self, username, password='secret-pass'):
+        return self.client.post('/api/token/', {'username': username, 'password': password}, format='json')
+
+    def test_login_by_username_or_email_in_one_query(self):
+        for login in ('member', 'member@example.com'):
+            with self.subTest(login=login):
+                with self.assertNumQueries(1):
+                    response = self.login(login)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(AccessToken(response.data['access'])['user_id'], str(self.user.pk))
+                self.assertIn('refresh', response.data)
+                self.assertEqual(response.data['user']['username'], 'member')
+
+    def test_wrong_password(self):
+        response = self.login('member', 'wrong')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'password': ['Invalid password']})
+
+    def test_inactive_user(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.login('member')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'username': ['User account is disabled']})
+
+    def test_unknown_username_still_hashes(self):
+        with mock.patch('accounts.serializers.burn_hash', wraps=hashing.burn_hash) as burn_hash:
+            response = self.login('nobody')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'username': ['No active account found with the given credentials']})
+        burn_hash.assert_called_once_with('secret-pass')
+
+    def test_saturated_pool_answers_429(self):
+        _, slots = hashing.get_pool()
+        held = 0
+        while slots.acquire(blocking=False):
+            held += 1
+        try:
+            response = self.login('member')
+        finally:
+            for _ in range(held):
+                slots.release()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.login('member').status_code, 200)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import RegisterView, UserListView, UserDetailView
+from .views import RegisterView, UserListView, UserDetailView, OrgChartView
 
 urlpatterns = [
     # Public endpoints
@@ -8,4 +8,7 @@ urlpatterns = [
     # Admin-only endpoints for user management
     path("users/", UserListView.as_view(), name="user_list"),
     path("users/<int:pk>/", UserDetailView.as_view(), name="user_detail"),
+
+    # Reporting hierarchy (scoped to the caller below admin)
+    path("org-chart/", OrgChartView.as_view(), name="org_chart"),
 ]
@@ -1,14 +1,18 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.views import TokenObtainPairView
+from . import hierarchy
 from .models import User
+from .scope import VisibilityScope
 from .serializers import (
     RegisterSerializer, 
     UserSerializer, 
     UserUpdateSerializer,
-    CustomTokenObtainPairSerializer
+    CustomTokenObtainPairSerializer,
+    TokenRevokeSerializer,
 )
 from tasks.permissions import IsAdmin, IsManagerOrAdmin
 
@@ -17,19 +21,27 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
     def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        if response.status_code == 200:
-            try:
-                username = request.data.get('username') or request.data.get('email')
-                try:
-                    user = User.objects.get(username=username)
-                except User.DoesNotExist:
-                    user = User.objects.get(email=username)
-                user_serializer = UserSerializer(user)
-                response.data['user'] = user_serializer.data
-            except (User.DoesNotExist, Exception) as e:
-                pass
-        return response
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        data = dict(serializer.validated_data)
+        # The serializer already loaded the user (with its manager)
+        data['user'] = UserSerializer(serializer.user).data
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class TokenRevokeView(generics.GenericAPIView):
+    """Revoke a refresh token (logout); it can no longer be refreshed"""
+    serializer_class = TokenRevokeSerializer
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class RegisterView(generics.CreateAPIView):
@@ -41,7 +53,7 @@ class RegisterView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
-        refresh = RefreshToken.for_user(user)
+        refresh = CustomTokenObtainPairSerializer.get_token(user)
         user_serializer = UserSerializer(user)
         return Response({
             'user': user_serializer.data,
@@ -58,9 +70,10 @@ class UserListView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.role == "admin":
-            return User.objects.all().order_by('username')
+            return User.objects.select_related('manager').order_by('username')
         elif user.role == "manager":
-            return User.objects.filter(manager=user).order_by('username')
+            scope = VisibilityScope.for_request(self.request)
+            return User.objects.filter(id__in=scope.member_subquery()).select_related('manager').order_by('username')
         else:
             return User.objects.none()
     
@@ -102,4 +115,27 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
         """
         if self.request.method == 'GET':
             return UserSerializer
-        return UserUpdateSerializer
\ No newline at end of file
+        return UserUpdateSerializer
+
+
+class OrgChartView(APIView):
+    """
+    The reporting tree, read with one query.
+    Admins get the whole organization (or ?root=<user id>); everyone else
+    gets the tree below themselves, or below ?root= if that user reports to them.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        root_id = request.query_params.get('root')
+        if root_id is not None:
+            try:
+                root_id = int(root_id)
+            except ValueError:
+                return Response({"error": "root must be a user id."}, status=status.HTTP_400_BAD_REQUEST)
+            if user.role != "admin" and root_id != user.id and not hierarchy.is_under(root_id, user.id):
+                return Response({"error": "User not found in your organization."}, status=status.HTTP_404_NOT_FOUND)
+        elif user.role != "admin":
+            root_id = user.id
+        return Response(hierarchy.org_tree(root_id))
@@ -0,0 +1,130 @@
+"""
+Change events
+Publish/subscribe fan-out for the task and attendance change feed.
+Writers publish small events after their transaction commits; every open
+feed connection holds a Subscription and filters events by visibility.
+The broker class is chosen by settings.EVENT_BROKER, so the in-process
+broker can be swapped for one backed by an external message bus.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+QUEUE_SIZE = 100
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Subscription:
+    """
+    One subscriber's bounded queue, bound to the event loop it was created on.
+    If the subscriber falls QUEUE_SIZE events behind, the backlog is dropped
+    and `overflowed` is set so the client can resync instead.
+    """
+
+    def __init__(self, broker, loop, queue_size=QUEUE_SIZE):
+        self.broker = broker
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def push(self, event):
+        """Hand an event over from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The subscriber's loop is gone
+            self.close()
+
+    def _put(self, event):
+        if self.queue.full():
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        """Next event, or None if nothing arrived within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Fans events out to subscribers in this process only.
+    With several worker processes each one sees only its own writes, so
+    multi-process deployments should point EVENT_BROKER at a shared broker
+    implementing the same publish/subscribe/unsubscribe methods.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self):
+        """Register a subscriber; must be called from the consuming event loop"""
+        subscription = Subscription(self, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(event)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'EVENT_BROKER', 'core.events.InProcessBroker'))()
+    return _broker
+
+
+def publish(event):
+    """Publish once the current transaction commits (immediately outside one)"""
+    transaction.on_commit(lambda: get_broker().publish(event))
+
+
+def task_event(action, task_id, assigned_to_id, created_by_id, status=None, previous_assigned_to_id=None):
+    return {
+        'topic': 'tasks',
+        'action': action,
+        'id': task_id,
+        'status': status,
+        'assigned_to_id': assigned_to_id,
+        'created_by_id': created_by_id,
+        'previous_assigned_to_id': previous_assigned_to_id,
+    }
+
+
+def attendance_event(action, attendance_id, employee_id, date=None, status=None):
+    return {
+        'topic': 'attendance',
+        'action': action,
+        'id': attendance_id,
+        'employee_id': employee_id,
+        'date': date.isoformat() if date else None,
+        'status': status,
+    }
@@ -0,0 +1,105 @@
+"""
+Change feed
+GET /api/events/ is a server-sent events stream of task and attendance
+changes, filtered by the same visibility rules as the list endpoints.
+It is an async view served through core.asgi (the Procfile runs gunicorn
+with uvicorn workers), so an open stream doesn't hold a worker. Under WSGI
+Django would have to consume the endless stream before sending anything,
+so the feed answers 501 there.
+
+Events only say what changed (topic, action, ids, status); clients refetch
+or delta-sync (GET /api/tasks/?updated_since=...) for full objects, and
+should do so on reconnect or on a `resync` event.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from accounts.authentication import ClaimsJWTAuthentication
+from accounts.scope import VisibilityScope
+from .events import get_broker
+
+TOPICS = ('tasks', 'attendance')
+RETRY_MS = 5000
+
+
+def get_raw_token(request):
+    """Bearer header, or ?token= because EventSource cannot send headers"""
+    authentication = ClaimsJWTAuthentication()
+    header = authentication.get_header(request)
+    if header is not None:
+        return authentication.get_raw_token(header)
+    token = request.GET.get('token')
+    return token.encode('utf-8') if token else None
+
+
+def authenticate(request):
+    raw_token = get_raw_token(request)
+    if raw_token is None:
+        return None
+    authentication = ClaimsJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (AuthenticationFailed, InvalidToken):
+        return None
+
+
+def is_visible(scope, event):
+    if event['topic'] == 'tasks':
+        return scope.sees_task(event['assigned_to_id'], event['created_by_id']) or (
+            event['previous_assigned_to_id'] is not None
+            and scope.sees_task(event['previous_assigned_to_id'], event['created_by_id'])
+        )
+    return scope.sees_employee(event['employee_id'])
+
+
+def format_event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+async def event_stream(user, subscription, topics):
+    heartbeat = getattr(settings, 'EVENT_STREAM_HEARTBEAT', 15)
+    scope = await sync_to_async(VisibilityScope.for_user)(user)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            event = await subscription.get(heartbeat)
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield format_event('resync', {})
+                continue
+            if event is None:
+                # Pick up team changes (the scope is cached, so this rarely queries)
+                scope = await sync_to_async(VisibilityScope.for_user)(user)
+                yield ": keepalive\n\n"
+                continue
+            if event['topic'] in topics and is_visible(scope, event):
+                yield format_event(event['topic'], event)
+    finally:
+        subscription.close()
+
+
+async def change_feed(request):
+    """Stream change events; ?topics=tasks,attendance narrows the feed"""
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+    if isinstance(request, WSGIRequest):
+        return JsonResponse({"error": "The change feed is only served by the ASGI application (core.asgi)."}, status=501)
+    user = await sync_to_async(authenticate)(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication credentials were not provided or are invalid."}, status=401)
+
+    requested = request.GET.get('topics')
+    topics = set(requested.split(',')) & set(TOPICS) if requested else set(TOPICS)
+    if not topics:
+        return JsonResponse({"error": f"Unknown topics. Use any of: {', '.join(TOPICS)}."}, status=400)
+
+    subscription = get_broker().subscribe()
+    response = StreamingHttpResponse(event_stream(user, subscription, topics), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
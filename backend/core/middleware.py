@@ -104,7 +104,7 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
         # Only process API requests
         if request.path.startswith('/api/'):
             # Skip authentication endpoints
-            if request.path in ['/api/token/', '/api/token/refresh/', '/api/accounts/signup/']:
+            if request.path in ['/api/token/', '/api/token/refresh/', '/api/token/revoke/', '/api/accounts/signup/']:
                 return None
             
             # Check for Authorization header
@@ -0,0 +1,176 @@
+"""
+Pagination classes shared by the list endpoints
+Adds an opt-in keyset (cursor) mode next to the default page-number pagination
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over a fixed, unique ordering.
+    The cursor encodes the ordering values of the last row on the page, so the
+    next page is a range predicate on an index instead of an OFFSET scan.
+    Rows inserted while a client is paging never shift or duplicate results.
+    """
+    page_size = PageNumberPagination.page_size
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'include_count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=('-created_at', '-id')):
+        self.ordering = tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+
+        # Only count when the client explicitly asks for it
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true', 'True'):
+            self.count = queryset.count()
+
+        cursor = self.decode_cursor(request, queryset.model)
+        if cursor is not None:
+            queryset = queryset.filter(self.build_keyset_filter(cursor))
+
+        # Fetch one extra row to know whether there is a next page
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        page_size = request.query_params.get(self.page_size_query_param)
+        try:
+            page_size = int(page_size)
+        except (TypeError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_field_names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def build_keyset_filter(self, values):
+        """
+        Build the lexicographic "after this row" predicate, e.g. for
+        ('-created_at', '-id'): created_at < c OR (created_at = c AND id < i)
+        """
+        condition = Q()
+        equal_prefix = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal_prefix, **{f'{name}__{lookup}': value})
+            equal_prefix[name] = value
+        return condition
+
+    def decode_cursor(self, request, model):
+        """The cursor's ordering values, converted with each field's to_python()"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        fields = [model._meta.get_field(name) for name in self.get_field_names()]
+        try:
+            values = [field.to_python(value) for field, value in zip(fields, values)]
+        except (TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def encode_cursor(self, instance):
+        values = []
+        for name in self.get_field_names():
+            value = getattr(instance, name)
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            values.append(value)
+        encoded = base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link()}
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination by default, keyset pagination on request.
+    Clients opt in with ?pagination=cursor (first page) and then follow the
+    returned `next` links, which carry a ?cursor= parameter.
+    Views declare their unique ordering with a `keyset_ordering` attribute.
+    """
+    mode_query_param = 'pagination'
+    default_keyset_ordering = ('-created_at', '-id')
+
+    def __init__(self):
+        self.keyset = None
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            ordering = getattr(view, 'keyset_ordering', self.default_keyset_ordering)
+            self.keyset = KeysetPagination(ordering)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset is not None:
+            return None
+        return super().get_previous_link()
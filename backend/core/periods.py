@@ -0,0 +1,151 @@
+"""
+Reporting periods
+Turns ?year / ?month / ?quarter / ?week / ?start_date / ?end_date into a
+half-open date range [start, end) and applies it as plain range predicates,
+so the date index is used. Filtering with date__month wraps the column in
+EXTRACT / strftime, which no index can serve. Payroll is keyed by
+(year, month) integers instead of a date; filter_months() matches the same
+period on that composite key.
+"""
+from datetime import date, timedelta
+from typing import NamedTuple, Optional
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+
+class Period(NamedTuple):
+    """Half-open [start, end); either bound may be None (unbounded)"""
+    start: Optional[date]
+    end: Optional[date]
+
+
+def next_month(month_start):
+    return (month_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def month_period(year, month):
+    """The period of one calendar month; raises ValueError on a bad month or year"""
+    start = date(int(year), int(month), 1)
+    try:
+        return Period(start, next_month(start))
+    except OverflowError:
+        # December of date.max.year ends past the last representable date
+        raise ValueError(f"Year {year} is out of range.")
+
+
+def parse_int(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a whole number.")
+
+
+def parse_day(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f"{name} must be a valid date (YYYY-MM-DD).")
+    return day
+
+
+def calendar_period(params):
+    """The period named by year with month, quarter or ISO week (or year alone)"""
+    year = parse_int(params, 'year')
+    month, quarter, week = parse_int(params, 'month'), parse_int(params, 'quarter'), parse_int(params, 'week')
+    given = [name for name, value in (('month', month), ('quarter', quarter), ('week', week)) if value is not None]
+    if len(given) > 1:
+        raise ValueError(f"Use only one of month, quarter and week (got {' and '.join(given)}).")
+    if year is None:
+        if given:
+            raise ValueError(f"year is required with {given[0]}.")
+        return None
+    try:
+        if month is not None:
+            return month_period(year, month)
+        if quarter is not None:
+            if not 1 <= quarter <= 4:
+                raise ValueError
+            start = date(year, 3 * quarter - 2, 1)
+            return Period(start, date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1))
+        if week is not None:
+            start = date.fromisocalendar(year, week, 1)
+            return Period(start, start + timedelta(days=7))
+        return Period(date(year, 1, 1), date(year + 1, 1, 1))
+    except (ValueError, OverflowError):
+        raise ValueError(f"No such {given[0] if given else 'year'} in year {year}.")
+
+
+def parse_period(params):
+    """
+    The period selected by query params, or None when none are given.
+    start_date / end_date (inclusive) narrow a year / month / quarter / week
+    period; raises ValueError with a client-facing message.
+    """
+    period = calendar_period(params)
+    first, last = parse_day(params, 'start_date'), parse_day(params, 'end_date')
+    if period is None and first is None and last is None:
+        return None
+    start, end = period or (None, None)
+    if first is not None and (start is None or first > start):
+        start = first
+    # An end_date of date.max leaves the period open-ended
+    if last is not None and last < date.max and (end is None or last + timedelta(days=1) < end):
+        end = last + timedelta(days=1)
+    if start is not None and end is not None and end < start:
+        end = start
+    return Period(start, end)
+
+
+def filter_dates(queryset, period, field='date'):
+    """Restrict a date (or datetime) field to the period with range predicates"""
+    if period is None:
+        return queryset
+    if period.start is not None:
+        queryset = queryset.filter(**{f'{field}__gte': period.start})
+    if period.end is not None:
+        queryset = queryset.filter(**{f'{field}__lt': period.end})
+    return queryset
+
+
+def months_q(period, year_field='year', month_field='month'):
+    """
+    Q matching (year, month) keys of every month the period touches, as
+    ranges on the composite key rather than a list of months.
+    """
+    condition = Q()
+    if period.start is not None:
+        year, month = period.start.year, period.start.month
+        # The plain year bound gives the planner a range on the index's first column
+        condition &= Q(**{f'{year_field}__gte': year})
+        condition &= Q(**{f'{year_field}__gt': year}) | Q(**{f'{month_field}__gte': month})
+    if period.end is not None:
+        last = period.end - timedelta(days=1)
+        year, month = last.year, last.month
+        condition &= Q(**{f'{year_field}__lte': year})
+        condition &= Q(**{f'{year_field}__lt': year}) | Q(**{f'{month_field}__lte': month})
+    return condition
+
+
+def filter_months(queryset, period, year_field='year', month_field='month'):
+    """Restrict a queryset keyed by (year, month) integers to the period"""
+    if period is None:
+        return queryset
+    if period.start is not None and period.end is not None:
+        first, last = period.start, period.end - timedelta(days=1)
+        if first.year == last.year:
+            # The common case (a month, quarter or year) is one range on the index
+            return queryset.filter(**{
+                year_field: first.year,
+                f'{month_field}__gte': first.month,
+                f'{month_field}__lte': last.month,
+            })
+    return queryset.filter(months_q(period, year_field, month_field))
@@ -0,0 +1,147 @@
+"""
+Query plan checks
+The hot role-scoped queries, grouped by app, and the EXPLAIN checks run on
+them: none may fall back to a full table scan, and period filters
+(core.periods) must be answered by an index range scan. Used by the
+check_query_plans command and by each app's tests.
+"""
+import re
+from datetime import date
+
+from django.db import connection
+from django.db.models import Q
+
+from accounts.models import OrgClosure, User
+from accounts.scope import VisibilityScope
+from core.periods import Period, filter_dates, filter_months, parse_period
+from employees.models import Attendance, EmployeeProfile, Payroll
+from tasks.calendar import day_start
+from tasks.models import Task, TaskTombstone
+
+# SQLite: "SCAN tasks_task" without "USING ... INDEX" is a full table scan.
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)')
+# PostgreSQL: sequential scan node on a table.
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+# An index searched with a range (or equality then range) on its key
+SQLITE_RANGE_SCAN = re.compile(r'\bSEARCH \w+ USING (?:COVERING )?INDEX \w+ \([^)]*[<>]')
+POSTGRES_RANGE_SCAN = re.compile(r'Index Cond: .*[<>]')
+
+# The ids below are placeholders; only the plan shape matters
+USER_ID = 1
+MANAGER_ID = 1
+
+
+def manager_scope():
+    return VisibilityScope(MANAGER_ID, 'manager', [], [])
+
+
+def task_queries():
+    """Querysets mirroring the task list, calendar, sync and dashboard filters"""
+    today = date.today()
+    month_start = today.replace(day=1)
+    return [
+        ('task list (admin)', Task.objects.order_by('-created_at', '-id')[:10]),
+        ('task list (user)', Task.objects.filter(assigned_to_id=USER_ID).order_by('-created_at', '-id')[:10]),
+        ('task list (user, status)', Task.objects.filter(assigned_to_id=USER_ID, status='todo').order_by('-created_at')[:10]),
+        ('tasks created by manager', Task.objects.filter(created_by_id=MANAGER_ID).order_by('-created_at')[:10]),
+        ('pending tasks (user)', Task.objects.filter(assigned_to_id=USER_ID).exclude(status='completed')),
+        ('pending tasks (creator)', Task.objects.filter(created_by_id=MANAGER_ID).exclude(status='completed')),
+        ('tasks by due date', Task.objects.filter(due_date__gte=month_start, due_date__lte=today)),
+        ('calendar month', Task.objects.filter(
+            Q(due_date__gte=month_start, due_date__lt=today)
+            | Q(assigned_at__gte=day_start(month_start), assigned_at__lt=day_start(today))
+        ).order_by()),
+        ('overdue tasks', Task.objects.overdue(today).order_by()),
+        ('tasks changed since', Task.objects.filter(updated_at__gte=day_start(month_start)).order_by('updated_at', 'id')[:1001]),
+        ('task tombstones since', TaskTombstone.objects.filter(removed_at__gte=day_start(month_start))),
+        ('tasks in org subtree', Task.objects.filter(assigned_to_id__in=manager_scope().member_subquery())),
+    ]
+
+
+def account_queries():
+    """Querysets mirroring the login, team and org hierarchy lookups"""
+    return [
+        ('team members', User.objects.filter(manager_id=MANAGER_ID, role='user')),
+        ('org subtree', OrgClosure.objects.filter(ancestor_id=MANAGER_ID, depth__gt=0)),
+        ('org ancestors', OrgClosure.objects.filter(descendant_id=USER_ID, depth__gt=0).order_by('depth')),
+        ('login lookup', User.objects.filter(Q(username='someone') | Q(email='someone@example.com'))),
+    ]
+
+
+def employee_queries():
+    """Querysets mirroring the HR list views and dashboard"""
+    today = date.today()
+    return [
+        ('attendance in org subtree', manager_scope().filter_employee_records(Attendance.objects.filter(date=today))),
+        ('active employees', EmployeeProfile.objects.filter(status='active').order_by('-date_of_joining')[:5]),
+        ('attendance today', Attendance.objects.filter(date=today, status='present')),
+        ('attendance by employee', Attendance.objects.filter(employee_id=1).order_by('-date')[:10]),
+        ('payroll period', Payroll.objects.filter(year=today.year, month=today.month)),
+        ('stale payroll drafts', Payroll.objects.filter(needs_recompute=True, status='draft')),
+    ]
+
+
+def hot_queries():
+    return task_queries() + account_queries() + employee_queries()
+
+
+def range_queries():
+    """
+    Period-filtered querysets as the list views build them; each must be a
+    range scan over an index, never a scan with EXTRACT on every row.
+    """
+    year = date.today().year
+    month = parse_period({'year': year, 'month': 2})
+    quarter = parse_period({'year': year, 'quarter': 3})
+    week = parse_period({'year': year, 'week': 10})
+    across_years = Period(date(year - 1, 11, 15), date(year + 1, 2, 1))
+    attendance = Attendance.objects.all()
+    payroll = Payroll.objects.all()
+    return [
+        ('attendance month', filter_dates(attendance, month)),
+        ('attendance quarter', filter_dates(attendance, quarter)),
+        ('attendance ISO week', filter_dates(attendance, week)),
+        ('attendance month (employee)', filter_dates(attendance.filter(employee_id=1), month)),
+        ('attendance month (org subtree)', manager_scope().filter_employee_records(filter_dates(attendance, month))),
+        ('payroll month', filter_months(payroll, month)),
+        ('payroll quarter', filter_months(payroll, quarter)),
+        ('payroll across years', filter_months(payroll, across_years)),
+    ]
+
+
+def prefer_indexes():
+    """
+    Small tables make PostgreSQL seq scans cheap; ask whether an index path
+    exists at all. Call inside a transaction.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+
+def full_scans(plan):
+    """Return the tables a plan reads with a full scan"""
+    pattern = POSTGRES_FULL_SCAN if connection.vendor == 'postgresql' else SQLITE_FULL_SCAN
+    return pattern.findall(plan)
+
+
+def has_range_scan(plan):
+    pattern = POSTGRES_RANGE_SCAN if connection.vendor == 'postgresql' else SQLITE_RANGE_SCAN
+    return pattern.search(plan) is not None
+
+
+class QueryPlanAssertions:
+    """TestCase mixin asserting the checks above"""
+
+    def setUp(self):
+        super().setUp()
+        prefer_indexes()
+
+    def assertUsesIndex(self, name, queryset):
+        plan = queryset.explain()
+        self.assertEqual(full_scans(plan), [], f"{name} falls back to a full scan:\n{plan}")
+
+    def assertRangeScan(self, name, queryset):
+        plan = queryset.explain()
+        self.assertEqual(full_scans(plan), [], f"{name} falls back to a full scan:\n{plan}")
+        self.assertTrue(has_range_scan(plan), f"{name} is not an index range scan:\n{plan}")
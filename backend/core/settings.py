@@ -35,7 +35,7 @@ AUTH_USER_MODEL = 'accounts.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -52,8 +52,26 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.CustomTokenRefreshSerializer',
 }
 
+# Revoked refresh tokens (accounts.revocation): seconds between pulls of
+# revocations made by other processes, and the in-memory Bloom filter size
+REVOCATION_SYNC_INTERVAL = 5
+REVOCATION_BLOOM_CAPACITY = 100000
+
+# How manager task visibility is queried: 'union' (two indexed branches), 'or',
+# or 'auto' (union on PostgreSQL, or elsewhere); see benchmark_task_scope
+TASK_SCOPE_STRATEGY = os.getenv('TASK_SCOPE_STRATEGY', 'auto')
+
+# Delta-sync tokens older than this trigger a full resync; older tombstones are pruned
+TASK_TOMBSTONE_RETENTION_DAYS = int(os.getenv('TASK_TOMBSTONE_RETENTION_DAYS', '30'))
+
+# Change feed (/api/events/): broker class and keep-alive interval in seconds.
+# The in-process broker only fans out within one server process.
+EVENT_BROKER = os.getenv('EVENT_BROKER', 'core.events.InProcessBroker')
+EVENT_STREAM_HEARTBEAT = 15
+
 CORS_ALLOW_ALL_ORIGINS = False
 
 CORS_ALLOWED_ORIGINS = [
@@ -119,6 +137,33 @@ DATABASES = {
     }
 }
 
+# Visibility scopes, auth versions and other entries invalidated on write
+# must be shared by every worker, or an invalidation in one process leaves
+# the others serving stale authorization. Production needs REDIS_URL; the
+# per-process fallback (development, tests) keeps those entries only for
+# INVALIDATED_CACHE_TIMEOUT seconds.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+    INVALIDATED_CACHE_TIMEOUT = 300
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+    INVALIDATED_CACHE_TIMEOUT = 5
+
+# Login password checks run on a bounded pool (accounts.hashing): this many at
+# once per process, with up to PASSWORD_HASH_QUEUE more waiting before 429s
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '4'))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', '32'))
+
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',
@@ -3,16 +3,19 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenRefreshView
-from accounts.views import CustomTokenObtainPairView
+from accounts.views import CustomTokenObtainPairView, TokenRevokeView
 from tasks.views import TaskCalendarView
+from core.feed import change_feed
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/accounts/", include("accounts.urls")),
     path("api/token/", CustomTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("api/token/revoke/", TokenRevokeView.as_view(), name="token_revoke"),
     path("api/tasks/", include("tasks.urls")),
     path("api/tasks/calendar/", TaskCalendarView, name="task_calendar"),
+    path("api/events/", change_feed, name="change_feed"),
     path("api/", include("employees.urls")),
 ]
 
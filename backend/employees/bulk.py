@@ -0,0 +1,141 @@
+"""
+Bulk attendance marking
+Upserts many attendance records (a whole team, one or more days) with the
+same visibility rules as AttendanceListCreateView: employees are checked in
+one query and everything is written with one bulk_create(update_conflicts=True)
+inside a single transaction.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from core.events import attendance_event, publish
+from .models import Attendance, EmployeeProfile
+from .payroll import mark_stale
+from .serializers import AttendanceSerializer
+
+MAX_RECORDS = 1000
+UPDATE_FIELDS = ['status', 'check_in', 'check_out', 'notes', 'marked_by', 'updated_at']
+
+
+class BulkAttendanceProcessor:
+    """
+    Validates a list of records, then upserts the valid ones on (employee, date).
+    Each record is {"employee_id": 1, "date": "2024-05-01", "status": "present",
+    "check_in": "09:00", "check_out": "18:00", "notes": ""}; "date" may be left
+    out when a default date is given for the whole request.
+    """
+
+    def __init__(self, user, scope, records, date=None, atomic=False):
+        self.user = user
+        self.scope = scope
+        self.records = records
+        self.date = date
+        self.atomic = atomic
+        self.results = [None] * len(records)
+        self.to_save = {}
+        self.written = 0
+
+    def run(self):
+        """Process all records; returns (results, has_errors)"""
+        validated = [self.validate(index, record) for index, record in enumerate(self.records)]
+        visible_ids = self.load_employees(validated)
+
+        for index, data in enumerate(validated):
+            if data is None:
+                continue
+            key = (data['employee_id'], data['date'])
+            if data['employee_id'] not in visible_ids:
+                self.fail(index, 404, "Employee not found.")
+            elif key in self.to_save:
+                self.fail(index, 400, "Duplicate employee and date in this request.")
+            else:
+                self.to_save[key] = (index, data)
+
+        existing = self.load_existing()
+        for key, (index, _) in self.to_save.items():
+            self.succeed(index, 200 if key in existing else 201, existing.get(key), key)
+
+        has_errors = any(result['status'] >= 400 for result in self.results)
+        if (has_errors and self.atomic) or not self.to_save:
+            return self.results, has_errors
+
+        with transaction.atomic():
+            # auto_now is applied on insert, but the conflict update only
+            # copies the values we pass, so stamp updated_at ourselves
+            now = timezone.now()
+            records = [
+                Attendance(
+                    employee_id=employee_id,
+                    date=date,
+                    status=data.get('status', 'present'),
+                    check_in=data.get('check_in'),
+                    check_out=data.get('check_out'),
+                    notes=data.get('notes'),
+                    marked_by=self.user,
+                    updated_at=now,
+                )
+                for (employee_id, date), (_, data) in self.to_save.items()
+            ]
+            saved = Attendance.objects.bulk_create(
+                records,
+                update_conflicts=True,
+                unique_fields=['employee', 'date'],
+                update_fields=UPDATE_FIELDS,
+            )
+            self.written = len(saved)
+            # bulk_create sends no signals, so stale payroll is flagged and feed
+            # events are published here
+            mark_stale((employee_id, day.year, day.month) for employee_id, day in self.to_save)
+            for (key, (index, _)), attendance in zip(self.to_save.items(), saved):
+                result = self.results[index]
+                if attendance.pk is not None:
+                    result['id'] = attendance.pk
+                publish(attendance_event(
+                    'created' if result['status'] == 201 else 'updated',
+                    result['id'], attendance.employee_id, attendance.date, attendance.status,
+                ))
+        return self.results, has_errors
+
+    def validate(self, index, record):
+        if not isinstance(record, dict):
+            self.fail(index, 400, "Each record must be an object.")
+            return None
+        if self.date and 'date' not in record:
+            record = {**record, 'date': self.date}
+        serializer = AttendanceSerializer(data=record)
+        if not serializer.is_valid():
+            self.fail(index, 400, serializer.errors)
+            return None
+        return serializer.validated_data
+
+    def load_employees(self, validated):
+        """Ids of the referenced employees this user may mark, in one query"""
+        ids = {data['employee_id'] for data in validated if data is not None}
+        if not ids:
+            return set()
+        queryset = self.scope.filter_employee_records(EmployeeProfile.objects.filter(id__in=ids), field='id')
+        return set(queryset.values_list('id', flat=True))
+
+    def load_existing(self):
+        """{(employee_id, date): id} of the records that will be overwritten, in one query"""
+        if not self.to_save:
+            return {}
+        employee_ids = {employee_id for employee_id, _ in self.to_save}
+        dates = {date for _, date in self.to_save}
+        rows = Attendance.objects.filter(employee_id__in=employee_ids, date__in=dates).values_list(
+            'employee_id', 'date', 'id'
+        )
+        return {(employee_id, date): pk for employee_id, date, pk in rows}
+
+    def fail(self, index, status_code, error):
+        self.results[index] = {'index': index, 'status': status_code, 'error': error}
+
+    def succeed(self, index, status_code, attendance_id, key):
+        employee_id, date = key
+        self.results[index] = {
+            'index': index,
+            'status': status_code,
+            'id': attendance_id,
+            'employee_id': employee_id,
+            'date': date.isoformat(),
+        }
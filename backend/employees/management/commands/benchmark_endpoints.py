@@ -0,0 +1,251 @@
+"""
+Benchmark Endpoints Command
+Requests each API endpoint as every role against generated datasets of
+several sizes, records p50 / p99 latency and SQL query counts, and fails
+when a budget is exceeded, so regressions are caught before deploy.
+Run with: python manage.py benchmark_endpoints [--sizes small,medium] [--json report.json]
+Datasets come from generate_load_data and are rolled back afterwards.
+Budgets are in BUDGETS below; override them with settings.ENDPOINT_BUDGETS
+or --budgets budgets.json (same shape, merged per endpoint).
+Cached entries are kept for the whole run, as a shared cache would keep
+them; the *_cold endpoints drop their cache before every timed request.
+"""
+import json
+import math
+import statistics
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.authentication import forget_auth_version
+from accounts.models import OrgClosure, User
+from accounts.scope import VisibilityScope
+from accounts.serializers import CustomTokenObtainPairSerializer
+from tasks import calendar
+from tasks.models import Task
+
+# generate_load_data arguments per dataset size
+SIZES = {
+    'small': {'users': 500, 'teams': 20, 'attendance': 20_000, 'tasks': 10_000, 'payroll_months': 3},
+    'medium': {'users': 5_000, 'teams': 200, 'attendance': 300_000, 'tasks': 100_000, 'payroll_months': 6},
+    'large': {'users': 50_000, 'teams': 2_000, 'attendance': 5_000_000, 'tasks': 1_000_000, 'payroll_months': 12},
+}
+ROLES = ('admin', 'director', 'manager', 'user')
+STAFF = ('admin', 'director', 'manager')
+
+# (name, method, path, roles); the path is formatted with the benchmark period
+ENDPOINTS = (
+    ('tasks', 'get', '/api/tasks/', ROLES),
+    ('calendar', 'get', '/api/tasks/calendar/?start_date={month_start}&end_date={month_end}', ROLES),
+    ('calendar_cold', 'get', '/api/tasks/calendar/?start_date={month_start}&end_date={month_end}', ROLES),
+    ('dashboard', 'get', '/api/dashboard/stats/', ROLES),
+    ('attendance', 'get', '/api/attendance/?month={month}&year={year}', ROLES),
+    ('matrix', 'get', '/api/attendance/matrix/?month={month}&year={year}', ROLES),
+    ('payroll', 'get', '/api/payroll/', STAFF),
+    ('employees', 'get', '/api/employees/', STAFF),
+    ('teams', 'get', '/api/teams/', STAFF),
+    ('login', 'post', '/api/token/', ROLES),
+)
+
+# Timed with an empty calendar cache; the warm-up requests would fill it
+COLD_ENDPOINTS = ('calendar_cold',)
+
+# Per endpoint: the most SQL queries one request may issue (any role, any
+# size) and the p99 latency allowed at each size. Query budgets are exact,
+# so any new N+1 fails; latency budgets leave about 2x headroom over a
+# developer machine on SQLite.
+BUDGETS = {
+    'tasks': {'queries': 2, 'p99_ms': {'small': 150, 'medium': 250, 'large': 800}},
+    'calendar': {'queries': 0, 'p99_ms': {'small': 100, 'medium': 600, 'large': 2000}},
+    'calendar_cold': {'queries': 1, 'p99_ms': {'small': 150, 'medium': 900, 'large': 3000}},
+    'dashboard': {'queries': 8, 'p99_ms': {'small': 400, 'medium': 1200, 'large': 5000}},
+    'attendance': {'queries': 3, 'p99_ms': {'small': 150, 'medium': 250, 'large': 800}},
+    'matrix': {'queries': 2, 'p99_ms': {'small': 300, 'medium': 1500, 'large': 6000}},
+    'payroll': {'queries': 3, 'p99_ms': {'small': 200, 'medium': 300, 'large': 1000}},
+    'employees': {'queries': 3, 'p99_ms': {'small': 200, 'medium': 300, 'large': 1000}},
+    'teams': {'queries': 2, 'p99_ms': {'small': 150, 'medium': 150, 'large': 400}},
+    # Dominated by the password hasher, not by the dataset
+    'login': {'queries': 2, 'p99_ms': {'small': 1500, 'medium': 1500, 'large': 1500}},
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def load_budgets(path=None):
+    budgets = {name: dict(budget) for name, budget in BUDGETS.items()}
+    overrides = dict(getattr(settings, 'ENDPOINT_BUDGETS', {}))
+    if path:
+        with open(path) as handle:
+            overrides.update(json.load(handle))
+    for name, budget in overrides.items():
+        budgets.setdefault(name, {}).update(budget)
+    return budgets
+
+
+class Command(BaseCommand):
+    help = "Benchmark API endpoints per role and dataset size against latency and query budgets"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='small,medium', help=f"Comma-separated, from: {', '.join(SIZES)}")
+        parser.add_argument('--endpoints', help="Comma-separated endpoint names (default: all)")
+        parser.add_argument('--roles', default=','.join(ROLES), help="Comma-separated roles")
+        parser.add_argument('--requests', type=int, default=30, help="Timed requests per endpoint and role")
+        parser.add_argument('--login-requests', type=int, default=5, help="Timed logins per role (each hashes a password)")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests first (fills caches)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--budgets', help="JSON file of budget overrides")
+        parser.add_argument('--json', help="Write the measurements to this file")
+        parser.add_argument('--no-budgets', action='store_true', help="Only report; never fail")
+
+    def handle(self, *args, **options):
+        sizes = options['sizes'].split(',')
+        unknown = set(sizes) - set(SIZES)
+        if unknown:
+            raise CommandError(f"Unknown sizes: {', '.join(sorted(unknown))}. Use any of: {', '.join(SIZES)}.")
+        names = options['endpoints'].split(',') if options['endpoints'] else [name for name, *_ in ENDPOINTS]
+        endpoints = [endpoint for endpoint in ENDPOINTS if endpoint[0] in names]
+        roles = options['roles'].split(',')
+        budgets = load_budgets(options['budgets'])
+
+        results, failures = [], []
+        # Without a shared cache, scopes and auth versions expire within
+        # seconds; keep them for the run so budgets measure warm requests
+        with override_settings(INVALIDATED_CACHE_TIMEOUT=3600):
+            for size in sizes:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n{size} ({connection.vendor})"))
+                for result in self.run_size(size, endpoints, roles, options):
+                    results.append(result)
+                    problems = [] if options['no_budgets'] else self.over_budget(result, budgets)
+                    failures.extend(problems)
+                    self.report(result, problems)
+
+        if options['json']:
+            with open(options['json'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+        if failures:
+            raise CommandError(f"{len(failures)} budget(s) exceeded:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("\nAll endpoints within budget."))
+
+    def run_size(self, size, endpoints, roles, options):
+        prefix = f"bench{size}"
+        results = []
+        with transaction.atomic():
+            self.stdout.write(f"generating {size} dataset...")
+            call_command(
+                'generate_load_data', prefix=prefix, seed=options['seed'], stdout=StringIO(), **SIZES[size]
+            )
+            user_ids = list(User.objects.filter(username__startswith=f"{prefix}_").values_list('id', flat=True))
+            self.reset_caches(user_ids)
+            subjects = self.pick_subjects(prefix)
+            for name, method, path, allowed in endpoints:
+                for role in roles:
+                    if role not in allowed:
+                        continue
+                    results.append(self.measure(size, name, method, path, role, subjects[role], options))
+            transaction.set_rollback(True)
+        # Ids are reused after the rollback; drop anything cached for them
+        self.reset_caches(user_ids)
+        return results
+
+    def reset_caches(self, user_ids):
+        VisibilityScope.invalidate(*user_ids)
+        forget_auth_version(*user_ids)
+        calendar.bump_version()
+
+    def pick_subjects(self, prefix):
+        """The busiest user of each role: largest org subtree, most tasks"""
+        def widest(kind):
+            row = (
+                OrgClosure.objects.filter(ancestor__username__startswith=f"{prefix}_{kind}", depth__gt=0)
+                .values('ancestor_id').annotate(reports=Count('id')).order_by('-reports', 'ancestor_id').first()
+            )
+            return User.objects.get(pk=row['ancestor_id'])
+
+        busiest = (
+            Task.objects.filter(assigned_to__username__startswith=f"{prefix}_u")
+            .values('assigned_to_id').annotate(tasks=Count('id')).order_by('-tasks', 'assigned_to_id').first()
+        )
+        return {
+            'admin': User.objects.filter(username__startswith=f"{prefix}_a").order_by('id').first(),
+            'director': widest('d'),
+            'manager': widest('m'),
+            'user': User.objects.get(pk=busiest['assigned_to_id']),
+        }
+
+    def measure(self, size, name, method, path, role, user, options):
+        client = APIClient()
+        if name == 'login':
+            data = {'username': user.username, 'password': 'loadtest'}
+            repeat = options['login_requests']
+        else:
+            token = CustomTokenObtainPairSerializer.get_token(user).access_token
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            data = None
+            repeat = options['requests']
+        today = timezone.localdate()
+        period = today - timedelta(days=1)
+        month_start = today.replace(day=1)
+        url = path.format(
+            month=period.month,
+            year=period.year,
+            month_start=month_start,
+            month_end=calendar.next_month(month_start) - timedelta(days=1),
+        )
+        send = getattr(client, method)
+
+        for _ in range(options['warmup']):
+            self.request(send, url, data)
+        timings, queries = [], []
+        for _ in range(repeat):
+            if name in COLD_ENDPOINTS:
+                calendar.bump_version()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                self.request(send, url, data)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+        return {
+            'size': size,
+            'endpoint': name,
+            'role': role,
+            'requests': repeat,
+            'p50_ms': round(statistics.median(timings), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'queries': max(queries),
+        }
+
+    def request(self, send, url, data):
+        response = send(url, data, format='json') if data is not None else send(url)
+        if response.status_code != 200:
+            raise CommandError(f"{url} answered {response.status_code}: {response.content[:200]!r}")
+
+    def over_budget(self, result, budgets):
+        budget = budgets.get(result['endpoint'], {})
+        label = f"{result['size']} {result['endpoint']} ({result['role']})"
+        problems = []
+        if 'queries' in budget and result['queries'] > budget['queries']:
+            problems.append(f"{label}: {result['queries']} queries > {budget['queries']}")
+        limit = budget.get('p99_ms', {}).get(result['size'])
+        if limit is not None and result['p99_ms'] > limit:
+            problems.append(f"{label}: p99 {result['p99_ms']} ms > {limit} ms")
+        return problems
+
+    def report(self, result, problems):
+        line = (
+            f"  {result['endpoint']:<13} {result['role']:<9}"
+            f" p50 {result['p50_ms']:8.2f} ms   p99 {result['p99_ms']:8.2f} ms   {result['queries']:3d} queries"
+        )
+        self.stdout.write(self.style.ERROR(line + "   OVER BUDGET") if problems else line)
@@ -0,0 +1,98 @@
+"""
+Benchmark Payroll Command
+Backfills several months of payroll with 1, 2, 4... worker processes and
+reports load / compute / write time per worker count, the speedup over the
+serial run, and whether every run produced exactly the serial results.
+Run with: python manage.py benchmark_payroll [--workers 1,2,4] [--months 6]
+Data comes from generate_load_data (rolled back afterwards) unless
+--use-existing is given; every run is rolled back as well.
+"""
+import os
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+from io import StringIO
+from itertools import repeat
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from employees.management.commands.run_payroll import months_back
+from employees.payroll import PayrollRun, compute_all, payroll_pool
+
+
+class Command(BaseCommand):
+    help = "Measure how a multi-month payroll backfill scales across worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,2,4', help="Comma-separated worker counts; 1 is always included")
+        parser.add_argument('--months', type=int, default=6, help="Months to backfill, ending last month")
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--teams', type=int, default=400)
+        parser.add_argument('--attendance', type=int, default=1_300_000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--use-existing', action='store_true', help="Benchmark the current data instead")
+
+    def handle(self, *args, **options):
+        counts = sorted({1, *(int(count) for count in options['workers'].split(','))})
+        if counts[0] < 1:
+            raise CommandError("Worker counts must be at least 1.")
+        last = timezone.localdate().replace(day=1) - timedelta(days=1)
+        months = months_back(last.replace(day=1), options['months'])
+        self.stdout.write(f"{os.cpu_count()} CPUs, {connection.vendor}, {len(months)} months")
+
+        with transaction.atomic():
+            if not options['use_existing']:
+                self.stdout.write("generating dataset...")
+                call_command(
+                    'generate_load_data', prefix='benchpayroll', seed=options['seed'], users=options['users'],
+                    teams=options['teams'], attendance=options['attendance'], tasks=0, payroll_months=0,
+                    stdout=StringIO(),
+                )
+            baseline, rows = None, []
+            for workers in counts:
+                totals, results = self.backfill(months, workers)
+                if baseline is None:
+                    baseline = (totals, results)
+                rows.append((workers, totals, results == baseline[1]))
+            transaction.set_rollback(True)
+
+        serial = baseline[0]
+        self.stdout.write(
+            f"\n{'workers':>7} {'load s':>8} {'compute s':>10} {'write s':>8} {'total s':>8}"
+            f" {'compute x':>10} {'total x':>8}  identical"
+        )
+        for workers, totals, identical in rows:
+            self.stdout.write(
+                f"{workers:>7} {totals['load']:>8.2f} {totals['compute']:>10.2f} {totals['write']:>8.2f}"
+                f" {totals['total']:>8.2f} {serial['compute'] / totals['compute']:>10.2f}"
+                f" {serial['total'] / totals['total']:>8.2f}  {'yes' if identical else 'NO'}"
+            )
+        if not all(identical for _, _, identical in rows):
+            raise CommandError("Parallel payroll differs from the serial results")
+        records = sum(len(results) for _, results in baseline[1])
+        self.stdout.write(self.style.SUCCESS(f"\n{records} payroll records, identical for every worker count."))
+
+    def backfill(self, months, workers):
+        """Run every month (rolled back afterwards); returns (phase totals, results)"""
+        totals = {'load': 0.0, 'compute': 0.0, 'write': 0.0, 'total': 0.0}
+        results = []
+        started = time.perf_counter()
+        with payroll_pool(workers) if workers > 1 else nullcontext() as pool:
+            if pool is not None:
+                # Start every worker up front so compute times exclude process start-up
+                list(pool.map(compute_all, [[]] * workers, repeat(0)))
+            with transaction.atomic():
+                for year, month in months:
+                    run = PayrollRun(year, month, workers=workers, pool=pool)
+                    summary = run.run()
+                    for phase, seconds in summary['seconds'].items():
+                        totals[phase] += seconds
+                    results.append(((year, month), run.results))
+                transaction.set_rollback(True)
+        # Includes starting the pool, which a real backfill pays once too
+        totals['total'] = time.perf_counter() - started
+        return totals, results
+
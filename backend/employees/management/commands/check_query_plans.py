@@ -0,0 +1,56 @@
+"""
+Check Query Plans Command
+Runs EXPLAIN on the hot role-scoped queries and fails if any of them
+falls back to a full table scan, or if a period filter (core.periods) is
+not answered by an index range scan.
+Run with: python manage.py check_query_plans [--verbose-plans]
+The queries and checks live in core.query_plans, which the app tests share.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.query_plans import full_scans, has_range_scan, hot_queries, prefer_indexes, range_queries
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot role-scoped queries and fail on full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help="Print every query plan")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f"Unsupported database vendor: {connection.vendor}")
+
+        failures = []
+        with transaction.atomic():
+            prefer_indexes()
+            for name, queryset in self.get_queries():
+                plan = queryset.explain()
+                scanned = full_scans(plan)
+                if options['verbose_plans']:
+                    self.stdout.write(f"{name}:\n{plan}\n")
+                if scanned:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f"FULL SCAN  {name} ({', '.join(scanned)})"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"ok         {name}"))
+            for name, queryset in self.get_range_queries():
+                plan = queryset.explain()
+                if options['verbose_plans']:
+                    self.stdout.write(f"{name}:\n{plan}\n")
+                if full_scans(plan) or not has_range_scan(plan):
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f"NO RANGE   {name}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"range      {name}"))
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot quer{'y' if len(failures) == 1 else 'ies'} regressed to a full or unranged scan")
+        self.stdout.write(self.style.SUCCESS("\nAll hot queries use an index."))
+
+    def get_queries(self):
+        return hot_queries()
+
+    def get_range_queries(self):
+        return range_queries()
@@ -0,0 +1,87 @@
+"""
+Run Payroll Command
+Generates (or recomputes the drafts of) a month's payroll for every active
+employee from their attendance, see employees.payroll
+Run with: python manage.py run_payroll [--year 2024 --month 5] [--months 12] [--workers 4] [--dry-run]
+Defaults to the previous calendar month; --months backfills that many
+months ending with it, oldest first. --stale only reruns the drafts whose
+attendance changed since they were computed, in every month.
+"""
+import time
+from contextlib import nullcontext
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from employees.payroll import CHUNK_SIZE, PayrollRun, payroll_pool, recompute_stale
+
+
+def months_back(last, count):
+    """(year, month) of count months ending with last, oldest first"""
+    months = []
+    month = last
+    for _ in range(count):
+        months.append((month.year, month.month))
+        month = (month - timedelta(days=1)).replace(day=1)
+    return months[::-1]
+
+
+class Command(BaseCommand):
+    help = "Generate a month's payroll in bulk from attendance"
+
+    def add_arguments(self, parser):
+        last_month = timezone.localdate().replace(day=1) - timedelta(days=1)
+        parser.add_argument('--year', type=int, default=last_month.year)
+        parser.add_argument('--month', type=int, default=last_month.month)
+        parser.add_argument('--months', type=int, default=1, help="Backfill this many months ending with --month")
+        parser.add_argument('--workers', type=int, default=1, help="Processes computing pay in parallel")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows per upsert statement")
+        parser.add_argument('--dry-run', action='store_true', help="Compute and report without writing")
+        parser.add_argument('--stale', action='store_true', help="Only recompute drafts flagged by attendance changes")
+
+    def handle(self, *args, **options):
+        try:
+            last = date(options['year'], options['month'], 1)
+        except ValueError:
+            raise CommandError(f"No such month: {options['year']}-{options['month']}")
+        if options['stale'] and options['dry_run']:
+            raise CommandError("--stale cannot be combined with --dry-run.")
+        workers = options['workers']
+        self.verbosity = options['verbosity']
+
+        started = time.perf_counter()
+        written = 0
+        with payroll_pool(workers) if workers > 1 else nullcontext() as pool:
+            if options['stale']:
+                summaries = recompute_stale(workers=workers, pool=pool)
+            else:
+                summaries = (
+                    PayrollRun(
+                        year, month,
+                        chunk_size=options['chunk_size'],
+                        workers=workers,
+                        pool=pool,
+                        progress=self.progress_for(year, month),
+                    ).run(dry_run=options['dry_run'])
+                    for year, month in months_back(last, options['months'])
+                )
+            for summary in summaries:
+                written += summary['created'] + summary['updated']
+                self.stdout.write(
+                    f"{summary['year']}-{summary['month']:02d} ({summary['working_days']} working days): "
+                    f"{summary['created']} created, {summary['updated']} drafts recomputed, "
+                    f"{summary['skipped']} processed/paid skipped, total pay ₹{summary['total_pay']}"
+                )
+        elapsed = time.perf_counter() - started
+        verb = "Computed (dry run)" if options['dry_run'] else "Wrote"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {written} payroll records in {elapsed:.2f}s"))
+
+    def progress_for(self, year, month):
+        """Per-shard progress lines, shown with -v 2"""
+        if self.verbosity < 2:
+            return None
+
+        def progress(done, total):
+            self.stdout.write(f"  {year}-{month:02d}: computed {done}/{total}")
+        return progress
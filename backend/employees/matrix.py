@@ -0,0 +1,72 @@
+"""
+Attendance matrix
+Builds the month grid for the Attendance page: one row per employee with a
+status code per day and per-status totals. Everything comes from a single
+grouped query (employees LEFT JOIN that month's attendance, GROUP BY
+employee), so the response size grows with headcount, not with records.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, FilteredRelation, Max, Q
+
+from accounts.hierarchy import display_name
+from core.periods import next_month
+
+# One character per day; UNMARKED for days without a record
+CODES = {'present': 'P', 'absent': 'A', 'half_day': 'H', 'leave': 'L'}
+UNMARKED = '-'
+
+
+def attendance_matrix(employees, month_start):
+    """
+    The month's grid for an EmployeeProfile queryset:
+    {month, year, days, legend, employees: [{id, employee_id, name, team_id, codes, totals}]}
+    Inactive employees are only listed when they have records that month.
+    """
+    month_end = next_month(month_start)
+    days = [month_start + timedelta(days=offset) for offset in range((month_end - month_start).days)]
+
+    day_columns = {
+        f'day_{day.day}': Max('month_records__status', filter=Q(month_records__date=day))
+        for day in days
+    }
+    total_columns = {
+        f'total_{status}': Count('month_records', filter=Q(month_records__status=status))
+        for status in CODES
+    }
+    rows = (
+        employees
+        .annotate(month_records=FilteredRelation(
+            'attendance_records',
+            condition=Q(attendance_records__date__gte=month_start, attendance_records__date__lt=month_end),
+        ))
+        .values('id', 'employee_id', 'team_id', 'user__username', 'user__first_name', 'user__last_name', 'status')
+        .annotate(marked=Count('month_records'), **day_columns, **total_columns)
+        .filter(Q(status='active') | Q(marked__gt=0))
+        .order_by('user__first_name', 'user__last_name', 'id')
+    )
+
+    result = []
+    for row in rows:
+        result.append({
+            'id': row['id'],
+            'employee_id': row['employee_id'],
+            'name': display_name({
+                'username': row['user__username'],
+                'first_name': row['user__first_name'],
+                'last_name': row['user__last_name'],
+            }),
+            'team_id': row['team_id'],
+            'codes': ''.join(CODES.get(row[f'day_{day.day}'], UNMARKED) for day in days),
+            'totals': {
+                **{status: row[f'total_{status}'] for status in CODES},
+                'unmarked': len(days) - row['marked'],
+            },
+        })
+    return {
+        'month': month_start.month,
+        'year': month_start.year,
+        'days': len(days),
+        'legend': {code: status for status, code in CODES.items()},
+        'employees': result,
+    }
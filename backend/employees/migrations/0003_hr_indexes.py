@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0002_organizationsettings_systempreferences'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['-date_of_joining', '-id'], name='employee_joined_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['-date_of_joining'], name='employee_active_joined_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payroll',
+            index=models.Index(fields=['year', 'month'], name='payroll_period_idx'),
+        ),
+    ]
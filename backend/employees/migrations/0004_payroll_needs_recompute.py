@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0003_hr_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payroll',
+            name='needs_recompute',
+            field=models.BooleanField(default=False, help_text='Attendance changed since this draft was computed (see employees.payroll)'),
+        ),
+        migrations.AddIndex(
+            model_name='payroll',
+            index=models.Index(condition=models.Q(('needs_recompute', True)), fields=['year', 'month'], name='payroll_stale_idx'),
+        ),
+    ]
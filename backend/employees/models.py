@@ -4,10 +4,14 @@ Employee Profile, Team, Attendance, and Payroll models
 """
 from django.db import models
 from django.conf import settings
+from django.core.cache import cache
 from django.core.validators import MinValueValidator, MaxValueValidator
-from decimal import Decimal
+from django.utils.dateparse import parse_date
+from decimal import Decimal, ROUND_HALF_UP
 import json
 
+WORKING_DAYS_CACHE_KEY = 'organization_settings:working_days_per_month'
+
 
 class Team(models.Model):
     """
@@ -38,8 +42,9 @@ class Team(models.Model):
 
     @property
     def member_count(self):
-        """Get number of employees in this team"""
-        return self.employees.count()
+        """Get number of employees in this team (list views annotate employee_count)"""
+        count = getattr(self, 'employee_count', None)
+        return self.employees.count() if count is None else count
 
 
 class EmployeeProfile(models.Model):
@@ -87,6 +92,14 @@ class EmployeeProfile(models.Model):
         ordering = ['-date_of_joining']
         verbose_name = "Employee Profile"
         verbose_name_plural = "Employee Profiles"
+        indexes = [
+            models.Index(fields=['-date_of_joining', '-id'], name='employee_joined_idx'),
+            models.Index(
+                fields=['-date_of_joining'],
+                condition=models.Q(status='active'),
+                name='employee_active_joined_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.get_full_name() or self.user.username} - {self.employee_id}"
@@ -128,12 +141,32 @@ class Attendance(models.Model):
     class Meta:
         unique_together = ['employee', 'date']
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ]
         verbose_name = "Attendance"
         verbose_name_plural = "Attendance Records"
 
     def __str__(self):
         return f"{self.employee.user.username} - {self.date} - {self.get_status_display()}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded payroll month so a changed date or employee marks both months stale"""
+        instance = super().from_db(db, field_names, values)
+        instance._payroll_key = instance.get_payroll_key()
+        return instance
+
+    def get_payroll_key(self):
+        """(employee_id, year, month) of the payroll this record counts towards, or None if deferred"""
+        loaded = self.__dict__
+        if 'employee_id' not in loaded or 'date' not in loaded or loaded['date'] is None:
+            return None
+        day = loaded['date']
+        if isinstance(day, str):
+            day = parse_date(day)
+        return (loaded['employee_id'], day.year, day.month)
+
 
 class Payroll(models.Model):
     """
@@ -183,28 +216,49 @@ class Payroll(models.Model):
         choices=[('draft', 'Draft'), ('processed', 'Processed'), ('paid', 'Paid')],
         default='draft'
     )
+    needs_recompute = models.BooleanField(
+        default=False,
+        help_text="Attendance changed since this draft was computed (see employees.payroll)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ['employee', 'month', 'year']
         ordering = ['-year', '-month']
+        indexes = [
+            models.Index(fields=['year', 'month'], name='payroll_period_idx'),
+            # The recompute pass only reads stale drafts
+            models.Index(
+                fields=['year', 'month'],
+                condition=models.Q(needs_recompute=True),
+                name='payroll_stale_idx',
+            ),
+        ]
         verbose_name = "Payroll"
         verbose_name_plural = "Payroll Records"
 
     def __str__(self):
         return f"{self.employee.user.username} - {self.month}/{self.year} - ₹{self.final_pay}"
 
-    def calculate_final_pay(self):
-        """Calculate final payable amount"""
-        daily_rate = self.base_salary / 30  # Assuming 30 days per month
-        earned_salary = daily_rate * self.days_worked
-        final = earned_salary - self.deductions + self.bonuses
+    @staticmethod
+    def compute_final_pay(base_salary, days_worked, deductions, bonuses, working_days):
+        """Pay for days_worked out of working_days, less deductions plus bonuses, in paise"""
+        earned_salary = base_salary * days_worked / working_days
+        final = (earned_salary - deductions + bonuses).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
         return max(Decimal('0.00'), final)
 
+    def calculate_final_pay(self, working_days=None):
+        """Calculate final payable amount (per working day from OrganizationSettings)"""
+        if working_days is None:
+            working_days = OrganizationSettings.get_working_days_per_month()
+        return self.compute_final_pay(
+            Decimal(self.base_salary), self.days_worked, Decimal(self.deductions), Decimal(self.bonuses), working_days
+        )
+
     def save(self, *args, **kwargs):
-        """Auto-calculate final pay before saving"""
-        if not self.final_pay or self.final_pay == 0:
+        """Auto-calculate final pay before saving; processed and paid pay is frozen"""
+        if self.status == 'draft' or not self.final_pay:
             self.final_pay = self.calculate_final_pay()
         super().save(*args, **kwargs)
 
@@ -250,6 +304,23 @@ class OrganizationSettings(models.Model):
         obj, created = cls.objects.get_or_create(pk=1)
         return obj
 
+    @classmethod
+    def get_working_days_per_month(cls):
+        """
+        working_days_per_month, cached; every draft Payroll save needs it.
+        Saving the settings drops it, which reaches every worker only through
+        a shared cache (see settings.INVALIDATED_CACHE_TIMEOUT).
+        """
+        working_days = cache.get(WORKING_DAYS_CACHE_KEY)
+        if working_days is None:
+            working_days = cls.get_settings().working_days_per_month
+            cache.set(WORKING_DAYS_CACHE_KEY, working_days, settings.INVALIDATED_CACHE_TIMEOUT)
+        return working_days
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(WORKING_DAYS_CACHE_KEY)
+
 
 class SystemPreferences(models.Model):
     """
@@ -0,0 +1,293 @@
+"""
+Payroll runs
+Generates a month's payroll for every active employee in bulk: attendance
+is aggregated per employee in one grouped query, pay is computed with
+OrganizationSettings.working_days_per_month, and the rows are upserted on
+(employee, month, year) in chunks. Draft payroll is recomputed; processed
+and paid payroll is never touched. Deductions and bonuses already entered
+on a draft are kept.
+With workers > 1 the pay computation is split into contiguous employee id
+ranges and run in a process pool; shards are merged back in id order, so
+the result is identical to the serial path.
+Attendance writes call mark_stale() for the months they touch (through
+employees.signals, or directly for bulk writes); recompute_stale() then
+reruns only the stale drafts.
+"""
+import math
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from itertools import repeat
+from typing import NamedTuple
+
+import django
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core.periods import month_period
+from .models import Attendance, EmployeeProfile, OrganizationSettings, Payroll
+
+CHUNK_SIZE = 2000
+# Shards per worker, so a slow shard doesn't leave the other workers idle
+SHARDS_PER_WORKER = 4
+# Below this many employees the pool costs more than it saves
+MIN_PARALLEL = 2000
+# deductions and bonuses are only set on insert; drafts keep what was entered
+UPDATE_FIELDS = [
+    'base_salary', 'days_worked', 'days_present', 'days_absent', 'days_on_leave',
+    'final_pay', 'needs_recompute', 'updated_at',
+]
+ZERO = Decimal('0.00')
+
+
+class PayrollInput(NamedTuple):
+    """Everything needed to compute one employee's month; plain values only"""
+    employee_id: int
+    base_salary: Decimal
+    present: int
+    half_day: int
+    absent: int
+    leave: int
+    deductions: Decimal
+    bonuses: Decimal
+
+
+class PayrollResult(NamedTuple):
+    employee_id: int
+    base_salary: Decimal
+    days_worked: int
+    days_present: int
+    days_absent: int
+    days_on_leave: int
+    deductions: Decimal
+    bonuses: Decimal
+    final_pay: Decimal
+
+
+def compute(payroll_input, working_days):
+    """
+    One employee's payroll. Present and leave days are paid in full and
+    half days at half (rounded down to whole days, as days_worked is an
+    integer); paid days are capped at the month's working days.
+    """
+    days_worked = min(
+        payroll_input.present + payroll_input.leave + payroll_input.half_day // 2,
+        working_days,
+    )
+    return PayrollResult(
+        employee_id=payroll_input.employee_id,
+        base_salary=payroll_input.base_salary,
+        days_worked=days_worked,
+        days_present=payroll_input.present + payroll_input.half_day,
+        days_absent=payroll_input.absent,
+        days_on_leave=payroll_input.leave,
+        deductions=payroll_input.deductions,
+        bonuses=payroll_input.bonuses,
+        final_pay=Payroll.compute_final_pay(
+            payroll_input.base_salary, days_worked, payroll_input.deductions, payroll_input.bonuses, working_days
+        ),
+    )
+
+
+def compute_all(inputs, working_days):
+    return [compute(payroll_input, working_days) for payroll_input in inputs]
+
+
+def shards(inputs, count):
+    """Split inputs (sorted by employee id) into at most count contiguous id ranges"""
+    size = max(1, math.ceil(len(inputs) / max(1, count)))
+    return [inputs[start:start + size] for start in range(0, len(inputs), size)]
+
+
+def payroll_pool(workers):
+    """
+    A process pool for PayrollRun. Workers are spawned rather than forked so
+    they never inherit the parent's open database connections; each one sets
+    up Django before its first shard. Reuse one pool across months.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    )
+
+
+class PayrollRun:
+    """
+    Payroll for one month. employees narrows the run to an EmployeeProfile
+    queryset (default: every active employee who had joined by month end).
+    With workers > 1 the computation runs in pool (or a pool created for
+    this run); progress(done, total) is called as shards complete.
+    """
+
+    def __init__(self, year, month, employees=None, chunk_size=CHUNK_SIZE, workers=1, pool=None, progress=None):
+        self.year = int(year)
+        self.month = int(month)
+        self.period = month_period(self.year, self.month)
+        if employees is None:
+            employees = EmployeeProfile.objects.filter(status='active')
+        self.employees = employees.filter(date_of_joining__lt=self.period.end)
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.pool = pool
+        self.progress = progress
+        self.working_days = OrganizationSettings.get_settings().working_days_per_month
+        self.skipped = 0
+        self.results = []
+
+    def load_inputs(self):
+        """PayrollInput per employee to (re)compute, from three queries in total"""
+        salaries = dict(self.employees.values_list('id', 'base_salary'))
+        counts = (
+            Attendance.objects
+            .filter(employee_id__in=self.employees.values('id'), date__gte=self.period.start, date__lt=self.period.end)
+            .values('employee_id')
+            .annotate(
+                present=Count('id', filter=Q(status='present')),
+                half_day=Count('id', filter=Q(status='half_day')),
+                absent=Count('id', filter=Q(status='absent')),
+                leave=Count('id', filter=Q(status='leave')),
+            )
+            .order_by()
+        )
+        attendance = {row['employee_id']: row for row in counts}
+        # Locked until the run commits, so nothing is processed underneath it
+        existing = {
+            row['employee_id']: row
+            for row in Payroll.objects.filter(
+                employee_id__in=self.employees.values('id'), year=self.year, month=self.month
+            ).select_for_update().values('employee_id', 'status', 'deductions', 'bonuses')
+        }
+
+        inputs = []
+        for employee_id in sorted(salaries):
+            current = existing.get(employee_id)
+            if current is not None and current['status'] != 'draft':
+                self.skipped += 1
+                continue
+            row = attendance.get(employee_id, {})
+            inputs.append(PayrollInput(
+                employee_id=employee_id,
+                base_salary=salaries[employee_id],
+                present=row.get('present', 0),
+                half_day=row.get('half_day', 0),
+                absent=row.get('absent', 0),
+                leave=row.get('leave', 0),
+                deductions=current['deductions'] if current else ZERO,
+                bonuses=current['bonuses'] if current else ZERO,
+            ))
+        return inputs, set(existing)
+
+    def compute(self, inputs):
+        if self.workers <= 1 or len(inputs) < MIN_PARALLEL:
+            results = compute_all(inputs, self.working_days)
+            self.report(len(results), len(inputs))
+            return results
+        if self.pool is None:
+            with payroll_pool(self.workers) as pool:
+                return self.compute_sharded(pool, inputs)
+        return self.compute_sharded(self.pool, inputs)
+
+    def compute_sharded(self, pool, inputs):
+        # map() yields in submission order, which keeps the employee id order
+        results = []
+        parts = shards(inputs, self.workers * SHARDS_PER_WORKER)
+        for part in pool.map(compute_all, parts, repeat(self.working_days)):
+            results.extend(part)
+            self.report(len(results), len(inputs))
+        return results
+
+    def report(self, done, total):
+        if self.progress is not None:
+            self.progress(done, total)
+
+    def write(self, results):
+        """Upsert the results in chunks; returns the number of rows written"""
+        now = timezone.now()
+        records = [
+            Payroll(
+                year=self.year, month=self.month, status='draft', needs_recompute=False, updated_at=now,
+                **result._asdict()
+            )
+            for result in results
+        ]
+        for start in range(0, len(records), self.chunk_size):
+            Payroll.objects.bulk_create(
+                records[start:start + self.chunk_size],
+                update_conflicts=True,
+                unique_fields=['employee', 'month', 'year'],
+                update_fields=UPDATE_FIELDS,
+            )
+        return len(records)
+
+    def run(self, dry_run=False):
+        """Compute and write the month in one transaction; returns a summary dict"""
+        timings = {}
+        with transaction.atomic():
+            started = time.perf_counter()
+            inputs, existing = self.load_inputs()
+            timings['load'] = time.perf_counter() - started
+            results = self.compute(inputs)
+            timings['compute'] = time.perf_counter() - started - timings['load']
+            if not dry_run:
+                self.write(results)
+            timings['write'] = time.perf_counter() - started - timings['load'] - timings['compute']
+        self.results = results
+        updated = sum(1 for result in results if result.employee_id in existing)
+        return {
+            'year': self.year,
+            'month': self.month,
+            'working_days': self.working_days,
+            'created': len(results) - updated,
+            'updated': updated,
+            'skipped': self.skipped,
+            'total_pay': str(sum((result.final_pay for result in results), ZERO)),
+            'seconds': {phase: round(seconds, 3) for phase, seconds in timings.items()},
+        }
+
+
+def mark_stale(keys):
+    """
+    Flag the draft payroll of each (employee_id, year, month) for recompute,
+    with one UPDATE per month. Months without payroll yet need nothing:
+    the next run computes them from scratch.
+    """
+    by_month = defaultdict(set)
+    for key in keys:
+        if key is not None:
+            employee_id, year, month = key
+            by_month[(year, month)].add(employee_id)
+    for (year, month), employee_ids in by_month.items():
+        Payroll.objects.filter(
+            year=year, month=month, employee_id__in=employee_ids, status='draft', needs_recompute=False
+        ).update(needs_recompute=True)
+
+
+def recompute_stale(workers=1, pool=None, progress=None):
+    """
+    Rerun every stale draft, one PayrollRun per month; returns the run
+    summaries. Stale drafts the run skips are left as they are, unflagged.
+    """
+    stale = defaultdict(list)
+    rows = Payroll.objects.filter(needs_recompute=True, status='draft').values_list('year', 'month', 'employee_id')
+    for year, month, employee_id in rows:
+        stale[(year, month)].append(employee_id)
+    summaries = []
+    for (year, month), employee_ids in sorted(stale.items()):
+        run = PayrollRun(
+            year, month,
+            employees=EmployeeProfile.objects.filter(id__in=employee_ids),
+            workers=workers, pool=pool, progress=progress,
+        )
+        summaries.append(run.run())
+        # Drafts of employees the run no longer covers (date_of_joining moved
+        # past the month) were not rewritten; clear their flag so they are
+        # not picked up again on every pass
+        written = {result.employee_id for result in run.results}
+        Payroll.objects.filter(
+            year=year, month=month, employee_id__in=set(employee_ids) - written, needs_recompute=True
+        ).update(needs_recompute=False)
+    return summaries
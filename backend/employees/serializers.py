@@ -3,6 +3,7 @@ Serializers for HR models
 """
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
+from django.db.models import Count, Prefetch
 from accounts.models import User
 from accounts.serializers import UserSerializer
 from .models import Team, EmployeeProfile, Attendance, Payroll, OrganizationSettings, SystemPreferences
@@ -19,6 +20,11 @@ class TeamSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'manager', 'manager_id', 'member_count', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Join the manager chain the serializer renders and count members in SQL"""
+        return queryset.select_related('manager__manager').annotate(employee_count=Count('employees'))
+
     def create(self, validated_data):
         manager_id = validated_data.pop('manager_id', None)
         team = Team.objects.create(**validated_data)
@@ -54,6 +60,7 @@ class EmployeeProfileSerializer(serializers.ModelSerializer):
     """Serializer for EmployeeProfile"""
     user = UserSerializer(read_only=True)
     user_id = serializers.IntegerField(write_only=True, required=False)
+    user_data = serializers.DictField(write_only=True, required=False)
     team = TeamSerializer(read_only=True)
     team_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -66,9 +73,17 @@ class EmployeeProfileSerializer(serializers.ModelSerializer):
             'position', 'base_salary', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
-        extra_kwargs = {
-            'user_data': {'write_only': True, 'required': False}
-        }
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, prefix=''):
+        """
+        Join the user and their manager; teams (with member counts) come
+        from one extra query. prefix reaches the profile through a relation,
+        e.g. 'employee__' for attendance and payroll.
+        """
+        return queryset.select_related(f'{prefix}user__manager').prefetch_related(
+            Prefetch(f'{prefix}team', queryset=TeamSerializer.setup_eager_loading(Team.objects.all()))
+        )
 
     def create(self, validated_data):
         user_id = validated_data.pop('user_id', None)
@@ -121,6 +136,12 @@ class AttendanceSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'marked_by', 'created_at', 'updated_at']
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return EmployeeProfileSerializer.setup_eager_loading(
+            queryset.select_related('marked_by__manager'), prefix='employee__'
+        )
+
     def create(self, validated_data):
         employee_id = validated_data.pop('employee_id')
         employee = EmployeeProfile.objects.get(id=employee_id)
@@ -144,9 +165,13 @@ class PayrollSerializer(serializers.ModelSerializer):
             'id', 'employee', 'employee_id', 'month', 'year', 'base_salary',
             'days_worked', 'days_present', 'days_absent', 'days_on_leave',
             'deductions', 'bonuses', 'final_pay', 'status', 'status_display',
-            'created_at', 'updated_at'
+            'needs_recompute', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'final_pay', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'final_pay', 'needs_recompute', 'created_at', 'updated_at']
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return EmployeeProfileSerializer.setup_eager_loading(queryset, prefix='employee__')
 
     def create(self, validated_data):
         employee_id = validated_data.pop('employee_id')
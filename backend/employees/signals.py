@@ -0,0 +1,30 @@
+"""
+Signal handlers for the employees app
+Publish attendance changes to the change feed and flag the draft payroll
+of the months they touch for recompute
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.events import attendance_event, publish
+from .models import Attendance
+from .payroll import mark_stale
+
+
+@receiver(post_save, sender=Attendance)
+def publish_attendance_change(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    publish(attendance_event(
+        'created' if created else 'updated', instance.pk, instance.employee_id, instance.date, instance.status
+    ))
+    # A moved record (new date or employee) changes its old month as well
+    new_key = instance.get_payroll_key()
+    mark_stale({getattr(instance, '_payroll_key', None), new_key})
+    instance._payroll_key = new_key
+
+
+@receiver(post_delete, sender=Attendance)
+def publish_attendance_delete(sender, instance, **kwargs):
+    publish(attendance_event('deleted', instance.pk, instance.employee_id, instance.date))
+    mark_stale([getattr(instance, '_payroll_key', None) or instance.get_payroll_key()])
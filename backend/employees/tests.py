@@ -1,3 +1,724 @@
+import base64
+import json
+from datetime import date, timedelta
+from unittest import mock
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from accounts.serializers import CustomTokenObtainPairSerializer
+from core.periods import Period, calendar_period, filter_months, month_period, next_month, parse_period
+from core.query_plans import QueryPlanAssertions, employee_queries, range_queries
+
+from tasks.models import Task
+from .models import Attendance, EmployeeProfile, OrganizationSettings, Payroll, Team
+from .payroll import PayrollInput, PayrollRun, compute, recompute_stale, shards
+
+
+def authenticate(client, user):
+    token = CustomTokenObtainPairSerializer.get_token(user).access_token
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+class EmployeeQueryPlanTests(QueryPlanAssertions, TestCase):
+    def test_hot_queries_use_an_index(self):
+        for name, queryset in employee_queries():
+            with self.subTest(name):
+                self.assertUsesIndex(name, queryset)
+
+    def test_period_filters_are_range_scans(self):
+        for name, queryset in range_queries():
+            with self.subTest(name):
+                self.assertRangeScan(name, queryset)
+
+
+class DashboardStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='admin')
+        cls.manager = User.objects.create(username='manager', role='manager')
+        cls.member = User.objects.create(username='member', role='user', manager=cls.manager)
+        cls.outsider = User.objects.create(username='outsider', role='user')
+        today = timezone.localdate()
+        for number, (status, due_days) in enumerate([
+            ('todo', -3), ('todo', 2), ('inprogress', -1), ('inprogress', None), ('completed', -5), ('completed', 4),
+        ]):
+            due_date = today + timedelta(days=due_days) if due_days is not None else None
+            for creator, assignee in ((cls.admin, cls.member), (cls.manager, cls.outsider), (cls.admin, cls.outsider)):
+                Task.objects.create(
+                    title=f'Task {number}', status=status, due_date=due_date, created_by=creator, assigned_to=assignee
+                )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def visible(self, user):
+        if user.role == 'admin':
+            return Task.objects.all()
+        if user.role == 'manager':
+            return Task.objects.filter(Q(created_by=user) | Q(assigned_to__manager=user))
+        return Task.objects.filter(assigned_to=user)
+
+    def test_task_counts_match_a_direct_count(self):
+        for user in (self.admin, self.manager, self.member, self.outsider):
+            with self.subTest(user=user.username):
+                authenticate(self.client, user)
+                response = self.client.get('/api/dashboard/stats/')
+                self.assertEqual(response.status_code, 200)
+                tasks = self.visible(user)
+                self.assertEqual(response.data['pending_tasks'], tasks.exclude(status='completed').count())
+                self.assertEqual(
+                    response.data['overdue_tasks'],
+                    sum(1 for task in tasks if task.is_overdue()),
+                )
+                self.assertEqual(
+                    response.data['task_status_counts'],
+                    {status: tasks.filter(status=status).count() for status, _ in Task.STATUS_CHOICES},
+                )
+
+
+class HRListQueryCountTests(TestCase):
+    """HR lists and the dashboard cost the same number of queries for 1 row or many"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='admin')
+        cls.manager = User.objects.create(username='manager', role='manager')
+        cls.lead = User.objects.create(username='lead', role='manager', manager=cls.manager)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.today = timezone.localdate()
+
+    def add_rows(self, count):
+        teams = [
+            Team.objects.create(name=f'Team {number}', manager=self.lead if number % 2 else self.manager)
+            for number in range(count)
+        ]
+        for number in range(count):
+            user = User.objects.create(username=f'employee{number}', role='user', manager=self.lead)
+            employee = EmployeeProfile.objects.create(
+                user=user, employee_id=f'E{number:04d}', date_of_joining=date(2024, 1, 1),
+                team=teams[number], base_salary=Decimal('30000.00'),
+            )
+            Attendance.objects.create(employee=employee, date=self.today, status='present', marked_by=self.manager)
+            Payroll.objects.create(
+                employee=employee, year=self.today.year, month=self.today.month, base_salary=employee.base_salary
+            )
+            Task.objects.create(title=f'Task {number}', created_by=self.manager, assigned_to=user)
+
+    def login(self, user):
+        authenticate(self.client, user)
+        # The auth version and visibility scope are cached after the first request
+        self.assertEqual(self.client.get('/api/dashboard/stats/').status_code, 200)
+
+    def assertQueries(self, url, expected):
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def check_counts(self, count):
+        self.add_rows(count)
+        for user in (self.admin, self.manager):
+            with self.subTest(role=user.role, rows=count):
+                self.login(user)
+                # count + page, member counts joined in
+                teams = self.assertQueries('/api/teams/', 2).data['results']
+                self.assertEqual({team['member_count'] for team in teams}, {1})
+                # count + page + teams
+                self.assertEqual(self.assertQueries('/api/employees/', 3).data['count'], count)
+                # count + page + teams
+                self.assertEqual(self.assertQueries('/api/attendance/', 3).data['count'], count)
+                self.assertEqual(self.assertQueries('/api/payroll/', 3).data['count'], count)
+                response = self.assertQueries('/api/dashboard/stats/', 8)
+                self.assertEqual(response.data['total_employees'], count)
+
+    def test_one_row(self):
+        self.check_counts(1)
+
+    def test_many_rows(self):
+        self.check_counts(12)
+
+    def test_teams_list(self):
+        team = Team.objects.create(name='Platform', manager=self.manager)
+        Team.objects.create(name='Empty')
+        for number in range(3):
+            user = User.objects.create(username=f'member{number}', role='user')
+            EmployeeProfile.objects.create(
+                user=user, employee_id=f'M{number}', date_of_joining=date(2024, 1, 1), team=team
+            )
+        self.login(self.admin)
+        response = self.client.get('/api/teams/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['name'], row['member_count'], row['manager']['id'] if row['manager'] else None)
+             for row in response.data['results']],
+            [('Empty', 0, None), ('Platform', 3, self.manager.pk)],
+        )
+        self.assertEqual(self.client.get(f'/api/teams/{team.pk}/').data['member_count'], 3)
+
+
+class PeriodTests(TestCase):
+    def test_month(self):
+        self.assertEqual(parse_period({'year': '2024', 'month': '2'}), (date(2024, 2, 1), date(2024, 3, 1)))
+        self.assertEqual(month_period(2024, 12), (date(2024, 12, 1), date(2025, 1, 1)))
+
+    def test_december_rolls_over_to_january(self):
+        self.assertEqual(next_month(date(2024, 12, 1)), date(2025, 1, 1))
+        self.assertEqual(next_month(date(2024, 1, 31)), date(2024, 2, 1))
+        self.assertEqual(calendar_period({'year': 2024, 'quarter': 4}), (date(2024, 10, 1), date(2025, 1, 1)))
+
+    def test_quarter(self):
+        self.assertEqual(calendar_period({'year': 2024, 'quarter': 1}), (date(2024, 1, 1), date(2024, 4, 1)))
+        self.assertEqual(calendar_period({'year': 2024, 'quarter': 3}), (date(2024, 7, 1), date(2024, 10, 1)))
+        with self.assertRaisesMessage(ValueError, "No such quarter in year 2024."):
+            calendar_period({'year': 2024, 'quarter': 5})
+
+    def test_iso_week_53(self):
+        # 2020 has 53 ISO weeks; the last one runs into 2021
+        self.assertEqual(calendar_period({'year': 2020, 'week': 53}), (date(2020, 12, 28), date(2021, 1, 4)))
+        self.assertEqual(calendar_period({'year': 2021, 'week': 1}), (date(2021, 1, 4), date(2021, 1, 11)))
+        with self.assertRaisesMessage(ValueError, "No such week in year 2021."):
+            calendar_period({'year': 2021, 'week': 53})
+
+    def test_year(self):
+        self.assertEqual(parse_period({'year': '2024'}), (date(2024, 1, 1), date(2025, 1, 1)))
+        self.assertIsNone(parse_period({}))
+
+    def test_start_and_end_date_narrow_the_period(self):
+        params = {'year': 2024, 'month': 5, 'start_date': '2024-05-10', 'end_date': '2024-05-20'}
+        self.assertEqual(parse_period(params), (date(2024, 5, 10), date(2024, 5, 21)))
+        # They never widen it
+        params = {'year': 2024, 'month': 5, 'start_date': '2024-04-01', 'end_date': '2024-06-30'}
+        self.assertEqual(parse_period(params), (date(2024, 5, 1), date(2024, 6, 1)))
+        # On their own they give an open or closed range
+        self.assertEqual(parse_period({'start_date': '2024-05-10'}), (date(2024, 5, 10), None))
+        self.assertEqual(parse_period({'end_date': '2024-05-10'}), (None, date(2024, 5, 11)))
+        # An end before the start selects nothing
+        params = {'start_date': '2024-05-10', 'end_date': '2024-05-01'}
+        self.assertEqual(parse_period(params), (date(2024, 5, 10), date(2024, 5, 10)))
+
+    def test_invalid_params(self):
+        for params, message in (
+            ({'month': 5}, "year is required with month."),
+            ({'week': 5}, "year is required with week."),
+            ({'year': 2024, 'month': 5, 'quarter': 2}, "Use only one of month, quarter and week (got month and quarter)."),
+            ({'year': 'last'}, "year must be a whole number."),
+            ({'year': 2024, 'month': 13}, "No such month in year 2024."),
+            ({'start_date': '2024-02-30'}, "start_date must be a valid date (YYYY-MM-DD)."),
+            ({'year': 9999, 'month': 12}, "No such month in year 9999."),
+            ({'year': 9999}, "No such year in year 9999."),
+            ({'year': 9999, 'quarter': 4}, "No such quarter in year 9999."),
+            ({'year': 9999, 'week': 52}, "No such week in year 9999."),
+        ):
+            with self.subTest(params=params), self.assertRaisesMessage(ValueError, message):
+                parse_period(params)
+
+    def test_last_representable_dates(self):
+        self.assertEqual(parse_period({'end_date': '9999-12-31'}), (None, None))
+        self.assertEqual(
+            parse_period({'start_date': '9999-12-01', 'end_date': '9999-12-31'}), (date(9999, 12, 1), None)
+        )
+        self.assertEqual(month_period(9999, 11), (date(9999, 11, 1), date(9999, 12, 1)))
+
+
+class PeriodFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='admin')
+        user = User.objects.create(username='employee', role='user')
+        cls.employee = EmployeeProfile.objects.create(user=user, employee_id='E1', date_of_joining=date(2020, 1, 1))
+        for day in (date(2023, 12, 31), date(2024, 1, 1), date(2024, 1, 31), date(2024, 2, 1)):
+            Attendance.objects.create(employee=cls.employee, date=day, status='present')
+        for year, month in ((2023, 11), (2023, 12), (2024, 1), (2024, 2), (2024, 3)):
+            Payroll.objects.create(employee=cls.employee, year=year, month=month, base_salary=Decimal('1000.00'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        authenticate(self.client, self.admin)
+
+    def months(self, queryset):
+        return sorted(queryset.values_list('year', 'month'))
+
+    def test_payroll_range_across_a_year_boundary(self):
+        payroll = Payroll.objects.all()
+        self.assertEqual(
+            self.months(filter_months(payroll, Period(date(2023, 12, 15), date(2024, 2, 1)))),
+            [(2023, 12), (2024, 1)],
+        )
+        self.assertEqual(
+            self.months(filter_months(payroll, Period(date(2023, 12, 1), None))),
+            [(2023, 12), (2024, 1), (2024, 2), (2024, 3)],
+        )
+        self.assertEqual(self.months(filter_months(payroll, Period(None, date(2024, 1, 1)))), [(2023, 11), (2023, 12)])
+        response = self.client.get('/api/payroll/', {'start_date': '2023-12-15', 'end_date': '2024-02-10'})
+        self.assertEqual(
+            [(row['year'], row['month']) for row in response.data['results']],
+            [(2024, 2), (2024, 1), (2023, 12)],
+        )
+
+    def test_attendance_month_and_week(self):
+        response = self.client.get('/api/attendance/', {'year': 2024, 'month': 1})
+        self.assertEqual([row['date'] for row in response.data['results']], ['2024-01-31', '2024-01-01'])
+        # ISO week 1 of 2024 starts on Monday 1 January; week 52 of 2023 holds 31 December
+        response = self.client.get('/api/attendance/', {'year': 2023, 'week': 52})
+        self.assertEqual([row['date'] for row in response.data['results']], ['2023-12-31'])
+
+    def test_out_of_range_periods_are_bad_requests(self):
+        for url, params in (
+            ('/api/attendance/', {'year': 9999, 'month': 12}),
+            ('/api/payroll/', {'year': 9999, 'month': 12}),
+            ('/api/attendance/matrix/', {'year': 9999, 'month': 12}),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+        response = self.client.get('/api/attendance/', {'end_date': '9999-12-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 4)
+
+    def test_missing_year_is_a_bad_request(self):
+        for url in ('/api/attendance/', '/api/payroll/'):
+            with self.subTest(url=url):
+                response = self.client.get(url, {'month': 1})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data, {'error': "year is required with month."})
+
+    def test_list_filters_use_plain_range_predicates(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get('/api/attendance/', {'year': 2024, 'quarter': 1})
+            self.client.get('/api/payroll/', {'year': 2024, 'quarter': 1})
+        sql = ' '.join(query['sql'] for query in captured).lower()
+        self.assertNotIn('extract', sql)
+        self.assertNotIn('django_date_extract', sql)
+        self.assertNotIn('strftime', sql)
+
+
+class PayrollComputeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employees = [
+            EmployeeProfile.objects.create(
+                user=User.objects.create(username=f'employee{number}', role='user'),
+                employee_id=f'E{number}', date_of_joining=date(2020, 1, 1), base_salary=Decimal('26000.00'),
+            )
+            for number in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def payroll_input(self, **days):
+        values = {'present': 0, 'half_day': 0, 'absent': 0, 'leave': 0, **days}
+        return PayrollInput(
+            employee_id=1, base_salary=Decimal('26000.00'), deductions=Decimal('0.00'), bonuses=Decimal('0.00'), **values
+        )
+
+    def test_half_days_are_rounded_down(self):
+        result = compute(self.payroll_input(present=10, half_day=3, leave=2, absent=1), 26)
+        self.assertEqual(result.days_worked, 13)
+        self.assertEqual(result.days_present, 13)
+        self.assertEqual(result.days_absent, 1)
+        self.assertEqual(result.days_on_leave, 2)
+        self.assertEqual(result.final_pay, Decimal('13000.00'))
+
+    def test_paid_days_are_capped_at_working_days(self):
+        result = compute(self.payroll_input(present=25, leave=3, half_day=2), 26)
+        self.assertEqual(result.days_worked, 26)
+        self.assertEqual(result.final_pay, Decimal('26000.00'))
+
+    def test_run_keeps_draft_adjustments_and_skips_processed(self):
+        draft_employee, processed_employee = self.employees
+        for employee in self.employees:
+            for day in range(1, 14):
+                Attendance.objects.create(employee=employee, date=date(2024, 5, day), status='present')
+        draft = Payroll.objects.create(
+            employee=draft_employee, year=2024, month=5, base_salary=Decimal('26000.00'),
+            deductions=Decimal('500.00'), bonuses=Decimal('200.00'),
+        )
+        processed = Payroll.objects.create(
+            employee=processed_employee, year=2024, month=5, base_salary=Decimal('26000.00'),
+            days_worked=20, final_pay=Decimal('20000.00'), status='processed',
+        )
+
+        summary = PayrollRun(2024, 5).run()
+
+        self.assertEqual((summary['created'], summary['updated'], summary['skipped']), (0, 1, 1))
+        draft.refresh_from_db()
+        self.assertEqual(draft.days_worked, 13)
+        self.assertEqual((draft.deductions, draft.bonuses), (Decimal('500.00'), Decimal('200.00')))
+        self.assertEqual(draft.final_pay, Decimal('12700.00'))
+        processed.refresh_from_db()
+        self.assertEqual((processed.days_worked, processed.final_pay), (20, Decimal('20000.00')))
+
+    def test_run_endpoint_parses_dry_run(self):
+        client = APIClient()
+        authenticate(client, User.objects.create(username='admin', role='admin'))
+        response = client.post('/api/payroll/run/', {'year': 2024, 'month': 5, 'dry_run': 'true'}, format='json')
+        self.assertEqual((response.status_code, response.data['created']), (200, 2))
+        self.assertFalse(Payroll.objects.exists())
+        response = client.post('/api/payroll/run/', {'year': 2024, 'month': 5, 'dry_run': 'false'}, format='json')
+        self.assertEqual((response.status_code, response.data['created']), (200, 2))
+        self.assertEqual(Payroll.objects.count(), 2)
+        for body in ({'year': 2024, 'month': 5, 'dry_run': 'perhaps'}, [2024, 5]):
+            with self.subTest(body=body):
+                self.assertEqual(client.post('/api/payroll/run/', body, format='json').status_code, 400)
+
+    def test_draft_save_reads_working_days_from_the_cache(self):
+        payroll = Payroll.objects.create(
+            employee=self.employees[0], year=2024, month=5, base_salary=Decimal('26000.00'), days_worked=13
+        )
+        self.assertEqual(payroll.final_pay, Decimal('13000.00'))
+        with self.assertNumQueries(1):
+            payroll.save()
+
+        settings = OrganizationSettings.get_settings()
+        settings.working_days_per_month = 20
+        settings.save()
+        payroll.days_worked = 10
+        payroll.save()
+        self.assertEqual(payroll.final_pay, Decimal('13000.00'))
+
+
+class StalePayrollTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='employee', role='user')
+        cls.employee = EmployeeProfile.objects.create(
+            user=user, employee_id='E1', date_of_joining=date(2020, 1, 1), base_salary=Decimal('26000.00')
+        )
+
+    def setUp(self):
+        cache.clear()
+        for month in (5, 6):
+            Payroll.objects.create(employee=self.employee, year=2024, month=month, base_salary=Decimal('26000.00'))
+
+    def stale_months(self):
+        months = sorted(Payroll.objects.filter(needs_recompute=True).values_list('month', flat=True))
+        Payroll.objects.update(needs_recompute=False)
+        return months
+
+    def test_attendance_changes_flag_their_months(self):
+        attendance = Attendance.objects.create(employee=self.employee, date=date(2024, 5, 2), status='present')
+        self.assertEqual(self.stale_months(), [5])
+
+        attendance.status = 'absent'
+        attendance.save()
+        self.assertEqual(self.stale_months(), [5])
+
+        attendance.date = date(2024, 6, 3)
+        attendance.save()
+        self.assertEqual(self.stale_months(), [5, 6])
+
+        attendance = Attendance.objects.get(pk=attendance.pk)
+        attendance.date = date(2024, 5, 3)
+        attendance.save()
+        self.assertEqual(self.stale_months(), [5, 6])
+
+        Attendance.objects.get(pk=attendance.pk).delete()
+        self.assertEqual(self.stale_months(), [5])
+
+    def test_processed_and_paid_payroll_is_never_flagged(self):
+        Payroll.objects.filter(month=5).update(status='processed')
+        Payroll.objects.filter(month=6).update(status='paid')
+        attendance = Attendance.objects.create(employee=self.employee, date=date(2024, 5, 2), status='present')
+        attendance.date = date(2024, 6, 3)
+        attendance.save()
+        attendance.delete()
+        self.assertEqual(self.stale_months(), [])
+
+    def test_save_recomputes_draft_pay(self):
+        payroll = Payroll.objects.get(month=5)
+        payroll.days_worked = 13
+        payroll.bonuses = Decimal('100.00')
+        payroll.save()
+        self.assertEqual(payroll.final_pay, Decimal('13100.00'))
+
+        payroll.status = 'processed'
+        payroll.days_worked = 26
+        payroll.save()
+        self.assertEqual(payroll.final_pay, Decimal('13100.00'))
+
+    def test_recompute_stale_reruns_flagged_drafts(self):
+        for day in range(1, 11):
+            Attendance.objects.create(employee=self.employee, date=date(2024, 5, day), status='present')
+
+        summaries = recompute_stale()
+
+        self.assertEqual([(summary['month'], summary['updated']) for summary in summaries], [(5, 1)])
+        payroll = Payroll.objects.get(month=5)
+        self.assertEqual((payroll.days_worked, payroll.final_pay), (10, Decimal('10000.00')))
+        self.assertFalse(payroll.needs_recompute)
+        self.assertEqual(recompute_stale(), [])
+
+    def test_recompute_stale_clears_drafts_the_run_skips(self):
+        Attendance.objects.create(employee=self.employee, date=date(2024, 5, 2), status='present')
+        EmployeeProfile.objects.filter(pk=self.employee.pk).update(date_of_joining=date(2024, 7, 1))
+
+        summaries = recompute_stale()
+
+        self.assertEqual([(summary['month'], summary['updated']) for summary in summaries], [(5, 0)])
+        self.assertFalse(Payroll.objects.filter(needs_recompute=True).exists())
+        self.assertEqual(recompute_stale(), [])
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='admin')
+        for number in range(5):
+            user = User.objects.create(username=f'employee{number}', role='user')
+            employee = EmployeeProfile.objects.create(
+                user=user, employee_id=f'E{number}', date_of_joining=date(2020, 1, 1)
+            )
+            # Every record shares its date with four others
+            for day in (date(2024, 5, 1), date(2024, 5, 2), date(2024, 5, 3)):
+                Attendance.objects.create(employee=employee, date=day, status='present')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        authenticate(self.client, self.admin)
+
+    def cursor(self, values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+    def test_pages_continue_across_ties_on_the_leading_column(self):
+        expected = list(Attendance.objects.order_by('-date', '-id').values_list('id', flat=True))
+        seen = []
+        response = self.client.get('/api/attendance/', {'pagination': 'cursor', 'page_size': 3})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_is_not_found(self):
+        for cursor in ('not-base64!', self.cursor(['2024-05-01']), self.cursor(['x', 'y']), self.cursor([None, 1])):
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/attendance/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.data, {'detail': 'Invalid cursor'})
+
+    def test_page_numbers_without_cursor_mode(self):
+        response = self.client.get('/api/attendance/', {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 15)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+        self.assertEqual(
+            [row['id'] for row in response.data['results']],
+            list(Attendance.objects.order_by('-date', '-id').values_list('id', flat=True))[10:],
+        )
+
+
+class AttendanceBulkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create(username='manager', role='manager')
+        cls.employees = [
+            EmployeeProfile.objects.create(
+                user=User.objects.create(username=f'member{number}', role='user', manager=cls.manager),
+                employee_id=f'E{number}', date_of_joining=date(2020, 1, 1),
+            )
+            for number in range(2)
+        ]
+        cls.outsider = EmployeeProfile.objects.create(
+            user=User.objects.create(username='outsider', role='user'),
+            employee_id='E9', date_of_joining=date(2020, 1, 1),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        authenticate(self.client, self.manager)
+
+    def bulk(self, records, **body):
+        return self.client.post('/api/attendance/bulk/', {'records': records, **body}, format='json')
+
+    def statuses(self, response):
+        return [result['status'] for result in response.data['results']]
+
+    def test_records_are_upserted(self):
+        first, second = self.employees
+        response = self.bulk(
+            [{'employee_id': first.pk}, {'employee_id': second.pk, 'status': 'absent'}], date='2024-05-02'
+        )
+        self.assertEqual((response.status_code, response.data['applied']), (200, True))
+        self.assertEqual(self.statuses(response), [201, 201])
+        response = self.bulk([{'employee_id': first.pk, 'date': '2024-05-02', 'status': 'leave'}])
+        self.assertEqual(self.statuses(response), [200])
+        self.assertEqual(response.data['results'][0]['id'], Attendance.objects.get(employee=first).pk)
+        self.assertEqual(
+            dict(Attendance.objects.values_list('employee_id', 'status')),
+            {first.pk: 'leave', second.pk: 'absent'},
+        )
+
+    def test_out_of_scope_and_duplicate_records_fail(self):
+        first, _ = self.employees
+        response = self.bulk([
+            {'employee_id': first.pk},
+            {'employee_id': self.outsider.pk},
+            {'employee_id': first.pk, 'status': 'absent'},
+        ], date='2024-05-02')
+        self.assertEqual(self.statuses(response), [201, 404, 400])
+        self.assertEqual(list(Attendance.objects.values_list('employee_id', 'status')), [(first.pk, 'present')])
+
+    def test_atomic_request_writes_nothing_on_error(self):
+        first, _ = self.employees
+        records = [{'employee_id': first.pk}, {'employee_id': self.outsider.pk}]
+        response = self.bulk(records, date='2024-05-02', atomic='true')
+        self.assertEqual((response.status_code, response.data['applied']), (400, False))
+        self.assertFalse(Attendance.objects.exists())
+        response = self.bulk(records, date='2024-05-02', atomic='false')
+        self.assertEqual((response.status_code, response.data['applied']), (200, True))
+        self.assertEqual(Attendance.objects.count(), 1)
+
+    def test_nothing_applied_when_every_record_fails(self):
+        response = self.bulk([{'employee_id': self.outsider.pk}, {'status': 'present'}], date='2024-05-02')
+        self.assertEqual((response.status_code, response.data['applied']), (200, False))
+        self.assertEqual(self.statuses(response), [404, 400])
+
+    def test_bad_bodies(self):
+        response = self.client.post('/api/attendance/bulk/', [{'employee_id': self.employees[0].pk}], format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.bulk([{'employee_id': self.employees[0].pk}], date='2024-05-02', atomic='maybe')
+        self.assertEqual(response.data, {'error': "'atomic' must be a boolean."})
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_draft_payroll_is_flagged_for_recompute(self):
+        first, second = self.employees
+        draft = Payroll.objects.create(employee=first, year=2024, month=5, base_salary=Decimal('26000.00'))
+        paid = Payroll.objects.create(
+            employee=second, year=2024, month=5, base_salary=Decimal('26000.00'), status='paid'
+        )
+        self.bulk([{'employee_id': first.pk}, {'employee_id': second.pk}], date='2024-05-02')
+        draft.refresh_from_db()
+        paid.refresh_from_db()
+        self.assertTrue(draft.needs_recompute)
+        self.assertFalse(paid.needs_recompute)
+
+
+class AttendanceMatrixTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='admin')
+        cls.manager = User.objects.create(username='manager', role='manager')
+        cls.team = Team.objects.create(name='Team', manager=cls.manager)
+
+        def employee(username, number, manager=None, status='active', team=None):
+            user = User.objects.create(username=username, first_name=username.title(), role='user', manager=manager)
+            return EmployeeProfile.objects.create(
+                user=user, employee_id=f'E{number}', date_of_joining=date(2020, 1, 1), status=status, team=team
+            )
+
+        cls.alice = employee('alice', 1, cls.manager, team=cls.team)
+        cls.bob = employee('bob', 2, cls.manager)
+        cls.carol = employee('carol', 3, status='inactive')
+        cls.dave = employee('dave', 4, status='inactive')
+        for day, status in ((1, 'present'), (2, 'half_day'), (3, 'absent'), (5, 'leave'), (29, 'present')):
+            Attendance.objects.create(employee=cls.alice, date=date(2024, 2, day), status=status)
+        Attendance.objects.create(employee=cls.alice, date=date(2024, 3, 1), status='present')
+        Attendance.objects.create(employee=cls.carol, date=date(2024, 2, 10), status='present')
+        Attendance.objects.create(employee=cls.dave, date=date(2024, 3, 10), status='present')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def matrix(self, user, **params):
+        authenticate(self.client, user)
+        response = self.client.get('/api/attendance/matrix/', {'year': 2024, 'month': 2, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_codes_and_totals(self):
+        data = self.matrix(self.admin)
+        self.assertEqual((data['month'], data['year'], data['days']), (2, 2024, 29))
+        row = data['employees'][0]
+        self.assertEqual((row['id'], row['name'], row['team_id']), (self.alice.pk, 'Alice', self.team.pk))
+        self.assertEqual(row['codes'], 'PHA-L' + '-' * 23 + 'P')
+        self.assertEqual(
+            row['totals'], {'present': 2, 'absent': 1, 'half_day': 1, 'leave': 1, 'unmarked': 24}
+        )
+
+    def test_inactive_employees_only_with_records(self):
+        names = [row['name'] for row in self.matrix(self.admin)['employees']]
+        self.assertEqual(names, ['Alice', 'Bob', 'Carol'])
+        march = [row['name'] for row in self.matrix(self.admin, month=3)['employees']]
+        self.assertEqual(march, ['Alice', 'Bob', 'Dave'])
+
+    def test_scope_and_team_filter(self):
+        self.assertEqual([row['name'] for row in self.matrix(self.manager)['employees']], ['Alice', 'Bob'])
+        self.assertEqual([row['name'] for row in self.matrix(self.bob.user)['employees']], ['Bob'])
+        self.assertEqual(
+            [row['name'] for row in self.matrix(self.manager, team_id=self.team.pk)['employees']], ['Alice']
+        )
+
+    def test_invalid_parameters(self):
+        authenticate(self.client, self.admin)
+        for params in ({'team_id': 'abc'}, {'month': 13, 'year': 2024}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/attendance/matrix/', params).status_code, 400)
+
+
+class ParallelPayrollTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        statuses = ('present', 'half_day', 'absent', 'leave')
+        for number in range(12):
+            employee = EmployeeProfile.objects.create(
+                user=User.objects.create(username=f'employee{number}', role='user'),
+                employee_id=f'E{number}', date_of_joining=date(2020, 1, 1),
+                base_salary=Decimal('20000.00') + number * Decimal('1234.56'),
+            )
+            for day in range(1, 1 + number * 2):
+                Attendance.objects.create(employee=employee, date=date(2024, 5, day), status=statuses[day % 4])
+            if number % 3 == 0:
+                Payroll.objects.create(
+                    employee=employee, year=2024, month=5, base_salary=employee.base_salary,
+                    deductions=Decimal('150.00'), bonuses=Decimal('75.50'),
+                )
+
+    def test_shards_cover_every_input_once_in_order(self):
+        inputs = list(range(10))
+        for count in (1, 2, 3, 4, 10, 25):
+            with self.subTest(count=count):
+                parts = shards(inputs, count)
+                self.assertLessEqual(len(parts), count)
+                self.assertTrue(all(parts))
+                self.assertEqual([item for part in parts for item in part], inputs)
+        self.assertEqual(shards([], 4), [])
 
-# Create your tests here.
+    def test_pool_results_match_the_serial_run(self):
+        serial = PayrollRun(2024, 5)
+        serial_summary = serial.run(dry_run=True)
+        progress = []
+        with mock.patch('employees.payroll.MIN_PARALLEL', 1):
+            parallel = PayrollRun(2024, 5, workers=2, progress=lambda done, total: progress.append((done, total)))
+            parallel_summary = parallel.run(dry_run=True)
+        # Up to eight shards (two workers, four each): twelve inputs in shards of two
+        self.assertEqual(len(progress), 6)
+        self.assertEqual(progress[-1], (12, 12))
+        self.assertEqual(parallel.results, serial.results)
+        self.assertEqual(
+            {key: value for key, value in parallel_summary.items() if key != 'seconds'},
+            {key: value for key, value in serial_summary.items() if key != 'seconds'},
+        )
+        drafts = set(Payroll.objects.values_list('employee_id', flat=True))
+        self.assertEqual(
+            {result.deductions for result in parallel.results if result.employee_id in drafts}, {Decimal('150.00')}
+        )
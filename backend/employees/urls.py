@@ -5,8 +5,10 @@ from django.urls import path
 from .views import (
     TeamListCreateView, TeamDetailView,
     EmployeeListCreateView, EmployeeDetailView,
-    AttendanceListCreateView, AttendanceDetailView,
-    PayrollListCreateView, PayrollDetailView,
+    AttendanceListCreateView, AttendanceDetailView, AttendanceBulkView,
+    AttendanceMatrixView,
+    PayrollListCreateView, PayrollDetailView, PayrollRunView,
+    PayrollRecomputeView,
     dashboard_stats,
     OrganizationSettingsView, SystemPreferencesView,
     reset_user_password
@@ -23,10 +25,14 @@ urlpatterns = [
     
     # Attendance
     path('attendance/', AttendanceListCreateView.as_view(), name='attendance_list'),
+    path('attendance/bulk/', AttendanceBulkView.as_view(), name='attendance_bulk'),
+    path('attendance/matrix/', AttendanceMatrixView.as_view(), name='attendance_matrix'),
     path('attendance/<int:pk>/', AttendanceDetailView.as_view(), name='attendance_detail'),
     
     # Payroll
     path('payroll/', PayrollListCreateView.as_view(), name='payroll_list'),
+    path('payroll/run/', PayrollRunView.as_view(), name='payroll_run'),
+    path('payroll/recompute/', PayrollRecomputeView.as_view(), name='payroll_recompute'),
     path('payroll/<int:pk>/', PayrollDetailView.as_view(), name='payroll_detail'),
     
     # Dashboard stats
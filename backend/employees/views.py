@@ -1,5 +1,6 @@
-from rest_framework import generics, status, permissions
+from rest_framework import generics, serializers, status, permissions
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django.db.models import Q, Count, Sum
 from django.utils import timezone
@@ -11,7 +12,25 @@ from .serializers import (
     OrganizationSettingsSerializer, SystemPreferencesSerializer
 )
 from .permissions import IsAdmin, IsManagerOrAdmin, IsOwnerOrManagerOrAdmin
+from .bulk import BulkAttendanceProcessor, MAX_RECORDS
+from .matrix import attendance_matrix
+from .payroll import PayrollRun, recompute_stale
 from accounts.models import User
+from accounts.scope import VisibilityScope
+from core.pagination import OptionalKeysetPagination
+from core.periods import filter_dates, filter_months, month_period, parse_period
+from tasks.counters import status_counts
+from tasks.models import Task
+from tasks.serializers import TaskSerializer
+
+
+def request_period(request):
+    """The period selected by ?year / ?month / ?quarter / ?week / ?start_date / ?end_date"""
+    try:
+        return parse_period(request.query_params)
+    except ValueError as error:
+        raise ValidationError({"error": str(error)})
+
 
 class TeamListCreateView(generics.ListCreateAPIView):
     serializer_class = TeamSerializer
@@ -20,9 +39,11 @@ class TeamListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.role == 'admin':
-            return Team.objects.all().annotate(member_count=Count('employees'))
+            queryset = Team.objects.all()
         else:
-            return Team.objects.filter(manager=user).annotate(member_count=Count('employees'))
+            queryset = Team.objects.filter(manager=user)
+        # Aggregating drops Meta.ordering, so order explicitly for pagination
+        return TeamSerializer.setup_eager_loading(queryset).order_by('name', 'id')
 
 class TeamDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TeamSerializer
@@ -32,6 +53,8 @@ class TeamDetailView(generics.RetrieveUpdateDestroyAPIView):
 class EmployeeListCreateView(generics.ListCreateAPIView):
     serializer_class = EmployeeProfileSerializer
     permission_classes = [permissions.IsAuthenticated, IsManagerOrAdmin]
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ('-date_of_joining', '-id')
 
     def get_queryset(self):
         user = self.request.user
@@ -40,11 +63,12 @@ class EmployeeListCreateView(generics.ListCreateAPIView):
         team_filter = self.request.query_params.get('team', None)
         
         if user.role == 'admin':
-            queryset = EmployeeProfile.objects.select_related('user', 'team').all()
+            queryset = EmployeeProfileSerializer.setup_eager_loading(EmployeeProfile.objects.all())
         else:
-            queryset = EmployeeProfile.objects.filter(
-                user__manager=user
-            ).select_related('user', 'team')
+            scope = VisibilityScope.for_request(self.request)
+            queryset = scope.filter_employee_records(
+                EmployeeProfileSerializer.setup_eager_loading(EmployeeProfile.objects.all()), field='id'
+            )
         
         if search:
             queryset = queryset.filter(
@@ -61,7 +85,7 @@ class EmployeeListCreateView(generics.ListCreateAPIView):
         if team_filter:
             queryset = queryset.filter(team_id=team_filter)
         
-        return queryset.order_by('-date_of_joining')
+        return queryset.order_by('-date_of_joining', '-id')
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -78,47 +102,105 @@ class EmployeeDetailView(generics.RetrieveUpdateDestroyAPIView):
 class AttendanceListCreateView(generics.ListCreateAPIView):
     serializer_class = AttendanceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ('-date', '-id')
 
     def get_queryset(self):
-        user = self.request.user
         employee_id = self.request.query_params.get('employee_id', None)
-        start_date = self.request.query_params.get('start_date', None)
-        end_date = self.request.query_params.get('end_date', None)
-        month = self.request.query_params.get('month', None)
-        year = self.request.query_params.get('year', None)
+        period = request_period(self.request)
         
-        if user.role == 'admin':
-            queryset = Attendance.objects.select_related('employee__user').all()
-        elif user.role == 'manager':
-            # Manager sees their team's attendance
-            team_member_ids = User.objects.filter(manager=user).values_list('id', flat=True)
-            employee_profiles = EmployeeProfile.objects.filter(user_id__in=team_member_ids)
-            queryset = Attendance.objects.filter(employee__in=employee_profiles).select_related('employee__user')
-        else:
-            # Employee sees only their own attendance
-            try:
-                employee_profile = EmployeeProfile.objects.get(user=user)
-                queryset = Attendance.objects.filter(employee=employee_profile).select_related('employee__user')
-            except EmployeeProfile.DoesNotExist:
-                queryset = Attendance.objects.none()
+        # Admin sees everything, managers their team, employees their own records
+        scope = VisibilityScope.for_request(self.request)
+        queryset = scope.filter_employee_records(
+            AttendanceSerializer.setup_eager_loading(Attendance.objects.all())
+        )
         
         if employee_id:
             queryset = queryset.filter(employee_id=employee_id)
         
-        if start_date:
-            queryset = queryset.filter(date__gte=start_date)
+        # Range predicates on date, never date__month / date__year (see core.periods)
+        queryset = filter_dates(queryset, period)
         
-        if end_date:
-            queryset = queryset.filter(date__lte=end_date)
-        
-        if month and year:
-            queryset = queryset.filter(date__month=month, date__year=year)
-        
-        return queryset.order_by('-date')
+        return queryset.order_by('-date', '-id')
 
     def perform_create(self, serializer):
         serializer.save(marked_by=self.request.user)
 
+class AttendanceBulkView(generics.GenericAPIView):
+    """
+    Mark attendance for up to MAX_RECORDS employee-days in one request.
+    Body: {"date": "2024-05-01", "records": [...], "atomic": false}
+    Existing (employee, date) records are overwritten. Valid records are
+    written in one transaction; with "atomic": true nothing is written if
+    any record fails. Returns per-item results, and whether anything was
+    written as "applied".
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, dict):
+            return Response(
+                {"error": "The request body must be an object."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        records = request.data.get('records')
+        if not isinstance(records, list) or not records:
+            return Response(
+                {"error": "'records' must be a non-empty list."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(records) > MAX_RECORDS:
+            return Response(
+                {"error": f"At most {MAX_RECORDS} records are allowed per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            atomic = serializers.BooleanField().to_internal_value(request.data.get('atomic', False))
+        except serializers.ValidationError:
+            return Response(
+                {"error": "'atomic' must be a boolean."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        processor = BulkAttendanceProcessor(
+            request.user, VisibilityScope.for_request(request), records,
+            date=request.data.get('date'), atomic=atomic
+        )
+        results, has_errors = processor.run()
+        response_status = status.HTTP_400_BAD_REQUEST if atomic and has_errors else status.HTTP_200_OK
+        return Response({
+            'applied': processor.written > 0,
+            'results': results,
+        }, status=response_status)
+
+
+class AttendanceMatrixView(generics.GenericAPIView):
+    """
+    Month grid of every visible employee: a status code per day plus totals.
+    Query params: month, year (default: the current month), team_id
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        today = timezone.localdate()
+        try:
+            period = month_period(
+                request.query_params.get('year', today.year), request.query_params.get('month', today.month)
+            )
+        except ValueError:
+            return Response(
+                {"error": "month and year must be a valid month (1-12) and year."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        scope = VisibilityScope.for_request(request)
+        employees = scope.filter_employee_records(EmployeeProfile.objects.all(), field='id')
+        team_id = request.query_params.get('team_id')
+        if team_id:
+            try:
+                employees = employees.filter(team_id=int(team_id))
+            except ValueError:
+                return Response({"error": "team_id must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(attendance_matrix(employees, period.start))
+
 class AttendanceDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AttendanceSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrManagerOrAdmin]
@@ -127,30 +209,24 @@ class AttendanceDetailView(generics.RetrieveUpdateDestroyAPIView):
 class PayrollListCreateView(generics.ListCreateAPIView):
     serializer_class = PayrollSerializer
     permission_classes = [permissions.IsAuthenticated, IsManagerOrAdmin]
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ('-year', '-month', '-id')
 
     def get_queryset(self):
-        user = self.request.user
         employee_id = self.request.query_params.get('employee_id', None)
-        month = self.request.query_params.get('month', None)
-        year = self.request.query_params.get('year', None)
+        period = request_period(self.request)
         
-        if user.role == 'admin':
-            queryset = Payroll.objects.select_related('employee__user').all()
-        else:
-            team_member_ids = User.objects.filter(manager=user).values_list('id', flat=True)
-            employee_profiles = EmployeeProfile.objects.filter(user_id__in=team_member_ids)
-            queryset = Payroll.objects.filter(employee__in=employee_profiles).select_related('employee__user')
+        scope = VisibilityScope.for_request(self.request)
+        queryset = scope.filter_employee_records(
+            PayrollSerializer.setup_eager_loading(Payroll.objects.all())
+        )
         
         if employee_id:
             queryset = queryset.filter(employee_id=employee_id)
         
-        if month:
-            queryset = queryset.filter(month=month)
+        queryset = filter_months(queryset, period)
         
-        if year:
-            queryset = queryset.filter(year=year)
-        
-        return queryset.order_by('-year', '-month')
+        return queryset.order_by('-year', '-month', '-id')
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -159,6 +235,46 @@ class PayrollListCreateView(generics.ListCreateAPIView):
             raise PermissionDenied("Only Admin can create payroll records.")
         serializer.save()
 
+class PayrollRunView(generics.GenericAPIView):
+    """
+    Generate a month's payroll for every active employee from attendance.
+    Body: {"year": 2024, "month": 5, "dry_run": false}
+    Drafts are recomputed; processed and paid payroll is left alone.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdmin]
+
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, dict):
+            return Response(
+                {"error": "The request body must be an object."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            dry_run = serializers.BooleanField().to_internal_value(request.data.get('dry_run', False))
+        except serializers.ValidationError:
+            return Response(
+                {"error": "'dry_run' must be a boolean."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            run = PayrollRun(request.data.get('year'), request.data.get('month'))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "year and month must be a valid month (1-12) and year."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(run.run(dry_run=dry_run))
+
+class PayrollRecomputeView(generics.GenericAPIView):
+    """
+    Recompute every draft payroll whose attendance changed since it was
+    computed (needs_recompute), in bulk. Returns one summary per month.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdmin]
+
+    def post(self, request, *args, **kwargs):
+        return Response({'months': recompute_stale()})
+
 class PayrollDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PayrollSerializer
     permission_classes = [permissions.IsAuthenticated, IsManagerOrAdmin]
@@ -169,25 +285,13 @@ class PayrollDetailView(generics.RetrieveUpdateDestroyAPIView):
 def dashboard_stats(request):
     user = request.user
     today = timezone.now().date()
+    scope = VisibilityScope.for_request(request)
     if user.role == "admin":
         employees = EmployeeProfile.objects.filter(status='active')
-        all_users = User.objects.filter(role='user')
-        tasks = None
     elif user.role == "manager":
-        team_member_ids = User.objects.filter(manager=user).values_list('id', flat=True)
-        employees = EmployeeProfile.objects.filter(user_id__in=team_member_ids, status='active')
-        all_users = User.objects.filter(manager=user, role='user')
-        tasks = None
+        employees = scope.filter_employee_records(EmployeeProfile.objects.filter(status='active'), field='id')
     else:
-        try:
-            employee_profile = EmployeeProfile.objects.get(user=user)
-            employees = EmployeeProfile.objects.filter(id=employee_profile.id)
-            all_users = User.objects.filter(id=user.id)
-            tasks = None
-        except EmployeeProfile.DoesNotExist:
-            employees = EmployeeProfile.objects.none()
-            all_users = User.objects.none()
-            tasks = None
+        employees = scope.filter_employee_records(EmployeeProfile.objects.all(), field='id')
     total_employees = employees.count()
     present_today = Attendance.objects.filter(
         employee__in=employees,
@@ -199,44 +303,28 @@ def dashboard_stats(request):
         date=today,
         status='leave'
     ).count()
-    try:
-        from tasks.models import Task
-        if user.role == "admin":
-            pending_tasks = Task.objects.exclude(status='completed').count()
-        elif user.role == "manager":
-            team_member_ids = User.objects.filter(manager=user).values_list('id', flat=True)
-            pending_tasks = Task.objects.filter(
-                Q(created_by=user) | Q(assigned_to__in=team_member_ids)
-            ).exclude(status='completed').count()
-        else:
-            pending_tasks = Task.objects.filter(assigned_to=user).exclude(status='completed').count()
-    except:
-        pending_tasks = 0
-    recent_employees = employees.select_related('user', 'team').order_by('-date_of_joining')[:5]
+    # Status counts come from the materialized counters (O(team size) rows)
+    task_status_counts = status_counts(scope)
+    pending_tasks = sum(
+        total for task_status, total in task_status_counts.items() if task_status != 'completed'
+    )
+    overdue_tasks = scope.filter_tasks(Task.objects.all()).overdue().count()
+    recent_employees = EmployeeProfileSerializer.setup_eager_loading(employees).order_by('-date_of_joining')[:5]
     employee_serializer = EmployeeProfileSerializer(recent_employees, many=True)
-    try:
-        from tasks.models import Task
-        from tasks.serializers import TaskSerializer
-        if user.role == "admin":
-            recent_tasks = Task.objects.all().order_by('-created_at')[:5]
-        elif user.role == "manager":
-            team_member_ids = User.objects.filter(manager=user).values_list('id', flat=True)
-            recent_tasks = Task.objects.filter(
-                Q(created_by=user) | Q(assigned_to__in=team_member_ids)
-            ).order_by('-created_at')[:5]
-        else:
-            recent_tasks = Task.objects.filter(assigned_to=user).order_by('-created_at')[:5]
-        task_serializer = TaskSerializer(recent_tasks, many=True)
-    except:
-        task_serializer = []
+    recent_tasks = scope.filter_tasks(
+        TaskSerializer.setup_eager_loading(Task.objects.all())
+    ).order_by('-created_at')[:5]
+    task_serializer = TaskSerializer(recent_tasks, many=True)
     
     return Response({
         'total_employees': total_employees,
         'present_today': present_today,
         'on_leave': on_leave_today,
         'pending_tasks': pending_tasks,
+        'overdue_tasks': overdue_tasks,
+        'task_status_counts': task_status_counts,
         'recent_employees': employee_serializer.data,
-        'recent_tasks': task_serializer if isinstance(task_serializer, list) else task_serializer.data,
+        'recent_tasks': task_serializer.data,
     })
 
 
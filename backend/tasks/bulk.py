@@ -0,0 +1,225 @@
+"""
+Bulk task operations
+Applies many create/update/delete operations with the same role rules as
+TaskListCreateView and TaskRetrieveUpdateDeleteView, writing everything with
+bulk_create / bulk_update / one DELETE inside a single transaction.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from core.events import publish, task_event
+from . import calendar, counters
+from .sync import record_tombstones
+from .models import Task
+from .serializers import TaskSerializer
+
+MAX_OPERATIONS = 500
+OPERATIONS = ('create', 'update', 'delete')
+UPDATE_FIELDS = ['title', 'description', 'status', 'due_date', 'assigned_to', 'assigned_at', 'updated_at']
+
+
+class BulkTaskProcessor:
+    """
+    Validates a list of operations, then writes the valid ones.
+    Each operation is {"op": "create", "data": {...}},
+    {"op": "update", "id": 1, "data": {...}} or {"op": "delete", "id": 1}.
+    A task takes at most one update or delete per request; later ones fail.
+    """
+
+    def __init__(self, user, scope, operations, atomic=False):
+        self.user = user
+        self.scope = scope
+        self.operations = operations
+        self.atomic = atomic
+        self.results = [None] * len(operations)
+        self.to_create = []
+        self.to_update = {}
+        self.to_delete = set()
+
+    def run(self):
+        """Process all operations; returns (results, has_errors)"""
+        tasks = self.load_tasks()
+        valid_user_ids = self.load_assignees()
+
+        for index, operation in enumerate(self.operations):
+            if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+                self.fail(index, None, 400, "Each operation needs an 'op' of create, update or delete.")
+                continue
+            op = operation['op']
+            if op == 'create':
+                self.prepare_create(index, operation, valid_user_ids)
+            else:
+                task = tasks.get(self.get_task_id(operation))
+                if task is None:
+                    self.fail(index, op, 404, "Task not found.")
+                elif task.id in self.to_update or task.id in self.to_delete:
+                    self.fail(index, op, 400, "Duplicate operation on this task in this request.")
+                elif op == 'update':
+                    self.prepare_update(index, operation, task, valid_user_ids)
+                else:
+                    self.prepare_delete(index, task)
+
+        has_errors = any(result['status'] >= 400 for result in self.results)
+        if has_errors and self.atomic:
+            return self.results, has_errors
+
+        with transaction.atomic():
+            # bulk_create / bulk_update send no signals, so counters, tombstones, feed
+            # events and the calendar cache are handled here; the DELETE below goes
+            # through post_delete
+            deltas = Counter()
+            if self.to_create:
+                created = Task.objects.bulk_create([task for _, task in self.to_create])
+                for (index, _), task in zip(self.to_create, created):
+                    self.results[index]['id'] = task.id
+                    deltas.update(counters.task_moved(None, task.get_counter_key()))
+                    publish(task_event('created', task.id, task.assigned_to_id, task.created_by_id, task.status))
+            if self.to_update:
+                updates = list(self.to_update.values())
+                # The keys captured by load_tasks() may be stale by now; lock the
+                # rows and move the counters from the buckets they are really in
+                stored = self.lock_counter_keys(self.to_update)
+                Task.objects.bulk_update(updates, UPDATE_FIELDS)
+                reassigned = []
+                for task in updates:
+                    old_key, new_key = stored.get(task.id), task.get_counter_key()
+                    if old_key is None:
+                        # Deleted since it was loaded, so bulk_update wrote nothing
+                        continue
+                    deltas.update(counters.task_moved(old_key, new_key))
+                    if old_key[0] is not None and old_key[0] != new_key[0]:
+                        reassigned.append((task.id, old_key[0], old_key[1], 'reassigned'))
+                    publish(task_event(
+                        'updated', task.id, new_key[0], new_key[1], new_key[2],
+                        previous_assigned_to_id=old_key[0] if old_key[0] != new_key[0] else None,
+                    ))
+                record_tombstones(reassigned)
+            counters.record_changes(deltas)
+            if self.to_create or self.to_update:
+                calendar.invalidate()
+            if self.to_delete:
+                Task.objects.filter(id__in=self.to_delete).delete()
+        return self.results, has_errors
+
+    def get_task_id(self, operation):
+        try:
+            return int(operation.get('id'))
+        except (TypeError, ValueError):
+            return None
+
+    def load_tasks(self):
+        """Fetch every referenced task the user can see, in one query"""
+        ids = {
+            self.get_task_id(operation)
+            for operation in self.operations
+            if isinstance(operation, dict) and operation.get('op') in ('update', 'delete')
+        }
+        ids.discard(None)
+        if not ids:
+            return {}
+        queryset = self.scope.filter_tasks(Task.objects.filter(id__in=ids))
+        return {task.id: task for task in queryset}
+
+    def lock_counter_keys(self, ids):
+        """{task id: stored counter key} of the given tasks, locked until commit"""
+        rows = Task.objects.filter(id__in=ids).select_for_update().values_list('id', *Task.COUNTER_FIELDS)
+        return {task_id: tuple(key) for task_id, *key in rows}
+
+    def load_assignees(self):
+        """Resolve every referenced assigned_to_id in one query"""
+        ids = set()
+        for operation in self.operations:
+            data = operation.get('data') if isinstance(operation, dict) else None
+            if isinstance(data, dict) and data.get('assigned_to_id'):
+                try:
+                    ids.add(int(data['assigned_to_id']))
+                except (TypeError, ValueError):
+                    pass
+        if not ids:
+            return set()
+        return set(User.objects.filter(id__in=ids).values_list('id', flat=True))
+
+    def fail(self, index, op, status_code, error):
+        self.results[index] = {'index': index, 'op': op, 'status': status_code, 'error': error}
+
+    def succeed(self, index, op, status_code, task_id=None):
+        self.results[index] = {'index': index, 'op': op, 'status': status_code, 'id': task_id}
+
+    def validate(self, index, op, data, instance=None):
+        if not isinstance(data, dict):
+            self.fail(index, op, 400, "'data' must be an object.")
+            return None
+        serializer = TaskSerializer(instance, data=data, partial=instance is not None)
+        if not serializer.is_valid():
+            self.fail(index, op, 400, serializer.errors)
+            return None
+        return serializer.validated_data
+
+    def apply_assignment(self, index, op, task, validated_data, valid_user_ids):
+        """Mirror TaskSerializer's assigned_to_id handling; returns False on an unknown user"""
+        if 'assigned_to_id' not in validated_data:
+            return True
+        assigned_to_id = validated_data.pop('assigned_to_id')
+        if assigned_to_id:
+            if assigned_to_id not in valid_user_ids:
+                self.fail(index, op, 400, {'assigned_to_id': ["User not found."]})
+                return False
+            if task.assigned_to_id != assigned_to_id:
+                task.assigned_to_id = assigned_to_id
+                task.assigned_at = timezone.now()
+        else:
+            task.assigned_to_id = None
+            task.assigned_at = None
+        return True
+
+    def prepare_create(self, index, operation, valid_user_ids):
+        if self.user.role not in ("admin", "manager"):
+            self.fail(index, 'create', 403, "Only Admin and Manager can create tasks.")
+            return
+        validated_data = self.validate(index, 'create', operation.get('data'))
+        if validated_data is None:
+            return
+        assigned_to_id = validated_data.pop('assigned_to_id', None)
+        task = Task(created_by=self.user, **validated_data)
+        if not self.apply_assignment(index, 'create', task, {'assigned_to_id': assigned_to_id}, valid_user_ids):
+            return
+        self.to_create.append((index, task))
+        self.succeed(index, 'create', 201)
+
+    def prepare_update(self, index, operation, task, valid_user_ids):
+        data = operation.get('data')
+        if self.user.role == "user":
+            if task.assigned_to_id != self.user.id:
+                self.fail(index, 'update', 403, "You can only update tasks assigned to you.")
+                return
+            if not isinstance(data, dict) or set(data.keys()) != {'status'}:
+                self.fail(index, 'update', 403, "Users can only update task status.")
+                return
+        elif not self.scope.can_manage_task(task):
+            self.fail(index, 'update', 403, "You can only update tasks for your team.")
+            return
+
+        validated_data = self.validate(index, 'update', data, instance=task)
+        if validated_data is None:
+            return
+        if not self.apply_assignment(index, 'update', task, validated_data, valid_user_ids):
+            return
+        for attr, value in validated_data.items():
+            setattr(task, attr, value)
+        # bulk_update() bypasses auto_now
+        task.updated_at = timezone.now()
+        self.to_update[task.id] = task
+        self.succeed(index, 'update', 200, task.id)
+
+    def prepare_delete(self, index, task):
+        if self.user.role == "user":
+            self.fail(index, 'delete', 403, "You do not have permission to delete tasks.")
+            return
+        if not self.scope.can_manage_task(task):
+            self.fail(index, 'delete', 403, "You can only delete tasks for your team.")
+            return
+        self.to_delete.add(task.id)
+        self.succeed(index, 'delete', 204, task.id)
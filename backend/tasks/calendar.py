@@ -0,0 +1,159 @@
+"""
+Task calendar
+Builds the bucketed response of GET /api/tasks/calendar/.
+Tasks are loaded one calendar month at a time with plain range predicates
+(due_date and assigned_at, both indexed) and cached per visibility scope
+and month. Any task write bumps a shared version number, which retires
+every cached month at once.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.periods import next_month
+from .models import Task
+from .sync import scope_fingerprint
+
+CALENDAR_MAX_DAYS = 62
+LAST_MONTH = date.max.replace(day=1)
+CACHE_TIMEOUT = 600
+VERSION_KEY = 'task_calendar:version'
+MONTH_KEY = 'task_calendar:{version}:{scope}:{month}'
+
+
+def parse_window(start_value, end_value):
+    """Validate ?start_date / ?end_date; raises ValueError with a client-facing message"""
+    if not start_value or not end_value:
+        raise ValueError("start_date and end_date are required (YYYY-MM-DD).")
+    try:
+        start, end = parse_date(start_value), parse_date(end_value)
+    except ValueError:
+        start = end = None
+    if start is None or end is None:
+        raise ValueError("start_date and end_date must be valid dates (YYYY-MM-DD).")
+    if end < start:
+        raise ValueError("end_date must not be before start_date.")
+    if end >= LAST_MONTH:
+        # Months are loaded whole, and the month after date.max's does not exist
+        raise ValueError(f"end_date must be before {LAST_MONTH.isoformat()}.")
+    if (end - start).days + 1 > CALENDAR_MAX_DAYS:
+        raise ValueError(f"The date window may span at most {CALENDAR_MAX_DAYS} days.")
+    return start, end
+
+
+def month_starts(start, end):
+    month = start.replace(day=1)
+    while month <= end:
+        yield month
+        month = next_month(month)
+
+
+def day_start(day):
+    """Aware datetime at local midnight, so assigned_at is compared without a date() cast"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_version():
+    """Retire every cached calendar month now"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, None)
+
+
+def invalidate():
+    """Retire every cached calendar month once the current transaction commits"""
+    transaction.on_commit(bump_version)
+
+
+def scope_cache_key(scope):
+    # Every admin sees the same calendar
+    return 'all' if scope.is_admin else scope_fingerprint(scope)
+
+
+def load_month(scope, month_start):
+    """Compact rows for the tasks due or assigned within one calendar month"""
+    month_end = next_month(month_start)
+    queryset = Task.objects.filter(
+        Q(due_date__gte=month_start, due_date__lt=month_end)
+        | Q(assigned_at__gte=day_start(month_start), assigned_at__lt=day_start(month_end))
+    )
+    rows = scope.filter_tasks(queryset).order_by().values(
+        'id', 'title', 'status', 'due_date', 'assigned_at', 'updated_at'
+    )
+    return [
+        {
+            'id': row['id'],
+            'title': row['title'],
+            'status': row['status'],
+            'due_date': row['due_date'],
+            'assigned_date': timezone.localdate(row['assigned_at']) if row['assigned_at'] else None,
+            'updated_at': row['updated_at'],
+        }
+        for row in rows
+    ]
+
+
+def get_months(scope, start, end):
+    """{month start: rows}, reading every month from the cache in one round trip"""
+    version = get_version()
+    scope_key = scope_cache_key(scope)
+    keys = {
+        MONTH_KEY.format(version=version, scope=scope_key, month=month.isoformat()): month
+        for month in month_starts(start, end)
+    }
+    cached = cache.get_many(list(keys))
+    months = {keys[key]: rows for key, rows in cached.items()}
+    missing = {}
+    for key, month in keys.items():
+        if month not in months:
+            months[month] = missing[key] = load_month(scope, month)
+    if missing:
+        cache.set_many(missing, CACHE_TIMEOUT)
+    return months
+
+
+def build_calendar(scope, start, end):
+    """
+    Per-day buckets between start and end (inclusive). A task appears on its
+    due day and on its assigned day; days without tasks are left out.
+    """
+    days = {}
+    for month, rows in get_months(scope, start, end).items():
+        # A task due and assigned in different months is in both months' rows;
+        # each month only fills its own days
+        first, last = max(start, month), min(end, next_month(month) - timedelta(days=1))
+        for row in rows:
+            item = None
+            for day in {row['due_date'], row['assigned_date']}:
+                if day is None or not first <= day <= last:
+                    continue
+                if item is None:
+                    item = {
+                        'id': row['id'],
+                        'title': row['title'],
+                        'status': row['status'],
+                        'due_date': row['due_date'],
+                        'assigned_date': row['assigned_date'],
+                        'is_overdue': Task(
+                            due_date=row['due_date'], status=row['status'], updated_at=row['updated_at']
+                        ).is_overdue(),
+                    }
+                days.setdefault(day, []).append(item)
+    return [
+        {'date': day, 'tasks': sorted(days[day], key=lambda item: item['id'])}
+        for day in sorted(days)
+    ]
+
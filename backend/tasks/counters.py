@@ -0,0 +1,124 @@
+"""
+Task status counters
+Incremental maintenance, rebuild and verification of TaskStatusCounter.
+Single-task saves and deletes are tracked by tasks.signals; bulk writes
+(bulk_create / bulk_update) call record_changes() themselves.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Task, TaskStatusCounter
+
+
+def bucket_filter(key):
+    assigned_to_id, created_by_id, status = key
+    return {
+        'assigned_to_id': assigned_to_id,
+        'created_by_id': created_by_id,
+        'status': status,
+    }
+
+
+def apply_delta(key, delta, model=TaskStatusCounter):
+    """Add delta to one (assigned_to_id, created_by_id, status) bucket"""
+    if not delta:
+        return
+    buckets = model.objects.filter(**bucket_filter(key))
+    if buckets.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(count=delta, **bucket_filter(key))
+    except IntegrityError:
+        # Another request created the bucket first
+        buckets.update(count=F('count') + delta)
+
+
+def record_changes(deltas):
+    """Apply a Counter of {bucket key: delta}"""
+    for key, delta in deltas.items():
+        apply_delta(key, delta)
+
+
+def task_moved(old_key, new_key):
+    """Deltas for one task moving between buckets (either key may be None)"""
+    deltas = Counter()
+    if old_key == new_key:
+        return deltas
+    if old_key is not None:
+        deltas[old_key] -= 1
+    if new_key is not None:
+        deltas[new_key] += 1
+    return deltas
+
+
+def expected_counts(tasks=None):
+    """Bucket counts computed from the task table (or a subset of it)"""
+    if tasks is None:
+        tasks = Task.objects.all()
+    rows = (
+        tasks.order_by()
+        .values('assigned_to_id', 'created_by_id', 'status')
+        .annotate(total=Count('id'))
+    )
+    return {
+        (row['assigned_to_id'], row['created_by_id'], row['status']): row['total']
+        for row in rows
+    }
+
+
+def stored_counts(model=TaskStatusCounter):
+    return {
+        (row['assigned_to_id'], row['created_by_id'], row['status']): row['count']
+        for row in model.objects.exclude(count=0).values('assigned_to_id', 'created_by_id', 'status', 'count')
+    }
+
+
+def rebuild(model=TaskStatusCounter, task_model=Task, batch_size=1000):
+    """Replace every counter row with counts aggregated from the task table"""
+    counts = expected_counts(task_model.objects.all())
+    with transaction.atomic():
+        model.objects.all().delete()
+        model.objects.bulk_create(
+            [model(count=total, **bucket_filter(key)) for key, total in counts.items()],
+            batch_size=batch_size,
+        )
+    return len(counts)
+
+
+def refresh_buckets(condition, model=TaskStatusCounter, task_model=Task):
+    """
+    Recount the buckets matching a Q over (assigned_to, created_by, status).
+    The same Q selects the tasks, since counters share the task column names.
+    """
+    counts = expected_counts(task_model.objects.filter(condition))
+    with transaction.atomic():
+        model.objects.filter(condition).delete()
+        model.objects.bulk_create(
+            [model(count=total, **bucket_filter(key)) for key, total in counts.items()]
+        )
+
+
+def verify():
+    """Return {bucket key: (stored, expected)} for every bucket that disagrees"""
+    expected = expected_counts()
+    stored = stored_counts()
+    return {
+        key: (stored.get(key, 0), expected.get(key, 0))
+        for key in set(expected) | set(stored)
+        if stored.get(key, 0) != expected.get(key, 0)
+    }
+
+
+def status_counts(scope):
+    """Per-status task counts visible to a VisibilityScope, read from the counters"""
+    counters = TaskStatusCounter.objects.all()
+    if not scope.is_admin:
+        # Counter buckets share the task column names, so the OR filter applies as is
+        counters = counters.filter(scope.task_filter(strategy='or'))
+    totals = {status: 0 for status, _ in Task.STATUS_CHOICES}
+    for row in counters.order_by().values('status').annotate(total=Sum('count')):
+        totals[row['status']] = row['total'] or 0
+    return totals
@@ -0,0 +1,116 @@
+"""
+Benchmark Task Scope Command
+Compares the manager task-scope strategies on a synthetic dataset:
+'distinct' (the former OR + DISTINCT query), 'or' and 'union'
+Run with: python manage.py benchmark_task_scope --tasks 1000000
+The synthetic rows are rolled back afterwards unless --keep is given.
+"""
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from accounts.models import User
+from accounts.scope import VisibilityScope
+from tasks.models import Task
+
+STRATEGIES = ('distinct', 'or', 'union')
+STATUSES = ('todo', 'inprogress', 'completed')
+
+
+class Command(BaseCommand):
+    help = "Benchmark manager task scoping (UNION vs OR) on synthetic tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1_000_000, help="Number of synthetic tasks")
+        parser.add_argument('--managers', type=int, default=50, help="Number of managers")
+        parser.add_argument('--team-size', type=int, default=20, help="Users per manager")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per query")
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help="Keep the synthetic rows")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            manager = self.build_dataset(rng, options)
+            self.analyze()
+            scope = VisibilityScope.compute(manager)
+            self.stdout.write(
+                f"\n{Task.objects.count():,} tasks, manager team of {len(scope.member_ids)} "
+                f"({connection.vendor})\n"
+            )
+            for label, run in self.get_queries():
+                self.stdout.write(label)
+                for strategy in STRATEGIES:
+                    timings = self.time_query(run, scope, strategy, options['repeat'])
+                    self.stdout.write(
+                        f"  {strategy:<8} median {statistics.median(timings):8.2f} ms"
+                        f"   min {min(timings):8.2f} ms"
+                    )
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def get_queries(self):
+        """The task queries issued by the task list, calendar and dashboard"""
+        return [
+            ('task list, first page', lambda qs: list(qs.order_by('-created_at', '-id')[:10])),
+            ('task list, count', lambda qs: qs.count()),
+            ('dashboard pending count', lambda qs: qs.exclude(status='completed').count()),
+            ('calendar, dated tasks', lambda qs: list(
+                qs.filter(due_date__isnull=False).values_list('id', flat=True)[:500]
+            )),
+        ]
+
+    def time_query(self, run, scope, strategy, repeat):
+        if strategy == 'distinct':
+            queryset = scope.filter_tasks(Task.objects.all(), strategy='or').distinct()
+        else:
+            queryset = scope.filter_tasks(Task.objects.all(), strategy=strategy)
+        run(queryset)  # warm up
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run(queryset)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def build_dataset(self, rng, options):
+        prefix = f"bench{rng.randrange(10**6)}"
+        managers = User.objects.bulk_create([
+            User(username=f"{prefix}_m{i}", role='manager', password='!')
+            for i in range(options['managers'])
+        ])
+        members = User.objects.bulk_create([
+            User(username=f"{prefix}_u{i}_{j}", role='user', password='!', manager=manager)
+            for i, manager in enumerate(managers)
+            for j in range(options['team_size'])
+        ])
+
+        creators = managers
+        assignees = members + [None]
+        remaining = options['tasks']
+        today = date.today()
+        while remaining > 0:
+            size = min(options['batch_size'], remaining)
+            Task.objects.bulk_create([
+                Task(
+                    title=f"Task {remaining - n}",
+                    status=rng.choice(STATUSES),
+                    created_by=rng.choice(creators),
+                    assigned_to=rng.choice(assignees),
+                    due_date=today + timedelta(days=rng.randint(-60, 60)) if rng.random() < 0.3 else None,
+                )
+                for n in range(size)
+            ], batch_size=size)
+            remaining -= size
+            self.stdout.write(f"\rinserted {options['tasks'] - remaining:,} tasks", ending='')
+            self.stdout.flush()
+        return managers[0]
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
@@ -0,0 +1,16 @@
+"""
+Prune Task Tombstones Command
+Deletes delta-sync tombstones older than TASK_TOMBSTONE_RETENTION_DAYS
+Run with: python manage.py prune_task_tombstones
+"""
+from django.core.management.base import BaseCommand
+
+from tasks.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = "Delete task tombstones older than the sync token retention window"
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} task tombstones"))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counters(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskStatusCounter = apps.get_model('tasks', 'TaskStatusCounter')
+    rows = (
+        Task.objects.order_by()
+        .values('assigned_to_id', 'created_by_id', 'status')
+        .annotate(total=Count('id'))
+    )
+    TaskStatusCounter.objects.bulk_create([
+        TaskStatusCounter(
+            assigned_to_id=row['assigned_to_id'],
+            created_by_id=row['created_by_id'],
+            status=row['status'],
+            count=row['total'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_task_overdue_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('todo', 'To Do'), ('inprogress', 'In Progress'), ('completed', 'Completed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('assigned_to', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('created_by', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Task Status Counter',
+                'verbose_name_plural': 'Task Status Counters',
+                'indexes': [models.Index(fields=['assigned_to', 'status'], name='task_counter_assignee_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('assigned_to__isnull', False)), fields=('created_by', 'assigned_to', 'status'), name='task_counter_bucket_unique'), models.UniqueConstraint(condition=models.Q(('assigned_to__isnull', True)), fields=('created_by', 'status'), name='task_counter_unassigned_unique')],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 06:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_task_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_at'], name='task_assigned_at_idx'),
+        ),
+    ]
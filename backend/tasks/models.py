@@ -2,8 +2,45 @@
 Task Model
 Defines the Task model with all required fields and relationships
 """
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
+
+
+class TaskQuerySet(models.QuerySet):
+    """Task queries computed in the database instead of per row in Python"""
+
+    @staticmethod
+    def overdue_q(today=None):
+        """
+        Same rule as Task.is_overdue():
+        - not completed and the due date has passed, or
+        - completed after the due date
+        """
+        today = today or timezone.now().date()
+        return (
+            models.Q(due_date__lt=today) & ~models.Q(status="completed")
+        ) | models.Q(
+            status="completed",
+            due_date__isnull=False,
+            updated_at__date__gt=models.F("due_date"),
+        )
+
+    def with_overdue(self, today=None):
+        """Annotate `overdue` (bool) so serializers don't call is_overdue() per row"""
+        return self.annotate(
+            overdue=models.Case(
+                models.When(self.overdue_q(today), then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            )
+        )
+
+    def overdue(self, today=None):
+        return self.filter(self.overdue_q(today))
+
+    def not_overdue(self, today=None):
+        return self.exclude(self.overdue_q(today))
 
 
 class Task(models.Model):
@@ -60,10 +97,62 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, help_text="Task creation timestamp")
     updated_at = models.DateTimeField(auto_now=True, help_text="Task last update timestamp")
 
+    objects = TaskQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']  # Order by newest first
         verbose_name = "Task"
         verbose_name_plural = "Tasks"
+        # Indexes follow the role-scoped queries in views.py and dashboard_stats
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='task_created_idx'),
+            models.Index(fields=['assigned_to', '-created_at', '-id'], name='task_assignee_created_idx'),
+            models.Index(fields=['assigned_to', 'status', '-created_at'], name='task_assignee_status_idx'),
+            models.Index(fields=['created_by', '-created_at'], name='task_creator_created_idx'),
+            models.Index(fields=['due_date'], name='task_due_date_idx'),
+            models.Index(
+                fields=['assigned_to', '-created_at'],
+                condition=~models.Q(status='completed'),
+                name='task_pending_assignee_idx',
+            ),
+            models.Index(
+                fields=['created_by'],
+                condition=~models.Q(status='completed'),
+                name='task_pending_creator_idx',
+            ),
+            # Overdue filter: open tasks by due date, completed tasks by due date
+            models.Index(
+                fields=['due_date'],
+                condition=~models.Q(status='completed'),
+                name='task_pending_due_idx',
+            ),
+            models.Index(fields=['status', 'due_date'], name='task_status_due_idx'),
+            # Delta sync (?updated_since=)
+            models.Index(fields=['updated_at', 'id'], name='task_updated_idx'),
+            # Calendar month ranges on the assignment date
+            models.Index(fields=['assigned_at'], name='task_assigned_at_idx'),
+        ]
+
+    COUNTER_FIELDS = ('assigned_to_id', 'created_by_id', 'status')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded counter bucket so saves can adjust TaskStatusCounter"""
+        instance = super().from_db(db, field_names, values)
+        instance._counter_key = instance.get_counter_key()
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Save in a transaction, so tasks.signals moves the counter under the row lock"""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def get_counter_key(self):
+        """(assigned_to_id, created_by_id, status), or None if any field is deferred"""
+        loaded = self.__dict__
+        if any(field not in loaded for field in self.COUNTER_FIELDS):
+            return None
+        return tuple(loaded[field] for field in self.COUNTER_FIELDS)
 
     def is_overdue(self):
         """
@@ -75,7 +164,6 @@ class Task(models.Model):
         if not self.due_date:
             return False
         
-        from django.utils import timezone
         today = timezone.now().date()
         
         # If task is not completed and due date has passed
@@ -93,3 +181,88 @@ class Task(models.Model):
     def __str__(self):
         """String representation of the task"""
         return f"{self.title} - {self.get_status_display()}"
+
+
+class TaskStatusCounter(models.Model):
+    """
+    Materialized task counts per (assignee, creator, status).
+    Every task falls in exactly one bucket, so summing the buckets that match a
+    visibility filter gives an exact count without touching the task table.
+    Maintained by tasks.counters; rebuild with `manage.py rebuild_task_counters`.
+    """
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Task Status Counter"
+        verbose_name_plural = "Task Status Counters"
+        # Two partial constraints so unassigned buckets are unique on every backend
+        constraints = [
+            models.UniqueConstraint(
+                fields=['created_by', 'assigned_to', 'status'],
+                condition=models.Q(assigned_to__isnull=False),
+                name='task_counter_bucket_unique',
+            ),
+            models.UniqueConstraint(
+                fields=['created_by', 'status'],
+                condition=models.Q(assigned_to__isnull=True),
+                name='task_counter_unassigned_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['assigned_to', 'status'], name='task_counter_assignee_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.assigned_to_id}/{self.created_by_id}/{self.status}: {self.count}"
+
+
+class TaskTombstone(models.Model):
+    """
+    Record of a task leaving someone's view, for delta sync.
+    Written when a task is deleted or reassigned; keeps the assignee and
+    creator it had before, so the same visibility filter as tasks applies.
+    """
+    REASON_CHOICES = (
+        ("deleted", "Deleted"),
+        ("reassigned", "Reassigned"),
+    )
+
+    task_id = models.BigIntegerField(help_text="ID of the deleted or reassigned task")
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    removed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Task Tombstone"
+        verbose_name_plural = "Task Tombstones"
+
+    def __str__(self):
+        return f"Task {self.task_id} {self.reason} at {self.removed_at}"
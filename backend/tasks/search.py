@@ -0,0 +1,81 @@
+"""
+Task full-text search
+Uses an FTS5 index on SQLite and a GIN-indexed tsvector on PostgreSQL.
+The indexes themselves are created by migration 0003_task_search_index.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'tasks_task_fts'
+
+# Must match the expression of the GIN index created in the migration,
+# otherwise PostgreSQL cannot use the index.
+PG_DOCUMENT = "to_tsvector('simple', coalesce(tasks_task.title, '') || ' ' || coalesce(tasks_task.description, ''))"
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_fts_tables = {}
+
+
+def tokenize(query):
+    """Split a raw search string into lower-case word tokens"""
+    return [token.lower() for token in TOKEN_RE.findall(query or '')]
+
+
+def has_fts_table():
+    """Check (once per connection alias) whether the SQLite FTS5 table exists"""
+    alias = connection.alias
+    if alias not in _fts_tables:
+        with connection.cursor() as cursor:
+            _fts_tables[alias] = FTS_TABLE in connection.introspection.table_names(cursor)
+    return _fts_tables[alias]
+
+
+def search_tasks(queryset, query):
+    """
+    Filter a Task queryset by a search string and annotate a `search_rank`.
+    Every token is prefix-matched and all tokens must match.
+    Lower rank values sort first on SQLite (bm25), so the rank is negated
+    there to give "higher is better" on every backend.
+    Falls back to icontains on databases without a search index.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset.filter(
+            Q(title__icontains=query) | Q(description__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    if connection.vendor == 'sqlite' and has_fts_table():
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        # The MATCH runs once as an uncorrelated IN subquery; the rank lookup
+        # is pinned to one rowid, so FTS5 seeks instead of rescanning
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = tasks_task.id',
+                [match],
+                output_field=FloatField(),
+            )
+        )
+
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        return queryset.filter(
+            RawSQL(f"{PG_DOCUMENT} @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(
+                f"ts_rank({PG_DOCUMENT}, to_tsquery('simple', %s))",
+                [tsquery],
+                output_field=FloatField(),
+            )
+        )
+
+    condition = Q()
+    for token in tokens:
+        condition &= Q(title__icontains=token) | Q(description__icontains=token)
+    return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
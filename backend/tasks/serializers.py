@@ -17,8 +17,8 @@ class TaskSerializer(serializers.ModelSerializer):
     # Computed field for status display
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     
-    # Computed field for overdue status
-    is_overdue = serializers.BooleanField(read_only=True)
+    # Computed field for overdue status (uses the `overdue` annotation when present)
+    is_overdue = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
@@ -29,6 +29,20 @@ class TaskSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "created_by", "created_at", "updated_at", "assigned_at"]
 
+    # Relations touched by the nested UserSerializer output (user + their manager)
+    related_fields = ("assigned_to__manager", "created_by__manager")
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Join every relation the serializer renders and compute overdue in SQL"""
+        return queryset.select_related(*cls.related_fields).with_overdue()
+
+    def get_is_overdue(self, obj):
+        overdue = getattr(obj, 'overdue', None)
+        if overdue is None:
+            return obj.is_overdue()
+        return overdue
+
     def create(self, validated_data):
         """
         Create a new task.
@@ -0,0 +1,77 @@
+"""
+Signal handlers for the tasks app
+Keep TaskStatusCounter and the delta-sync tombstones in step with
+single-task saves and deletes, publish them to the change feed and
+retire cached calendar months
+"""
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core.events import publish, task_event
+from . import calendar, counters
+from .sync import record_tombstones
+from .models import Task
+
+
+def stored_counter_key(instance, lock=False):
+    tasks = Task.objects.filter(pk=instance.pk)
+    if lock:
+        tasks = tasks.select_for_update()
+    return tasks.values_list(*Task.COUNTER_FIELDS).first()
+
+
+@receiver(pre_save, sender=Task)
+def remember_counter_bucket(sender, instance, raw=False, **kwargs):
+    """
+    Read the stored bucket, locked until Task.save() commits: the key captured
+    at load time is stale once another request has moved the task
+    """
+    if raw or instance._state.adding:
+        return
+    instance._counter_key = stored_counter_key(instance, lock=True)
+
+
+@receiver(pre_delete, sender=Task)
+def remember_deleted_bucket(sender, instance, **kwargs):
+    """Deletes run in a transaction; count the bucket the row is in now, if it still exists"""
+    instance._counter_key = stored_counter_key(instance, lock=True)
+
+
+@receiver(post_save, sender=Task)
+def track_task_change(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_key = None if created else getattr(instance, '_counter_key', None)
+    new_key = instance.get_counter_key() or stored_counter_key(instance)
+    counters.record_changes(counters.task_moved(old_key, new_key))
+    if old_key is not None and old_key[0] is not None and old_key[0] != new_key[0]:
+        # Reassigned: the previous assignee (and their manager) may lose sight of it
+        record_tombstones([(instance.pk, old_key[0], old_key[1], 'reassigned')])
+    publish(task_event(
+        'created' if created else 'updated', instance.pk, new_key[0], new_key[1], new_key[2],
+        previous_assigned_to_id=old_key[0] if old_key and old_key[0] != new_key[0] else None,
+    ))
+    calendar.invalidate()
+    instance._counter_key = new_key
+
+
+@receiver(post_delete, sender=Task)
+def track_task_delete(sender, instance, **kwargs):
+    counters.record_changes(counters.task_moved(instance._counter_key, None))
+    record_tombstones([(instance.pk, instance.assigned_to_id, instance.created_by_id, 'deleted')])
+    publish(task_event('deleted', instance.pk, instance.assigned_to_id, instance.created_by_id))
+    calendar.invalidate()
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def refresh_deleted_user_buckets(sender, instance, **kwargs):
+    """
+    Deleting a user unassigns their tasks with a bulk SET NULL, which sends no
+    task signals, so recount the buckets that user touched and the unassigned ones.
+    """
+    counters.refresh_buckets(
+        Q(assigned_to_id=instance.pk) | Q(created_by_id=instance.pk) | Q(assigned_to__isnull=True)
+    )
+    calendar.invalidate()
@@ -1,3 +1,703 @@
-from django.test import TestCase
+import csv
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from employees.models import EmployeeProfile
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from accounts.scope import VisibilityScope
+from accounts.serializers import CustomTokenObtainPairSerializer
+from core.events import InProcessBroker, attendance_event, get_broker, task_event
+from core.feed import event_stream
+from core.query_plans import QueryPlanAssertions, full_scans, task_queries
+from . import calendar, counters
+from .bulk import BulkTaskProcessor
+from .export import EXPORT_COLUMNS, FORMULA_PREFIXES
+from .sync import SYNC_OVERLAP, build_sync, decode_token, encode_token, prune_tombstones, scope_fingerprint
+from .models import Task, TaskTombstone
+from .search import search_tasks
+
+
+def authenticate(client, user):
+    """Send a real access token, so requests go through ClaimsJWTAuthentication"""
+    token = CustomTokenObtainPairSerializer.get_token(user).access_token
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+class SearchTasksTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='admin')
+        cls.report = Task.objects.create(
+            title='Quarterly report', description='Draft the quarterly report', created_by=cls.admin
+        )
+        cls.reporting = Task.objects.create(
+            title='Reporting dashboard', description='Charts for reporting', created_by=cls.admin
+        )
+        cls.review = Task.objects.create(
+            title='Code review', description='Mention the quarterly numbers in passing during the weekly review', created_by=cls.admin
+        )
+
+    def search(self, query):
+        return list(search_tasks(Task.objects.all(), query).order_by('-search_rank', '-id'))
+
+    def test_prefix_matching(self):
+        self.assertEqual({task.pk for task in self.search('repo')}, {self.report.pk, self.reporting.pk})
+        self.assertEqual([task.pk for task in self.search('dash')], [self.reporting.pk])
+
+    def test_every_token_must_match(self):
+        self.assertEqual([task.pk for task in self.search('quarter rep')], [self.report.pk])
+        self.assertEqual(self.search('quarter dashboard'), [])
+
+    def test_ranking_order(self):
+        # Mentions in both title and description beat a single passing one
+        results = self.search('quarterly')
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0].pk, self.report.pk)
+        self.assertEqual(results[-1].pk, self.review.pk)
+        self.assertGreater(results[0].search_rank, results[-1].search_rank)
+
+    def test_index_follows_updates_and_deletes(self):
+        self.review.title = 'Zebra crossing'
+        self.review.save()
+        self.assertEqual([task.pk for task in self.search('zebra')], [self.review.pk])
+        self.review.delete()
+        self.assertEqual(self.search('zebra'), [])
+
+    def test_icontains_fallback_without_index(self):
+        with mock.patch('tasks.search.has_fts_table', return_value=False):
+            results = self.search('EPORT')
+        self.assertEqual({task.pk for task in results}, {self.report.pk, self.reporting.pk})
+        self.assertEqual({task.search_rank for task in results}, {0.0})
+
+    def test_query_without_words_falls_back_to_icontains(self):
+        Task.objects.create(title='Fix C++ build', created_by=self.admin)
+        self.assertEqual([task.title for task in self.search('++')], ['Fix C++ build'])
+
+    def test_search_through_the_task_list(self):
+        client = APIClient()
+        authenticate(client, self.admin)
+        response = client.get('/api/tasks/', {'search': 'quarterly'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task['id'] for task in response.data['results']], [self.report.pk, self.review.pk])
+
+
+class TaskQueryPlanTests(QueryPlanAssertions, TestCase):
+    def test_hot_queries_use_an_index(self):
+        for name, queryset in task_queries():
+            with self.subTest(name):
+                self.assertUsesIndex(name, queryset)
+
+    def test_unindexed_filter_is_reported(self):
+        plan = Task.objects.filter(title='Quarterly report').order_by().explain()
+        self.assertEqual(full_scans(plan), ['tasks_task'])
+
+
+class TaskQueryCountTests(TestCase):
+    """Task endpoints cost the same number of queries for 1 task or many"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='admin')
+        cls.director = User.objects.create(username='director', role='manager')
+        cls.manager = User.objects.create(username='manager', role='manager', manager=cls.director)
+        cls.members = [
+            User.objects.create(username=f'member{number}', role='user', manager=cls.manager) for number in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.today = timezone.localdate()
+
+    def add_tasks(self, count):
+        return [
+            Task.objects.create(
+                title=f'Task {number}',
+                created_by=self.admin if number % 2 else self.manager,
+                assigned_to=self.members[number % len(self.members)],
+                assigned_at=timezone.now(),
+                due_date=self.today,
+            )
+            for number in range(count)
+        ]
+
+    def calendar_url(self):
+        month_start = self.today.replace(day=1)
+        return f'/api/tasks/calendar/?start_date={month_start}&end_date={self.today}'
+
+    def login(self, user):
+        authenticate(self.client, user)
+        # The auth version and visibility scope are cached after the first request
+        self.assertEqual(self.client.get('/api/tasks/').status_code, 200)
+
+    def assertQueries(self, url, expected):
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def check_counts(self, count):
+        tasks = self.add_tasks(count)
+        for user in (self.admin, self.manager):
+            with self.subTest(role=user.role, tasks=count):
+                self.login(user)
+                # count + page
+                response = self.assertQueries('/api/tasks/', 2)
+                self.assertEqual(response.data['count'], count)
+                self.assertQueries(f'/api/tasks/{tasks[-1].pk}/', 1)
+                # the month is loaded in one query, then served from the cache
+                calendar.bump_version()
+                response = self.assertQueries(self.calendar_url(), 1)
+                self.assertEqual(len({task['id'] for day in response.data['days'] for task in day['tasks']}), count)
+                self.assertQueries(self.calendar_url(), 0)
+
+    def test_one_task(self):
+        self.check_counts(1)
+
+    def test_many_tasks(self):
+        self.check_counts(30)
+
+    def test_calendar_window_at_the_end_of_the_date_range(self):
+        self.login(self.admin)
+        response = self.client.get('/api/tasks/calendar/?start_date=9999-11-01&end_date=9999-12-31')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'end_date must be before 9999-12-01.'})
+        # One query per month in the window
+        self.assertQueries('/api/tasks/calendar/?start_date=9999-10-01&end_date=9999-11-30', 2)
+
+    def test_nested_manager_hides_private_fields(self):
+        task = self.add_tasks(1)[0]
+        self.login(self.admin)
+        for response in (self.client.get('/api/tasks/'), self.client.get(f'/api/tasks/{task.pk}/')):
+            data = response.data['results'][0] if 'results' in response.data else response.data
+            manager = data['assigned_to']['manager']
+            self.assertEqual(manager['id'], self.manager.pk)
+            for field in ('password', 'groups', 'user_permissions'):
+                self.assertNotIn(field, manager)
+                self.assertNotIn(field, data['assigned_to'])
+                self.assertNotIn(field, data['created_by'])
+
+
+class BulkTaskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='admin')
+        cls.manager = User.objects.create(username='manager', role='manager')
+        cls.member = User.objects.create(username='member', role='user', manager=cls.manager)
+        cls.outsider = User.objects.create(username='outsider', role='user')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.team_task = Task.objects.create(title='Team task', created_by=self.admin, assigned_to=self.member)
+        self.other_task = Task.objects.create(title='Other task', created_by=self.admin, assigned_to=self.outsider)
+
+    def bulk(self, user, operations, atomic=False):
+        authenticate(self.client, user)
+        return self.client.post('/api/tasks/bulk/', {'operations': operations, 'atomic': atomic}, format='json')
+
+    def statuses(self, response):
+        return [result['status'] for result in response.data['results']]
+
+    def test_update_then_delete_of_one_task_is_rejected(self):
+        response = self.bulk(self.admin, [
+            {'op': 'update', 'id': self.team_task.pk, 'data': {'title': 'Renamed'}},
+            {'op': 'delete', 'id': self.team_task.pk},
+        ])
+        self.assertEqual(self.statuses(response), [200, 400])
+        self.team_task.refresh_from_db()
+        self.assertEqual(self.team_task.title, 'Renamed')
+
+    def test_delete_then_update_of_one_task_is_rejected(self):
+        response = self.bulk(self.admin, [
+            {'op': 'delete', 'id': self.team_task.pk},
+            {'op': 'update', 'id': self.team_task.pk, 'data': {'title': 'Renamed'}},
+        ])
+        self.assertEqual(self.statuses(response), [204, 400])
+        self.assertFalse(Task.objects.filter(pk=self.team_task.pk).exists())
+
+    def test_failed_operation_leaves_the_task_open_to_another(self):
+        response = self.bulk(self.admin, [
+            {'op': 'update', 'id': self.team_task.pk, 'data': {'status': 'nonsense'}},
+            {'op': 'update', 'id': self.team_task.pk, 'data': {'status': 'completed'}},
+        ])
+        self.assertEqual(self.statuses(response), [400, 200])
+        self.team_task.refresh_from_db()
+        self.assertEqual(self.team_task.status, 'completed')
+
+    def test_body_must_be_an_object(self):
+        authenticate(self.client, self.admin)
+        response = self.client.post('/api/tasks/bulk/', [{'op': 'delete', 'id': self.team_task.pk}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Task.objects.filter(pk=self.team_task.pk).exists())
+
+    def test_atomic_flag_is_parsed_as_a_boolean(self):
+        operations = [
+            {'op': 'update', 'id': self.team_task.pk, 'data': {'title': 'Renamed'}},
+            {'op': 'update', 'id': 0, 'data': {'title': 'Missing'}},
+        ]
+        response = self.bulk(self.admin, operations, atomic='false')
+        self.assertEqual((response.status_code, response.data['applied']), (200, True))
+        self.team_task.refresh_from_db()
+        self.assertEqual(self.team_task.title, 'Renamed')
+
+        operations[0]['data']['title'] = 'Renamed again'
+        response = self.bulk(self.admin, operations, atomic='true')
+        self.assertEqual((response.status_code, response.data['applied']), (400, False))
+        self.team_task.refresh_from_db()
+        self.assertEqual(self.team_task.title, 'Renamed')
+
+        response = self.bulk(self.admin, operations, atomic='sometimes')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': "'atomic' must be a boolean."})
+
+    def test_user_may_only_change_the_status_of_own_tasks(self):
+        response = self.bulk(self.member, [
+            {'op': 'update', 'id': self.team_task.pk, 'data': {'status': 'inprogress'}},
+            {'op': 'update', 'id': self.team_task.pk, 'data': {'title': 'Renamed'}},
+            {'op': 'delete', 'id': self.team_task.pk},
+            {'op': 'create', 'data': {'title': 'New'}},
+            {'op': 'update', 'id': self.other_task.pk, 'data': {'status': 'completed'}},
+        ])
+        # The first update is accepted, so the later ones on the same task are duplicates;
+        # the other user's task is not visible at all
+        self.assertEqual(self.statuses(response), [200, 400, 400, 403, 404])
+        response = self.bulk(self.member, [{'op': 'update', 'id': self.team_task.pk, 'data': {'title': 'Renamed'}}])
+        self.assertEqual(self.statuses(response), [403])
+        response = self.bulk(self.member, [{'op': 'delete', 'id': self.team_task.pk}])
+        self.assertEqual(self.statuses(response), [403])
+        self.team_task.refresh_from_db()
+        self.assertEqual((self.team_task.title, self.team_task.status), ('Team task', 'inprogress'))
+
+    def test_manager_sees_team_tasks_and_tasks_they_created(self):
+        created = Task.objects.create(title='Created by manager', created_by=self.manager, assigned_to=self.outsider)
+        response = self.bulk(self.manager, [
+            {'op': 'update', 'id': self.team_task.pk, 'data': {'title': 'Renamed'}},
+            {'op': 'update', 'id': self.other_task.pk, 'data': {'title': 'Renamed'}},
+            {'op': 'delete', 'id': created.pk},
+        ])
+        self.assertEqual(self.statuses(response), [200, 404, 204])
+
+    def test_manager_outside_team_is_forbidden(self):
+        # The task is visible through the org hierarchy, but the scope (as
+        # cached before the member joined the team) does not include them
+        scope = VisibilityScope(self.manager.pk, 'manager', [], [])
+        results, has_errors = BulkTaskProcessor(self.manager, scope, [
+            {'op': 'update', 'id': self.team_task.pk, 'data': {'title': 'Renamed'}},
+            {'op': 'delete', 'id': self.team_task.pk},
+        ]).run()
+        self.assertTrue(has_errors)
+        self.assertEqual([result['status'] for result in results], [403, 403])
+        self.team_task.refresh_from_db()
+        self.assertEqual(self.team_task.title, 'Team task')
+
+    def test_atomic_writes_nothing_when_an_operation_fails(self):
+        response = self.bulk(self.admin, [
+            {'op': 'create', 'data': {'title': 'New'}},
+            {'op': 'update', 'id': self.team_task.pk, 'data': {'title': 'Renamed'}},
+            {'op': 'delete', 'id': self.other_task.pk},
+            {'op': 'update', 'id': 999999, 'data': {'title': 'Missing'}},
+        ], atomic=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.data['applied'])
+        self.assertEqual(self.statuses(response), [201, 200, 204, 404])
+        self.assertEqual(Task.objects.count(), 2)
+        self.team_task.refresh_from_db()
+        self.assertEqual(self.team_task.title, 'Team task')
+
+
+class TaskCounterTests(TestCase):
+    """rebuild_task_counters --verify-only passes after every kind of task write"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='admin')
+        cls.manager = User.objects.create(username='manager', role='manager')
+        cls.first = User.objects.create(username='first', role='user', manager=cls.manager)
+        cls.second = User.objects.create(username='second', role='user', manager=cls.manager)
+
+    def setUp(self):
+        self.client = APIClient()
+        authenticate(self.client, self.manager)
+
+    def assertCountersConsistent(self):
+        self.assertEqual(counters.verify(), {})
+        out = StringIO()
+        call_command('rebuild_task_counters', verify_only=True, stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+    def create(self, **data):
+        response = self.client.post('/api/tasks/', {'title': 'Task', **data}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_create(self):
+        self.create(assigned_to_id=self.first.pk)
+        self.create()
+        Task.objects.create(title='Direct', created_by=self.admin, assigned_to=self.second)
+        self.assertCountersConsistent()
+
+    def test_update(self):
+        task_id = self.create(assigned_to_id=self.first.pk)
+        self.client.patch(f'/api/tasks/{task_id}/', {'status': 'inprogress'}, format='json')
+        authenticate(self.client, self.first)
+        self.client.patch(f'/api/tasks/{task_id}/', {'status': 'completed'}, format='json')
+        self.assertEqual(Task.objects.get(pk=task_id).status, 'completed')
+        self.assertCountersConsistent()
+
+    def test_reassign(self):
+        task_id = self.create(assigned_to_id=self.first.pk)
+        self.client.patch(f'/api/tasks/{task_id}/', {'assigned_to_id': self.second.pk}, format='json')
+        self.client.patch(f'/api/tasks/{task_id}/', {'assigned_to_id': None}, format='json')
+        self.assertCountersConsistent()
+
+    def test_bulk_operations(self):
+        keep, remove = self.create(assigned_to_id=self.first.pk), self.create()
+        response = self.client.post('/api/tasks/bulk/', {'operations': [
+            {'op': 'create', 'data': {'title': 'Bulk', 'assigned_to_id': self.second.pk}},
+            {'op': 'update', 'id': keep, 'data': {'status': 'completed', 'assigned_to_id': self.second.pk}},
+            {'op': 'delete', 'id': remove},
+        ]}, format='json')
+        self.assertEqual([result['status'] for result in response.data['results']], [201, 200, 204])
+        self.assertCountersConsistent()
+
+    def test_delete(self):
+        task_id = self.create(assigned_to_id=self.first.pk)
+        self.client.delete(f'/api/tasks/{task_id}/')
+        self.assertFalse(Task.objects.filter(pk=task_id).exists())
+        self.assertCountersConsistent()
+
+    def test_saves_of_stale_copies(self):
+        task_id = self.create(assigned_to_id=self.first.pk)
+        # Two requests load the task before either saves
+        first, second = Task.objects.get(pk=task_id), Task.objects.get(pk=task_id)
+        first.status = 'inprogress'
+        first.save()
+        second.status = 'completed'
+        second.assigned_to = self.second
+        second.save()
+        self.assertCountersConsistent()
+        stale = Task.objects.get(pk=task_id)
+        Task.objects.get(pk=task_id).delete()
+        stale.delete()
+        self.assertCountersConsistent()
+
+    def test_bulk_update_of_a_stale_copy(self):
+        task_id = self.create(assigned_to_id=self.first.pk)
+        stale = {task_id: Task.objects.get(pk=task_id)}
+        moved = Task.objects.get(pk=task_id)
+        moved.status = 'inprogress'
+        moved.save()
+        with mock.patch.object(BulkTaskProcessor, 'load_tasks', return_value=stale):
+            response = self.client.post('/api/tasks/bulk/', {'operations': [
+                {'op': 'update', 'id': task_id, 'data': {'status': 'completed'}},
+            ]}, format='json')
+        self.assertEqual([result['status'] for result in response.data['results']], [200])
+        self.assertCountersConsistent()
+
+    def test_user_delete(self):
+        self.create(assigned_to_id=self.first.pk)
+        self.create(assigned_to_id=self.second.pk, status='inprogress')
+        Task.objects.create(title='By first', created_by=self.first, assigned_to=self.second)
+        # Unassigns one task (bulk SET NULL) and deletes the one they created (cascade)
+        self.first.delete()
+        self.assertEqual(Task.objects.filter(assigned_to__isnull=True).count(), 1)
+        self.assertCountersConsistent()
+        self.manager.delete()
+        self.assertFalse(Task.objects.exists())
+        self.assertCountersConsistent()
+
+
+class DeltaSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='admin')
+        cls.manager = User.objects.create(username='manager', role='manager')
+        cls.member = User.objects.create(username='member', role='user', manager=cls.manager)
+        cls.outsider = User.objects.create(username='outsider', role='user')
+
+    def setUp(self):
+        cache.clear()
+        self.since = timezone.now() - timedelta(minutes=1)
+
+    def sync(self, user, token):
+        scope = VisibilityScope.for_user(user)
+        return build_sync(scope, scope.filter_tasks(Task.objects.all()), token)
+
+    def token_for(self, user, since):
+        return encode_token(since, scope_fingerprint(VisibilityScope.for_user(user)))
+
+    def test_token_round_trip(self):
+        token = encode_token(self.since, 'abc123')
+        self.assertEqual(decode_token(token), (self.since, 'abc123'))
+
+    def test_bare_timestamp_is_utc_without_fingerprint(self):
+        since, fingerprint = decode_token('2024-05-01T10:00:00')
+        self.assertEqual(since, datetime(2024, 5, 1, 10, 0, tzinfo=dt_timezone.utc))
+        self.assertIsNone(fingerprint)
+
+    def test_garbage_token_forces_a_full_resync(self):
+        self.assertEqual(decode_token('not a token'), (None, None))
+        self.assertTrue(self.sync(self.admin, 'not a token')['full_resync'])
+
+    def test_next_token_overlaps_by_two_seconds(self):
+        now = timezone.now()
+        with mock.patch('tasks.sync.timezone.now', return_value=now):
+            result = self.sync(self.admin, self.token_for(self.admin, self.since))
+        self.assertFalse(result['full_resync'])
+        self.assertEqual(decode_token(result['sync_token'])[0], now - SYNC_OVERLAP)
+
+        # A row committed late with an updated_at just before the token is still sent
+        task = Task.objects.create(title='Late commit', created_by=self.admin)
+        Task.objects.filter(pk=task.pk).update(updated_at=now - timedelta(seconds=1))
+        result = self.sync(self.admin, result['sync_token'])
+        self.assertEqual([changed.pk for changed in result['changed']], [task.pk])
+
+    def test_changed_and_deleted_since_the_token(self):
+        old = Task.objects.create(title='Old', created_by=self.admin)
+        Task.objects.filter(pk=old.pk).update(updated_at=self.since - timedelta(hours=1))
+        changed = Task.objects.create(title='Changed', created_by=self.admin)
+        removed = Task.objects.create(title='Removed', created_by=self.admin)
+        removed_id = removed.pk
+        removed.delete()
+        result = self.sync(self.admin, self.token_for(self.admin, self.since))
+        self.assertEqual([task.pk for task in result['changed']], [changed.pk])
+        self.assertEqual(result['deleted'], [removed_id])
+
+    def test_fingerprint_mismatch_forces_a_full_resync(self):
+        token = self.token_for(self.manager, self.since)
+        self.assertFalse(self.sync(self.manager, token)['full_resync'])
+        User.objects.create(username='newcomer', role='user', manager=self.manager)
+        self.assertTrue(self.sync(self.manager, token)['full_resync'])
+
+    @override_settings(TASK_TOMBSTONE_RETENTION_DAYS=7)
+    def test_retention_cutoff(self):
+        now = timezone.now()
+        self.assertFalse(self.sync(self.admin, self.token_for(self.admin, now - timedelta(days=6)))['full_resync'])
+        self.assertTrue(self.sync(self.admin, self.token_for(self.admin, now - timedelta(days=8)))['full_resync'])
+
+        task = Task.objects.create(title='Gone', created_by=self.admin)
+        task.delete()
+        TaskTombstone.objects.update(removed_at=now - timedelta(days=8))
+        Task.objects.create(title='Also gone', created_by=self.admin).delete()
+        self.assertEqual(prune_tombstones(now), 1)
+        self.assertEqual(TaskTombstone.objects.count(), 1)
+
+    def test_too_many_changes_force_a_full_resync(self):
+        for number in range(3):
+            Task.objects.create(title=f'Task {number}', created_by=self.admin)
+        token = self.token_for(self.admin, self.since)
+        with mock.patch('tasks.sync.MAX_CHANGES', 3):
+            self.assertEqual(len(self.sync(self.admin, token)['changed']), 3)
+        with mock.patch('tasks.sync.MAX_CHANGES', 2):
+            result = self.sync(self.admin, token)
+        self.assertTrue(result['full_resync'])
+        self.assertEqual(result['changed'], [])
+
+    def test_reassignment_tombstones(self):
+        task = Task.objects.create(title='Moving', created_by=self.admin, assigned_to=self.member)
+        tokens = {user: self.token_for(user, self.since) for user in (self.member, self.manager, self.outsider)}
+        task.assigned_to = self.outsider
+        task.save()
+        self.assertTrue(TaskTombstone.objects.filter(task_id=task.pk, reason='reassigned').exists())
+
+        # The previous assignee and their manager are told it left their view
+        for user in (self.member, self.manager):
+            with self.subTest(user=user.username):
+                result = self.sync(user, tokens[user])
+                self.assertEqual((result['changed'], result['deleted']), ([], [task.pk]))
+        result = self.sync(self.outsider, tokens[self.outsider])
+        self.assertEqual(([changed.pk for changed in result['changed']], result['deleted']), ([task.pk], []))
+
+    def test_reassigned_task_still_visible_to_its_creator(self):
+        task = Task.objects.create(title='Mine', created_by=self.manager, assigned_to=self.member)
+        token = self.token_for(self.manager, self.since)
+        task.assigned_to = self.outsider
+        task.save()
+        result = self.sync(self.manager, token)
+        self.assertEqual(([changed.pk for changed in result['changed']], result['deleted']), ([task.pk], []))
+
+    def test_sync_through_the_task_list(self):
+        task = Task.objects.create(title='Assigned', created_by=self.admin, assigned_to=self.member)
+        client = APIClient()
+        authenticate(client, self.member)
+        response = client.get('/api/tasks/', {'updated_since': self.since.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([changed['id'] for changed in response.data['changed']], [task.pk])
+        self.assertFalse(response.data['full_resync'])
+        response = client.get('/api/tasks/', {'updated_since': response.data['sync_token']})
+        self.assertEqual([changed['id'] for changed in response.data['changed']], [task.pk])
+
+
+class TaskExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='admin')
+        cls.manager = User.objects.create(username='manager', role='manager')
+        cls.member = User.objects.create(username='member', role='user', manager=cls.manager)
+        cls.outsider = User.objects.create(username='outsider', role='user')
+        cls.team_task = Task.objects.create(
+            title='Team task', description='Line one\nline, two', status='inprogress',
+            created_by=cls.admin, assigned_to=cls.member,
+        )
+        cls.other_task = Task.objects.create(title='Other task', created_by=cls.admin, assigned_to=cls.outsider)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def export(self, user, **params):
+        authenticate(self.client, user)
+        response = self.client.get('/api/tasks/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def csv_rows(self, user, **params):
+        response, content = self.export(user, **params)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(content.splitlines(keepends=True)))
+        self.assertEqual(tuple(rows[0]), EXPORT_COLUMNS)
+        return [dict(zip(EXPORT_COLUMNS, row)) for row in rows[1:]]
+
+    def test_csv(self):
+        rows = self.csv_rows(self.admin)
+        self.assertEqual([row['id'] for row in rows], [str(self.other_task.pk), str(self.team_task.pk)])
+        row = rows[1]
+        self.assertEqual(row['description'], 'Line one\nline, two')
+        self.assertEqual((row['status'], row['overdue']), ('inprogress', 'False'))
+        self.assertEqual((row['assigned_to_username'], row['created_by_username']), ('member', 'admin'))
+        self.assertEqual(row['due_date'], '')
+        self.assertEqual(row['created_at'], self.team_task.created_at.isoformat())
+
+    def test_ndjson(self):
+        response, content = self.export(self.admin, type='ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.other_task.pk, self.team_task.pk])
+        self.assertEqual(set(rows[1]), set(EXPORT_COLUMNS))
+        self.assertEqual(rows[1]['description'], 'Line one\nline, two')
+        self.assertIsNone(rows[1]['due_date'])
+
+    def test_export_is_scoped_and_filtered(self):
+        for user, expected in (
+            (self.member, [self.team_task.pk]),
+            (self.manager, [self.team_task.pk]),
+            (self.outsider, [self.other_task.pk]),
+        ):
+            with self.subTest(user=user.username):
+                self.assertEqual([int(row['id']) for row in self.csv_rows(user)], expected)
+        self.assertEqual([int(row['id']) for row in self.csv_rows(self.admin, status='inprogress')], [self.team_task.pk])
+
+    def test_formulas_are_escaped(self):
+        for prefix in FORMULA_PREFIXES:
+            Task.objects.create(title=f'{prefix}SUM(A1)', created_by=self.admin)
+        Task.objects.create(title='Plain = text', created_by=self.admin)
+        titles = {row['title'] for row in self.csv_rows(self.admin)}
+        for prefix in FORMULA_PREFIXES:
+            self.assertIn(f"'{prefix}SUM(A1)", titles)
+        self.assertIn('Plain = text', titles)
+
+    def test_unsupported_type(self):
+        authenticate(self.client, self.admin)
+        self.assertEqual(self.client.get('/api/tasks/export/', {'type': 'xlsx'}).status_code, 400)
+
+
+@override_settings(EVENT_STREAM_HEARTBEAT=0.05)
+class ChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='admin')
+        cls.manager = User.objects.create(username='manager', role='manager')
+        cls.member = User.objects.create(username='member', role='user', manager=cls.manager)
+        cls.outsider = User.objects.create(username='outsider', role='user')
+        cls.member_profile = EmployeeProfile.objects.create(
+            user=cls.member, employee_id='E1', date_of_joining=timezone.localdate()
+        )
+        cls.outsider_profile = EmployeeProfile.objects.create(
+            user=cls.outsider, employee_id='E2', date_of_joining=timezone.localdate()
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def token(self, user):
+        return str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+
+    async def next_event(self, stream):
+        """The next chunk that isn't a keep-alive"""
+        while True:
+            chunk = await anext(stream)
+            if not chunk.startswith(': keepalive'):
+                return chunk
+
+    async def test_events_are_filtered_by_visibility(self):
+        broker = InProcessBroker()
+        stream = event_stream(self.manager, broker.subscribe(), {'tasks', 'attendance'})
+        self.assertEqual(await anext(stream), 'retry: 5000\n\n')
+        broker.publish(task_event('created', 1, self.outsider.pk, self.admin.pk, 'todo'))
+        broker.publish(attendance_event('created', 1, self.outsider_profile.pk))
+        broker.publish(task_event('created', 2, self.member.pk, self.admin.pk, 'todo'))
+        self.assertIn('"id": 2', await self.next_event(stream))
+        broker.publish(attendance_event('created', 2, self.member_profile.pk))
+        self.assertIn('"id": 2', await self.next_event(stream))
+        # Reassigned away from the team: the manager still hears about it
+        broker.publish(task_event(
+            'updated', 2, self.outsider.pk, self.admin.pk, 'todo', previous_assigned_to_id=self.member.pk
+        ))
+        chunk = await self.next_event(stream)
+        self.assertTrue(chunk.startswith('event: tasks\n'))
+        self.assertIn('"previous_assigned_to_id": %d' % self.member.pk, chunk)
+        await stream.aclose()
+
+    async def test_topics_narrow_the_feed(self):
+        broker = InProcessBroker()
+        stream = event_stream(self.admin, broker.subscribe(), {'attendance'})
+        await anext(stream)
+        broker.publish(task_event('created', 1, self.member.pk, self.admin.pk, 'todo'))
+        broker.publish(attendance_event('created', 5, self.member_profile.pk))
+        self.assertTrue((await self.next_event(stream)).startswith('event: attendance\n'))
+        await stream.aclose()
+
+    async def test_disconnect_unsubscribes(self):
+        broker = InProcessBroker()
+        stream = event_stream(self.admin, broker.subscribe(), {'tasks'})
+        await anext(stream)
+        self.assertEqual(broker.subscriber_count(), 1)
+        await stream.aclose()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    async def test_endpoint_streams_the_requested_topics(self):
+        broker = get_broker()
+        response = await self.async_client.get(
+            '/api/events/', {'topics': 'attendance,unknown', 'token': self.token(self.member)}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+        broker.publish(task_event('created', 1, self.member.pk, self.admin.pk, 'todo'))
+        broker.publish(attendance_event('created', 7, self.outsider_profile.pk))
+        broker.publish(attendance_event('created', 8, self.member_profile.pk))
+        while (chunk := await anext(stream)).startswith(b': keepalive'):
+            pass
+        self.assertTrue(chunk.startswith(b'event: attendance\n'))
+        self.assertIn(b'"id": 8', chunk)
+        await stream.aclose()
+
+    async def test_endpoint_rejects_bad_requests(self):
+        response = await self.async_client.get('/api/events/')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get('/api/events/', {'topics': 'payroll', 'token': self.token(self.member)})
+        self.assertEqual(response.status_code, 400)
+
+    def test_wsgi_is_not_supported(self):
+        response = self.client.get('/api/events/', {'token': self.token(self.member)})
+        self.assertEqual(response.status_code, 501)
@@ -2,6 +2,8 @@ from django.urls import path
 from .views import (
     TaskListCreateView,
     TaskRetrieveUpdateDeleteView,
+    TaskBulkView,
+    TaskExportView,
 )
 
 urlpatterns = [
@@ -10,4 +12,10 @@ urlpatterns = [
     
     # Retrieve (GET), update (PUT/PATCH), or delete (DELETE) a specific task
     path("<int:pk>/", TaskRetrieveUpdateDeleteView.as_view(), name="task_detail"),
+
+    # Apply many create/update/delete operations in one request (POST)
+    path("bulk/", TaskBulkView.as_view(), name="task_bulk"),
+
+    # Stream all matching tasks as CSV or NDJSON (GET)
+    path("export/", TaskExportView.as_view(), name="task_export"),
 ]
@@ -1,44 +1,71 @@
-from rest_framework import generics, permissions, status
+from rest_framework import generics, permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
-from django.db.models import Q
-from accounts.models import User
+from rest_framework.views import APIView
+from django.http import StreamingHttpResponse
+from accounts.scope import VisibilityScope
+from core.pagination import OptionalKeysetPagination
 from .models import Task
 from .serializers import TaskSerializer
+from .search import search_tasks
+from .bulk import BulkTaskProcessor, MAX_OPERATIONS
+from .sync import build_sync
+from .export import EXPORT_FORMATS, stream_tasks
+from .calendar import build_calendar, parse_window
 from .permissions import IsManagerOrAdmin, IsOwnerOrManagerOrAdmin
 
 
+def filter_task_list(request, queryset):
+    """
+    Apply the task list filters (search, status, overdue, assigned_to) and
+    ordering to an already role-scoped queryset.
+    """
+    user = request.user
+    search = request.query_params.get('search', None)
+    if search:
+        queryset = search_tasks(queryset, search)
+    status_filter = request.query_params.get('status', None)
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    overdue_filter = request.query_params.get('overdue', None)
+    if overdue_filter in ('true', '1'):
+        queryset = queryset.overdue()
+    elif overdue_filter in ('false', '0'):
+        queryset = queryset.not_overdue()
+    assigned_to_filter = request.query_params.get('assigned_to', None)
+    if assigned_to_filter and user.role in ["admin", "manager"]:
+        try:
+            assigned_user_id = int(assigned_to_filter)
+            queryset = queryset.filter(assigned_to_id=assigned_user_id)
+        except (ValueError, TypeError):
+            pass
+    if search:
+        # Best matches first; keyset pagination re-orders by its own key
+        return queryset.order_by('-search_rank', '-created_at', '-id')
+    return queryset.order_by('-created_at', '-id')
+
+
 class TaskListCreateView(generics.ListCreateAPIView):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == "admin":
-            queryset = Task.objects.all()
-        elif user.role == "manager":
-            team_member_ids = User.objects.filter(manager=user).values_list('id', flat=True)
-            queryset = Task.objects.filter(
-                Q(created_by=user) | Q(assigned_to__in=team_member_ids)
-            ).distinct()
-        else:
-            queryset = Task.objects.filter(assigned_to=user)
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(description__icontains=search)
-            )
-        status_filter = self.request.query_params.get('status', None)
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        assigned_to_filter = self.request.query_params.get('assigned_to', None)
-        if assigned_to_filter and user.role in ["admin", "manager"]:
-            try:
-                assigned_user_id = int(assigned_to_filter)
-                queryset = queryset.filter(assigned_to_id=assigned_user_id)
-            except (ValueError, TypeError):
-                pass
-        return queryset.order_by('-created_at')
+        scope = VisibilityScope.for_request(self.request)
+        queryset = scope.filter_tasks(TaskSerializer.setup_eager_loading(Task.objects.all()))
+        return filter_task_list(self.request, queryset)
+
+    def list(self, request, *args, **kwargs):
+        updated_since = request.query_params.get('updated_since', None)
+        if updated_since is None:
+            return super().list(request, *args, **kwargs)
+        # Delta sync ignores list filters, so tasks leaving a filter aren't missed
+        scope = VisibilityScope.for_request(request)
+        queryset = scope.filter_tasks(TaskSerializer.setup_eager_loading(Task.objects.all()))
+        result = build_sync(scope, queryset, updated_since)
+        result['changed'] = self.get_serializer(result['changed'], many=True).data
+        return Response(result)
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -47,27 +74,41 @@ class TaskListCreateView(generics.ListCreateAPIView):
         serializer.save(created_by=user)
 
 
+class TaskExportView(APIView):
+    """
+    Stream every task matching the task list filters as CSV (default) or
+    NDJSON (?type=ndjson), without pagination or nested serializers.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get('type', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"Unsupported export type. Use one of: {', '.join(EXPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        scope = VisibilityScope.for_request(request)
+        queryset = filter_task_list(request, scope.filter_tasks(Task.objects.with_overdue()))
+        content_type, filename = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(stream_tasks(queryset, export_format), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
 class TaskRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrManagerOrAdmin]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == "admin":
-            return Task.objects.all()
-        elif user.role == "manager":
-            team_member_ids = User.objects.filter(manager=user).values_list('id', flat=True)
-            return Task.objects.filter(
-                Q(created_by=user) | Q(assigned_to__in=team_member_ids)
-            ).distinct()
-        else:
-            return Task.objects.filter(assigned_to=user)
+        scope = VisibilityScope.for_request(self.request)
+        return scope.filter_tasks(TaskSerializer.setup_eager_loading(Task.objects.all()))
 
     def update(self, request, *args, **kwargs):
         user = request.user
         task = self.get_object()
         if user.role == "user":
-            if not task.assigned_to or task.assigned_to.id != user.id:
+            if task.assigned_to_id != user.id:
                 return Response(
                     {"error": "You can only update tasks assigned to you."},
                     status=status.HTTP_403_FORBIDDEN
@@ -90,8 +131,7 @@ class TaskRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
             self.perform_update(serializer)
             return Response(serializer.data)
         elif user.role == "manager":
-            team_member_ids = User.objects.filter(manager=user).values_list('id', flat=True)
-            if task.created_by != user and (not task.assigned_to or task.assigned_to.id not in team_member_ids):
+            if not VisibilityScope.for_request(request).can_manage_task(task):
                 return Response(
                     {"error": "You can only update tasks for your team."},
                     status=status.HTTP_403_FORBIDDEN
@@ -110,39 +150,74 @@ class TaskRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         if user.role == "manager":
-            team_member_ids = User.objects.filter(manager=user).values_list('id', flat=True)
-            if task.created_by != user and (not task.assigned_to or task.assigned_to.id not in team_member_ids):
+            if not VisibilityScope.for_request(request).can_manage_task(task):
                 return Response(
                     {"error": "You can only delete tasks for your team."},
                     status=status.HTTP_403_FORBIDDEN
                 )
         return super().destroy(request, *args, **kwargs)
 
+class TaskBulkView(generics.GenericAPIView):
+    """
+    Apply up to MAX_OPERATIONS task creates/updates/deletes in one request.
+    Body: {"operations": [...], "atomic": false}
+    Valid operations are written in one transaction; with "atomic": true
+    nothing is written if any operation fails. Returns per-item results.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, dict):
+            return Response(
+                {"error": "The request body must be an object."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        operations = request.data.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return Response(
+                {"error": "'operations' must be a non-empty list."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(operations) > MAX_OPERATIONS:
+            return Response(
+                {"error": f"At most {MAX_OPERATIONS} operations are allowed per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            atomic = serializers.BooleanField().to_internal_value(request.data.get('atomic', False))
+        except serializers.ValidationError:
+            return Response(
+                {"error": "'atomic' must be a boolean."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        processor = BulkTaskProcessor(
+            request.user, VisibilityScope.for_request(request), operations, atomic=atomic
+        )
+        results, has_errors = processor.run()
+        response_status = status.HTTP_400_BAD_REQUEST if atomic and has_errors else status.HTTP_200_OK
+        return Response({
+            'applied': not (atomic and has_errors),
+            'results': results,
+        }, status=response_status)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def TaskCalendarView(request):
-    user = request.user
-    start_date = request.query_params.get('start_date', None)
-    end_date = request.query_params.get('end_date', None)
-    if user.role == "admin":
-        tasks = Task.objects.all()
-    elif user.role == "manager":
-        team_member_ids = User.objects.filter(manager=user).values_list('id', flat=True)
-        tasks = Task.objects.filter(
-            Q(created_by=user) | Q(assigned_to__in=team_member_ids)
-        ).distinct()
-    else:
-        tasks = Task.objects.filter(assigned_to=user)
-    if start_date:
-        tasks = tasks.filter(
-            Q(due_date__gte=start_date) | Q(assigned_at__date__gte=start_date)
-        )
-    if end_date:
-        tasks = tasks.filter(
-            Q(due_date__lte=end_date) | Q(assigned_at__date__lte=end_date)
+    """
+    Tasks bucketed by due day and assigned day within a bounded window.
+    Requires start_date and end_date (at most CALENDAR_MAX_DAYS apart).
+    """
+    try:
+        start, end = parse_window(
+            request.query_params.get('start_date', None),
+            request.query_params.get('end_date', None),
         )
-    tasks = tasks.filter(
-        Q(due_date__isnull=False) | Q(assigned_at__isnull=False)
-    )
-    serializer = TaskSerializer(tasks, many=True)
-    return Response(serializer.data)
+    except ValueError as error:
+        return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    scope = VisibilityScope.for_request(request)
+    return Response({
+        'start_date': start,
+        'end_date': end,
+        'days': build_calendar(scope, start, end),
+    })
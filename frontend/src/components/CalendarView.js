@@ -18,32 +18,18 @@ const CalendarView = ({ onError }) => {
   const [selectedTasks, setSelectedTasks] = useState([]);
 
   /**
-   * Load tasks for calendar view
+   * Convert the per-day calendar buckets into FullCalendar events
+   * A task shows up on its due day and on its assignment day
    */
-  const loadCalendarTasks = React.useCallback(async () => {
-    setLoading(true);
-    try {
-      // Get current month start and end dates
-      const now = new Date();
-      const startDate = new Date(now.getFullYear(), now.getMonth(), 1)
-        .toISOString().split('T')[0];
-      const endDate = new Date(now.getFullYear(), now.getMonth() + 1, 0)
-        .toISOString().split('T')[0];
-
-      // Fetch tasks for calendar
-      const tasks = await tasksAPI.getCalendarTasks(startDate, endDate);
-      
-      // Convert tasks to FullCalendar events
-      // Show tasks on both due_date and assigned_at dates
-      const calendarEvents = [];
-      
-      tasks.forEach(task => {
-        // Add event for due date if it exists
-        if (task.due_date) {
+  const toCalendarEvents = (calendar) => {
+    const calendarEvents = [];
+    calendar.days.forEach(day => {
+      day.tasks.forEach(task => {
+        if (task.due_date === day.date) {
           calendarEvents.push({
             id: `${task.id}-due`,
             title: `${task.title} (Due)`,
-            start: task.due_date,
+            start: day.date,
             allDay: true,
             backgroundColor: getStatusColor(task.status),
             borderColor: getStatusColor(task.status),
@@ -53,14 +39,11 @@ const CalendarView = ({ onError }) => {
             },
           });
         }
-        
-        // Add event for assignment date if it exists
-        if (task.assigned_at) {
-          const assignedDate = new Date(task.assigned_at).toISOString().split('T')[0];
+        if (task.assigned_date === day.date) {
           calendarEvents.push({
             id: `${task.id}-assigned`,
             title: `${task.title} (Assigned)`,
-            start: assignedDate,
+            start: day.date,
             allDay: true,
             backgroundColor: getAssignmentColor(), // Purple color for assignment events
             borderColor: getAssignmentColor(),
@@ -71,10 +54,28 @@ const CalendarView = ({ onError }) => {
           });
         }
       });
+    });
+    return calendarEvents;
+  };
+
+  /**
+   * Load tasks for calendar view
+   */
+  const loadCalendarTasks = React.useCallback(async () => {
+    setLoading(true);
+    try {
+      // Get current month start and end dates
+      const now = new Date();
+      const startDate = new Date(now.getFullYear(), now.getMonth(), 1)
+        .toISOString().split('T')[0];
+      const endDate = new Date(now.getFullYear(), now.getMonth() + 1, 0)
+        .toISOString().split('T')[0];
 
-      setEvents(calendarEvents);
+      // Fetch tasks for calendar
+      const calendar = await tasksAPI.getCalendarTasks(startDate, endDate);
+      setEvents(toCalendarEvents(calendar));
     } catch (error) {
-      const errorMessage = error.response?.data?.detail || 'Failed to load calendar tasks';
+      const errorMessage = error.response?.data?.error || 'Failed to load calendar tasks';
       if (onError) onError(errorMessage);
     } finally {
       setLoading(false);
@@ -95,30 +96,27 @@ const CalendarView = ({ onError }) => {
       const endDate = arg.end.toISOString().split('T')[0];
       
       // Fetch tasks for the visible date range
-      const tasks = await tasksAPI.getCalendarTasks(startDate, endDate);
-      
-      // Convert tasks to FullCalendar events
-      const calendarEvents = tasks
-        .filter(task => task.due_date) // Only include tasks with due dates
-        .map(task => ({
-          id: task.id.toString(),
-          title: task.title,
-          start: task.due_date,
-          allDay: true,
-          backgroundColor: getStatusColor(task.status),
-          borderColor: getStatusColor(task.status),
-          extendedProps: {
-            task: task,
-          },
-        }));
-
-      setEvents(calendarEvents);
+      const calendar = await tasksAPI.getCalendarTasks(startDate, endDate);
+      setEvents(toCalendarEvents(calendar));
     } catch (error) {
-      const errorMessage = error.response?.data?.detail || 'Failed to load calendar tasks';
+      const errorMessage = error.response?.data?.error || 'Failed to load calendar tasks';
       if (onError) onError(errorMessage);
     }
   };
 
+  /**
+   * Calendar entries are compact; load full details for the tasks being shown
+   */
+  const showTaskDetails = async (tasks) => {
+    setSelectedTasks(tasks);
+    try {
+      const details = await Promise.all(tasks.map(task => tasksAPI.getTask(task.id)));
+      setSelectedTasks(details);
+    } catch (error) {
+      // Keep the compact entries if details can't be loaded
+    }
+  };
+
   /**
    * Get color based on task status
    */
@@ -165,7 +163,7 @@ const CalendarView = ({ onError }) => {
         new Map(tasksForDate.map(task => [task.id, task])).values()
       );
       
-      setSelectedTasks(uniqueTasks);
+      await showTaskDetails(uniqueTasks);
     } catch (error) {
       console.error('Error handling date click:', error);
     }
@@ -177,7 +175,7 @@ const CalendarView = ({ onError }) => {
   const handleEventClick = (arg) => {
     const task = arg.event.extendedProps.task;
     setSelectedDate(arg.event.startStr);
-    setSelectedTasks([task]);
+    showTaskDetails([task]);
   };
 
   return (
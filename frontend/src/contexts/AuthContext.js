@@ -138,6 +138,12 @@ export const AuthProvider = ({ children }) => {
    * Clears authentication data and redirects to login
    */
   const logout = () => {
+    // Revoke the refresh token server-side; logging out locally doesn't wait for it
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      authAPI.revokeToken(refreshToken).catch(() => {});
+    }
+
     // Clear localStorage
     localStorage.removeItem('token');
     localStorage.removeItem('refresh_token');
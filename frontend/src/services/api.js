@@ -56,6 +56,12 @@ export const authAPI = {
     return response.data;
   },
 
+  revokeToken: async (refreshToken) => {
+    await api.post('/token/revoke/', {
+      refresh: refreshToken,
+    });
+  },
+
   refreshToken: async (refreshToken) => {
     const response = await api.post('/token/refresh/', {
       refresh: refreshToken,